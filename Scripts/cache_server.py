@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Title: LAN Cache Server
+Description: Serves Apple software update catalogs and packages to other machines
+Features:
+  - Proxies sucatalogs with package and metadata URLs rewritten to the server
+  - Caches catalogs (with a refresh interval) and packages on disk
+  - Byte-range requests for cached and in-flight packages
+  - Each cache miss is fetched upstream once, every waiting client is fed
+    from the growing .part file
+Usage:
+  - python gibmacos_cli.py serve --port 8000
+  - Clients set "catalog_server": "http://<host>:8000" in Scripts/settings.json
+Dependencies: requests
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+CATALOG_HOST = "swscan.apple.com"
+# Only Apple content is proxied - the server is not an open relay
+ALLOWED_HOST = re.compile(r"^[a-z0-9.-]+\.apple\.com$")
+URL_PATTERN = re.compile(rb"https?://([a-z0-9.-]+\.apple\.com)/", re.IGNORECASE)
+# A package URL as rewritten by send_catalog, or as listed by Apple
+PACKAGE_URL = re.compile(
+    r"^https?://(?:[^/]+/pkg/)?([a-z0-9.-]+\.apple\.com)/(.*)$", re.IGNORECASE
+)
+BLOCK_SIZE = 1024 * 1024
+
+
+def get_upstream_path(url):
+    # Host and path of the Apple URL behind a package URL - the same for a
+    # package fetched from Apple and one fetched through any cache server
+    match = PACKAGE_URL.match(url or "")
+    if not match:
+        return url
+    return "{}/{}".format(match.group(1).lower(), match.group(2))
+
+
+class Fill:
+    # One upstream download that any number of clients can read while it runs
+    def __init__(self, part_path):
+        self.part_path = part_path
+        self.total = -1
+        self.started = False
+        self.done = False
+        self.failed = False
+        self.condition = threading.Condition()
+
+    def progress(self, current, total, start_time):
+        with self.condition:
+            self.total = total
+            self.started = True
+            self.condition.notify_all()
+
+    def finish(self, failed=False):
+        with self.condition:
+            self.done = True
+            self.failed = failed
+            self.condition.notify_all()
+
+
+class CacheHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        self.server._update_status(
+            "{} - {}".format(self.address_string(), format % args)
+        )
+
+    def do_HEAD(self):
+        self.handle_request(head=True)
+
+    def do_GET(self):
+        self.handle_request(head=False)
+
+    def handle_request(self, head=False):
+        path = unquote(self.path.split("?", 1)[0])
+        if ".." in path.split("/"):
+            return self.send_error(400)
+        try:
+            if path.startswith("/content/catalogs/") and path.endswith(".sucatalog"):
+                return self.send_catalog(path, head)
+            if path.startswith("/pkg/"):
+                host, _, upstream_path = path[len("/pkg/") :].partition("/")
+                if ALLOWED_HOST.match(host.lower()) and upstream_path:
+                    return self.send_package(host.lower(), upstream_path, head)
+            self.send_error(404)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def get_base_url(self):
+        host = self.headers.get("Host") or "{}:{}".format(*self.server.server_address)
+        return "http://" + host
+
+    def send_catalog(self, path, head):
+        data = self.server.get_catalog(path)
+        if data is None:
+            return self.send_error(502, "Catalog unavailable upstream")
+        base_url = self.get_base_url().encode("utf-8")
+        data = URL_PATTERN.sub(lambda m: base_url + b"/pkg/" + m.group(1) + b"/", data)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def send_package(self, host, upstream_path, head):
+        file_path = self.server.cache_path(host, upstream_path)
+        fill = self.server.get_fill(host, upstream_path)
+        if fill:
+            with fill.condition:
+                while not fill.started and not fill.done:
+                    fill.condition.wait(1.0)
+            if fill.failed:
+                return self.send_error(502, "Upstream download failed")
+            if fill.done:
+                fill = None
+        total = fill.total if fill else os.path.getsize(file_path)
+
+        start, end = 0, total - 1
+        range_header = self.headers.get("Range")
+        if range_header and total >= 0:
+            match = re.match(r"bytes=(\d*)-(\d*)$", range_header.strip())
+            if match and (match.group(1) or match.group(2)):
+                if match.group(1):
+                    start = int(match.group(1))
+                    if match.group(2):
+                        end = min(int(match.group(2)), total - 1)
+                else:
+                    # Suffix range - the last n bytes
+                    start = max(0, total - int(match.group(2)))
+                if start >= total or start > end:
+                    self.send_response(416)
+                    self.send_header("Content-Range", "bytes */{}".format(total))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header(
+                    "Content-Range", "bytes {}-{}/{}".format(start, end, total)
+                )
+            else:
+                self.send_response(200)
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        if total >= 0:
+            self.send_header("Content-Length", str(end - start + 1))
+        else:
+            # Upstream sent no length - the end of the body is the end of the
+            # connection
+            self.send_header("Connection", "close")
+            self.close_connection = True
+            end = None
+        self.end_headers()
+        if head:
+            return
+        if fill:
+            self.tail_fill(fill, file_path, start, end)
+        else:
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(BLOCK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+
+    def tail_fill(self, fill, file_path, start, end):
+        pos = start
+        f = None
+        try:
+            while end is None or pos <= end:
+                # Looked at before the file, so once the fill is done the
+                # size read below is final and everything up to it gets sent
+                with fill.condition:
+                    done = fill.done
+                if f is None:
+                    # The .part file is renamed into place when the fill
+                    # finishes - an open handle keeps reading the same file
+                    for path in (fill.part_path, file_path):
+                        if os.path.isfile(path):
+                            f = open(path, "rb")
+                            break
+                if f is not None:
+                    available = os.fstat(f.fileno()).st_size
+                    if pos < available:
+                        f.seek(pos)
+                        limit = available - pos
+                        if end is not None:
+                            limit = min(limit, end - pos + 1)
+                        chunk = f.read(min(BLOCK_SIZE, limit))
+                        self.wfile.write(chunk)
+                        pos += len(chunk)
+                        continue
+                if done:
+                    if fill.failed or f is None or end is not None:
+                        # Headers are gone already - dropping the connection
+                        # tells the client the body is incomplete
+                        self.close_connection = True
+                    return
+                with fill.condition:
+                    if not fill.done:
+                        fill.condition.wait(0.5)
+        finally:
+            if f is not None:
+                f.close()
+
+
+class CacheServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        cache_dir,
+        downloader,
+        host="0.0.0.0",
+        port=8000,
+        catalog_ttl=3600,
+        update_callback=None,
+    ):
+        super().__init__((host, port), CacheHandler)
+        self.cache_dir = cache_dir
+        self.d = downloader
+        self.catalog_ttl = catalog_ttl
+        self.update_callback = update_callback
+        self.fills = {}
+        self.fills_lock = threading.Lock()
+        self.catalog_lock = threading.Lock()
+
+    def _update_status(self, message):
+        if self.update_callback:
+            self.update_callback(message)
+
+    def upstream_url(self, host, path):
+        return "https://{}{}".format(host, path)
+
+    def cache_path(self, host, upstream_path):
+        return os.path.join(self.cache_dir, "pkg", host, *upstream_path.split("/"))
+
+    def get_catalog(self, path):
+        cache_path = os.path.join(
+            self.cache_dir, "catalogs", *path.strip("/").split("/")
+        )
+        # One upstream fetch at a time - concurrent clients get the fresh copy
+        with self.catalog_lock:
+            if (
+                os.path.isfile(cache_path)
+                and time.time() - os.path.getmtime(cache_path) < self.catalog_ttl
+            ):
+                with open(cache_path, "rb") as f:
+                    return f.read()
+            data = self.d.get_bytes(self.upstream_url(CATALOG_HOST, path), False)
+            if data:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                with open(cache_path + ".tmp", "wb") as f:
+                    f.write(data)
+                os.replace(cache_path + ".tmp", cache_path)
+                self._update_status("Refreshed catalog {}".format(path))
+                return data
+            if os.path.isfile(cache_path):
+                self._update_status(
+                    "Upstream catalog unavailable, serving the cached copy of {}".format(
+                        path
+                    )
+                )
+                with open(cache_path, "rb") as f:
+                    return f.read()
+            return None
+
+    def get_fill(self, host, upstream_path):
+        # Returns None when the package is already cached
+        key = (host, upstream_path)
+        file_path = self.cache_path(host, upstream_path)
+        with self.fills_lock:
+            fill = self.fills.get(key)
+            if fill is None and os.path.isfile(file_path):
+                return None
+            if fill is None or (fill.done and fill.failed):
+                fill = Fill(file_path + ".part")
+                self.fills[key] = fill
+                threading.Thread(
+                    target=self._run_fill,
+                    args=(fill, key, self.upstream_url(host, "/" + upstream_path)),
+                    daemon=True,
+                ).start()
+            return fill
+
+    def _run_fill(self, fill, key, url):
+        file_path = fill.part_path[: -len(".part")]
+        failed = True
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            resume_bytes = 0
+            if os.path.exists(fill.part_path):
+                resume_bytes = os.path.getsize(fill.part_path)
+            self._update_status("Fetching {}".format(url))
+            # Fills run side by side on the one Downloader - each is its
+            # own Transfer
+            result = self.d.stream_to_file(
+                url,
+                fill.part_path,
+                resume_bytes=resume_bytes,
+                allow_resume=True,
+                callback=fill.progress,
+            )
+            if result:
+                os.replace(fill.part_path, file_path)
+                failed = False
+                self._update_status("Cached {}".format(url))
+        except Exception as e:
+            self._update_status("Failed to fetch {}: {}".format(url, e))
+        finally:
+            fill.finish(failed=failed)
+            with self.fills_lock:
+                if not failed and self.fills.get(key) is fill:
+                    # Later requests read the finished file directly
+                    del self.fills[key]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Title: Catalog Worker
+Description: Catalog parsing and product filtering for a gibMacOS GUI worker process
+Features:
+  - Parses the raw sucatalog and picks the installer (or recovery) products
+  - Returns only those products, with only the keys a metadata scan reads,
+    so the full catalog never has to live in the GUI process
+  - Dist file parsing (build, version, title, supported device IDs)
+  - Plain functions, so the parse runs in a process pool off the GIL
+Usage: GibMacOSBackend.parse_catalog / GibMacOSBackend.get_build_version
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import re
+
+from Scripts import plist, records
+
+PRODUCT_KEYS = ("PostDate", "ServerMetadataURL")
+DIST_KEYS = ("English", "en")
+
+
+def is_installer(product, find_recovery=False, recovery_suffixes=()):
+    if find_recovery:
+        return any(
+            x
+            for x in product.get("Packages", [])
+            if x["URL"].endswith(tuple(recovery_suffixes))
+        )
+    val = product.get("ExtendedMetaInfo", {}).get(
+        "InstallAssistantPackageIdentifiers", {}
+    )
+    return val.get("OSInstall", {}) == "com.apple.mpkg.OSInstall" or val.get(
+        "SharedSupport", ""
+    ).startswith("com.apple.pkg.InstallAssistant")
+
+
+def trim_product(product):
+    trimmed = {key: product[key] for key in PRODUCT_KEYS if key in product}
+    identifiers = product.get("ExtendedMetaInfo", {}).get(
+        "InstallAssistantPackageIdentifiers"
+    )
+    if identifiers is not None:
+        trimmed["ExtendedMetaInfo"] = {
+            "InstallAssistantPackageIdentifiers": identifiers
+        }
+    trimmed["Distributions"] = {
+        key: value
+        for key, value in product.get("Distributions", {}).items()
+        if key in DIST_KEYS
+    }
+    trimmed["Packages"] = [
+        {key: x[key] for key in records.Package.__slots__ if key in x}
+        for x in product.get("Packages", [])
+    ]
+    return trimmed
+
+
+def scan_catalog(data, find_recovery=False, recovery_suffixes=()):
+    # Runs in a worker process - takes the raw catalog bytes and returns a
+    # catalog dict holding only the products get_installers would pick
+    catalog = plist.loads(data)
+    if not isinstance(catalog, dict):
+        raise ValueError("Catalog is not a dictionary")
+    return {
+        "Products": {
+            prod: trim_product(product)
+            for prod, product in catalog.get("Products", {}).items()
+            if is_installer(product, find_recovery, recovery_suffixes)
+        }
+    }
+
+
+def parse_dist(dist_file):
+    # Returns (build, version, name, device_ids) - "Unknown" for anything
+    # the dist file does not have
+    build = version = name = "Unknown"
+    build_search = (
+        "macOSProductBuildVersion"
+        if "macOSProductBuildVersion" in dist_file
+        else "BUILD"
+    )
+    vers_search = (
+        "macOSProductVersion" if "macOSProductVersion" in dist_file else "VERSION"
+    )
+    try:
+        build = (
+            dist_file.split("<key>{}</key>".format(build_search))[1]
+            .split("<string>")[1]
+            .split("</string>")[0]
+        )
+    except:
+        pass
+    try:
+        version = (
+            dist_file.split("<key>{}</key>".format(vers_search))[1]
+            .split("<string>")[1]
+            .split("</string>")[0]
+        )
+    except:
+        pass
+    try:
+        name = re.search(r"<title>(.+?)</title>", dist_file).group(1)
+    except:
+        pass
+    try:
+        device_ids = re.search(r"var supportedDeviceIDs\s*=\s*\[([^]]+)\];", dist_file)[
+            1
+        ]
+        device_ids = list(set(i.lower() for i in re.findall(r"'([^',]+)'", device_ids)))
+    except:
+        device_ids = []
+    return (build, version, name, device_ids)
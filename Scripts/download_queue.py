@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Title: Download Queue
+Description: Persistent, prioritised multi-product download queue for gibMacOS GUI
+Features:
+  - Jobs with priorities (higher runs first, FIFO within a priority)
+  - Queue persisted to JSON and resumed after a restart
+  - Scheduler with configurable concurrency
+  - Per-job cancellation
+Usage: Created by GibMacOSBackend.get_download_queue()
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from Scripts import persist
+
+
+class DownloadQueue:
+    STATUSES = ("running", "queued", "failed", "cancelled", "done")
+
+    def __init__(
+        self,
+        path,
+        runner,
+        concurrency=1,
+        update_callback=None,
+        on_start=None,
+        on_idle=None,
+        persister=None,
+    ):
+        self.path = path
+        self.runner = runner
+        self.concurrency = max(1, int(concurrency))
+        self.update_callback = update_callback
+        self.on_start = on_start
+        self.on_idle = on_idle
+        # Optional Scripts/persist.Persister - saves then happen off the
+        # calling thread and bursts of changes become one write
+        self.persister = persister
+
+        self.jobs = []
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)
+        self.cancel_events = {}
+        self.scheduler_thread = None
+        # True from start() until the scheduler has decided to exit - a
+        # start() after that runs a new scheduler
+        self.scheduling = False
+        self.stopping = False
+        # Jobs cancelled by stop() - they go back to "queued"
+        self.paused = set()
+        self.load()
+
+    def _update_status(self, message):
+        if self.update_callback:
+            self.update_callback(message)
+
+    def load(self):
+        jobs = []
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    jobs = json.load(f).get("jobs", [])
+                assert isinstance(jobs, list)
+            except:
+                jobs = []
+        for job in jobs:
+            # Anything that was running when we last exited gets picked back up
+            if job.get("status") == "running":
+                job["status"] = "queued"
+        with self.lock:
+            self.jobs = jobs
+
+    def save(self):
+        with self.lock:
+            data = {"jobs": [dict(x) for x in self.jobs]}
+
+        def serialize():
+            return json.dumps(data, indent=2).encode("utf-8")
+
+        if self.persister:
+            self.persister.schedule(self.path, serialize)
+            return
+        try:
+            persist.write_atomic(self.path, serialize())
+        except Exception as e:
+            self._update_status(f"Failed to save download queue: {e}")
+
+    def get_jobs(self):
+        with self.lock:
+            jobs = [dict(x) for x in self.jobs]
+        return sorted(
+            jobs,
+            key=lambda x: (
+                self.STATUSES.index(x.get("status", "queued")),
+                -x.get("priority", 0),
+                x.get("added", 0),
+            ),
+        )
+
+    def get_job(self, job_id):
+        with self.lock:
+            return next((x for x in self.jobs if x["id"] == job_id), None)
+
+    def pending(self):
+        with self.lock:
+            return sum(1 for x in self.jobs if x["status"] in ("queued", "running"))
+
+    def add(self, product, download_dir, priority=0, **extra):
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "product": product,
+            "download_dir": download_dir,
+            "priority": int(priority),
+            "status": "queued",
+            "error": "",
+            "added": time.time(),
+            "bytes": 0,
+            "total": -1,
+        }
+        job.update(extra)
+        with self.condition:
+            self.jobs.append(job)
+            self.save()
+            self.condition.notify_all()
+        self._update_status(
+            "Queued {} (priority {}).".format(
+                product.get("title", product["product"]), priority
+            )
+        )
+        return job
+
+    def remove(self, job_id):
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None:
+                return False
+            if job["status"] == "running":
+                self.cancel_events[job_id].set()
+            self.jobs.remove(job)
+            self.save()
+            self.condition.notify_all()
+        return True
+
+    def set_priority(self, job_id, priority):
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None:
+                return False
+            job["priority"] = int(priority)
+            self.save()
+        return True
+
+    def retry(self, job_id):
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None or job["status"] in ("queued", "running"):
+                return False
+            job["status"] = "queued"
+            job["error"] = ""
+            self.save()
+            self.condition.notify_all()
+        return True
+
+    def clear_finished(self):
+        with self.condition:
+            self.jobs = [x for x in self.jobs if x["status"] in ("queued", "running")]
+            self.save()
+
+    def is_running(self):
+        return bool(self.scheduler_thread and self.scheduler_thread.is_alive())
+
+    def start(self):
+        with self.condition:
+            # Also resumes a scheduler that is still waiting for paused jobs
+            # to wind down
+            self.stopping = False
+            if self.scheduling:
+                self.condition.notify_all()
+                return
+            self.scheduling = True
+            self.scheduler_thread = threading.Thread(
+                target=self._schedule, name="DownloadQueueScheduler", daemon=True
+            )
+            self.scheduler_thread.start()
+
+    def stop(self):
+        # Pauses the queue - running jobs are cancelled and go back to "queued"
+        # so they resume on the next start
+        with self.condition:
+            self.stopping = True
+            for job_id, event in self.cancel_events.items():
+                self.paused.add(job_id)
+                event.set()
+            self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        if self.scheduler_thread:
+            self.scheduler_thread.join(timeout)
+        return not self.is_running()
+
+    def _next_job(self):
+        queued = [x for x in self.jobs if x["status"] == "queued"]
+        if not queued:
+            return None
+        return min(queued, key=lambda x: (-x.get("priority", 0), x.get("added", 0)))
+
+    def _schedule(self):
+        if self.on_start:
+            self.on_start()
+        try:
+            with self.condition:
+                try:
+                    self._schedule_jobs()
+                finally:
+                    # Decided under the same lock start() takes, so a start()
+                    # either keeps this scheduler going or starts a new one
+                    self.scheduling = False
+        finally:
+            if self.on_idle:
+                self.on_idle()
+            self._update_status("Download queue is idle.")
+
+    def _schedule_jobs(self):
+        # Runs with the condition held, returns once there is nothing left
+        # to do (or to wait for after a stop)
+        while True:
+            if self.stopping:
+                if not self.cancel_events:
+                    return
+                self.condition.wait()
+                continue
+            job = (
+                self._next_job() if len(self.cancel_events) < self.concurrency else None
+            )
+            if job is None:
+                if not self.cancel_events and self._next_job() is None:
+                    return
+                self.condition.wait()
+                continue
+            job["status"] = "running"
+            job["error"] = ""
+            cancel_event = threading.Event()
+            self.cancel_events[job["id"]] = cancel_event
+            self.save()
+            threading.Thread(
+                target=self._run_job,
+                args=(job, cancel_event),
+                name="DownloadQueueWorker-{}".format(job["id"]),
+                daemon=True,
+            ).start()
+
+    def _run_job(self, job, cancel_event):
+        def progress(current, total, start_time):
+            with self.lock:
+                job["bytes"] = current
+                job["total"] = total
+
+        status = "done"
+        error = ""
+        try:
+            self.runner(job, cancel_event, progress)
+        except Exception as e:
+            if cancel_event.is_set():
+                status = "cancelled"
+            else:
+                status = "failed"
+                error = str(e)
+        with self.condition:
+            if job["id"] in self.paused:
+                self.paused.discard(job["id"])
+                if status == "cancelled":
+                    status = "queued"
+            job["status"] = status
+            job["error"] = error
+            self.cancel_events.pop(job["id"], None)
+            self.save()
+            self.condition.notify_all()
+        self._update_status(
+            "Queue job {} ({}) finished: {}{}".format(
+                job["id"],
+                job["product"].get("title", job["product"]["product"]),
+                status,
+                " - " + error if error else "",
+            )
+        )
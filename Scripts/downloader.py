@@ -8,6 +8,15 @@ Features:
   - Error handling improvements
   - Speed calculation
   - Byte-range resume support
+  - Stall detection with automatic Range reconnect and jittered backoff
+  - Requests and transfers abort their socket as soon as cancel_event is set
+  - Disk preallocation (fallocate / F_PREALLOCATE) without changing file size
+  - Shared connection pool (requests.Session) across transfers
+  - Per-transfer handles (Transfer) with their own bytes, rate, retries and
+    state, and pause/resume/cancel - one Downloader runs many at once
+  - Optional metrics (bytes, network wait vs disk write time, retries)
+  - Optional per-host tuning of connections and read size (Scripts/tuner.py)
+  - HTTP record/replay (Scripts/http_replay.py) for offline benchmarks
 Usage: Called internally by gibmacos_gui.py
 Dependencies: requests, tqdm (optional)
 License:
@@ -21,27 +30,100 @@ Date:
   - Modifications: 24/06/2025 (DD/MM/YYYY)
 """
 
+import collections
+import contextlib
 import os
+import random
 import requests
+import socket
+import sys
+import threading
 import time
+import urllib.parse
+
+from Scripts import http_replay
+
+# Worth reconnecting for - anything else in the 4xx/5xx range is final
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+class TransferStalled(IOError):
+    pass
+
+
+class RequestCancelled(IOError):
+    pass
 
 
 class Downloader:
-    def __init__(self, skip_w=False, skip_q=False, skip_s=False, interactive=True):
+    def __init__(
+        self,
+        skip_w=False,
+        skip_q=False,
+        skip_s=False,
+        interactive=True,
+        session=None,
+        update_callback=None,
+    ):
         self.prog_len = 20
         self.last_percent = -1
-        self.start_time = 0
         self.indent = 4
-        self.total = -1
         self.interactive = interactive
-        self.bytes_downloaded = 0
-        self.resume_header = {}
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/11.1.2 Safari/605.1.15"
         }
         self.skip_w = skip_w
         self.skip_q = skip_q
         self.skip_s = skip_s
+        # Errors and reconnects are reported here - stderr without one, as
+        # stdout may carry the CLI's JSON output
+        self.update_callback = update_callback
+        # Downloaders created for concurrent transfers can share one session
+        # so that they reuse the same keep-alive connections
+        self.session = session or self.new_session()
+        # Per-download state lives on Transfer objects - see transfer()
+        self.transfers = []
+        self.transfers_lock = threading.Lock()
+        # Optional Scripts/metrics.Metrics instance
+        self.metrics = None
+        # Optional Scripts/tuner.Tuner - picks the read size and caps the
+        # transfers running at once per host, otherwise chunk_size is used
+        # and transfers aren't capped
+        self.tuner = None
+        self.tuner_min_bytes = 4 * 1024**2
+        self.chunk_size = 1024 * 8
+        # Stall detection and reconnect - a transfer averaging less than
+        # stall_threshold bytes/s over stall_window seconds is dropped and
+        # resumed with a Range request after a jittered exponential backoff
+        self.timeout = 30
+        self.stall_threshold = 16 * 1024
+        self.stall_window = 30
+        self.max_retries = 8
+        self.retry_reset_bytes = 1024**2
+        self.backoff_base = 2.0
+        self.backoff_cap = 60.0
+        # Reserve the whole file up front so it is laid out contiguously and
+        # a full disk shows up before the transfer rather than deep into it
+        self.preallocate = True
+
+    @staticmethod
+    def new_session(pool_size=16):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        # GIBGUI_HTTP_RECORD / GIBGUI_HTTP_REPLAY swap in a recording or
+        # replaying adapter
+        http_replay.mount(session, pool_size)
+        return session
+
+    def _update_status(self, message):
+        if self.update_callback:
+            self.update_callback(message)
+        else:
+            print(message, file=sys.stderr)
 
     def resize(self, prog_len):
         self.prog_len = prog_len
@@ -68,24 +150,95 @@ class Downloader:
         else:
             return "{: >3.1f} TB".format(size / 1024**4)
 
-    def get_string(self, url, suppress_errors=False):
+    def fetch(self, url, method="GET", cancel_event=None, stream=False, **kwargs):
+        # Makes the request on a helper thread, so the caller returns as soon
+        # as cancel_event is set instead of when the request finishes - an open
+        # response has its socket shut down, which also ends the helper's read.
+        # With stream=True it returns once the headers are in.
+        kwargs.setdefault("headers", self.headers)
+        kwargs.setdefault("timeout", self.timeout)
+        if cancel_event is None:
+            return self.session.request(method, url, stream=stream, **kwargs)
+        if cancel_event.is_set():
+            raise RequestCancelled("Request cancelled: {}".format(url))
+        result = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                req = self.session.request(method, url, stream=True, **kwargs)
+                result["response"] = req
+                if not stream and not cancel_event.is_set():
+                    req.content
+            except Exception as e:
+                result["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=run, name="Fetch", daemon=True).start()
+        while not done.wait(0.02):
+            if cancel_event.is_set():
+                break
+        if cancel_event.is_set():
+            if "response" in result:
+                self._abort_response(result["response"])
+                if done.is_set():
+                    result["response"].close()
+            raise RequestCancelled("Request cancelled: {}".format(url))
+        if "error" in result:
+            raise result["error"]
+        return result["response"]
+
+    def get_string(self, url, suppress_errors=False, cancel_event=None):
         try:
-            req = requests.get(url, headers=self.headers)
+            req = self.fetch(url, cancel_event=cancel_event)
+            if self.metrics:
+                self.metrics.incr("requests")
             return req.content.decode("utf-8")
+        except RequestCancelled:
+            return None
         except Exception as e:
             if not suppress_errors:
-                print(f"Error getting string from {url}: {e}")
+                self._update_status(f"Error getting string from {url}: {e}")
             return None
 
-    def get_bytes(self, url, suppress_errors=False):
+    def get_bytes(self, url, suppress_errors=False, cancel_event=None):
         try:
-            req = requests.get(url, headers=self.headers)
+            req = self.fetch(url, cancel_event=cancel_event)
+            if self.metrics:
+                self.metrics.incr("requests")
             return req.content
+        except RequestCancelled:
+            return None
         except Exception as e:
             if not suppress_errors:
-                print(f"Error getting bytes from {url}: {e}")
+                self._update_status(f"Error getting bytes from {url}: {e}")
             return None
 
+    def transfer(
+        self,
+        url,
+        file_path,
+        resume_bytes=0,
+        total_bytes=-1,
+        allow_resume=True,
+        callback=None,
+        cancel_event=None,
+    ):
+        # A Transfer keeps its own progress and state, so any number of them
+        # can run on this Downloader at once - run() it in the calling thread
+        # or start() it on its own
+        return Transfer(
+            self,
+            url,
+            file_path,
+            resume_bytes=resume_bytes,
+            total_bytes=total_bytes,
+            allow_resume=allow_resume,
+            callback=callback,
+            cancel_event=cancel_event,
+        )
+
     def stream_to_file(
         self,
         url,
@@ -96,80 +249,469 @@ class Downloader:
         callback=None,
         cancel_event=None,
     ):
+        return self.transfer(
+            url,
+            file_path,
+            resume_bytes=resume_bytes,
+            total_bytes=total_bytes,
+            allow_resume=allow_resume,
+            callback=callback,
+            cancel_event=cancel_event,
+        ).run()
+
+    def list_transfers(self):
+        # Transfers that are running or paused right now
+        with self.transfers_lock:
+            return list(self.transfers)
+
+    @staticmethod
+    def preallocate_file(f, size):
+        # Reserves blocks without changing the file size - size-based resume
+        # keeps working, unlike posix_fallocate which extends the file
         try:
-            self.bytes_downloaded = resume_bytes
-            self.total = total_bytes
-            self.start_time = time.time()
+            if sys.platform.startswith("linux"):
+                import ctypes
 
-            if cancel_event and cancel_event.is_set():
-                return None
+                FALLOC_FL_KEEP_SIZE = 1
+                libc = ctypes.CDLL(None, use_errno=True)
+                libc.fallocate.argtypes = [
+                    ctypes.c_int,
+                    ctypes.c_int,
+                    ctypes.c_longlong,
+                    ctypes.c_longlong,
+                ]
+                return libc.fallocate(f.fileno(), FALLOC_FL_KEEP_SIZE, 0, size) == 0
+            if sys.platform == "darwin":
+                import ctypes
 
-            self.resume_header = (
-                {"Range": "bytes={}-".format(resume_bytes)}
-                if allow_resume and resume_bytes > 0
-                else {}
-            )
+                class fstore_t(ctypes.Structure):
+                    _fields_ = [
+                        ("fst_flags", ctypes.c_uint),
+                        ("fst_posmode", ctypes.c_int),
+                        ("fst_offset", ctypes.c_longlong),
+                        ("fst_length", ctypes.c_longlong),
+                        ("fst_bytesalloc", ctypes.c_longlong),
+                    ]
 
-            if self.total == -1 and allow_resume and resume_bytes > 0:
-                try:
-                    if cancel_event and cancel_event.is_set():
-                        return None
-                    self.total = int(
-                        requests.head(url, headers=self.headers).headers[
-                            "Content-Length"
-                        ]
+                F_ALLOCATECONTIG, F_ALLOCATEALL = 0x2, 0x4
+                F_PEOFPOSMODE, F_PREALLOCATE = 3, 42
+                remaining = size - os.fstat(f.fileno()).st_size
+                if remaining <= 0:
+                    return True
+                store = fstore_t(
+                    F_ALLOCATECONTIG | F_ALLOCATEALL, F_PEOFPOSMODE, 0, remaining, 0
+                )
+                libc = ctypes.CDLL(None, use_errno=True)
+                if libc.fcntl(f.fileno(), F_PREALLOCATE, ctypes.byref(store)) == -1:
+                    # Contiguous space isn't available - settle for any
+                    store.fst_flags = F_ALLOCATEALL
+                    return (
+                        libc.fcntl(f.fileno(), F_PREALLOCATE, ctypes.byref(store)) != -1
                     )
-                except:
+                return True
+        except Exception:
+            pass
+        return False
+
+    @staticmethod
+    def _abort_response(req):
+        # Shutting the socket down unblocks a read waiting in another thread,
+        # the reading thread closes the response itself
+        try:
+            req.raw._fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+
+
+class AnyEvent:
+    # is_set()/wait() across several threading.Events (None is ignored)
+    def __init__(self, *events):
+        self.events = [x for x in events if x is not None]
+
+    def is_set(self):
+        return any(x.is_set() for x in self.events)
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            remaining = 0.05 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(0.05, remaining))
+        return True
+
+
+class Transfer:
+    STATES = ("pending", "running", "paused", "done", "failed", "cancelled")
+
+    def __init__(
+        self,
+        downloader,
+        url,
+        file_path,
+        resume_bytes=0,
+        total_bytes=-1,
+        allow_resume=True,
+        callback=None,
+        cancel_event=None,
+    ):
+        self.downloader = downloader
+        self.url = url
+        self.host = urllib.parse.urlsplit(url).netloc
+        self.file_path = file_path
+        self.allow_resume = allow_resume
+        self.callback = callback
+        self.bytes_downloaded = resume_bytes if allow_resume else 0
+        self.total = total_bytes
+        self.start_time = 0
+        self.finish_time = None
+        self.resume_header = {}
+        self.response_headers = {}
+        self.retries = 0
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.pause_event = threading.Event()
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        # The caller's cancel_event stops the transfer as well as cancel(),
+        # pause() only stops the current connection
+        self.cancelled = AnyEvent(cancel_event, self.cancel_event)
+        self.stop_event = AnyEvent(cancel_event, self.cancel_event, self.pause_event)
+        # (monotonic time, bytes) about every half second for the live rate
+        self.samples = collections.deque(maxlen=11)
+        # Bytes already passed on to the tuner
+        self.tuned_bytes = self.bytes_downloaded
+        self.thread = None
+
+    @property
+    def active(self):
+        return self.state in ("pending", "running", "paused")
+
+    @property
+    def rate(self):
+        # Bytes per second over the last few seconds
+        if self.state != "running" or len(self.samples) < 2:
+            return 0
+        (t0, b0), (t1, b1) = self.samples[0], self.samples[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "file": self.file_path,
+            "state": self.state,
+            "bytes": self.bytes_downloaded,
+            "total": self.total,
+            "rate": int(self.rate),
+            "retries": self.retries,
+            "elapsed": (
+                (self.finish_time or time.time()) - self.start_time
+                if self.start_time
+                else 0
+            ),
+            "error": str(self.error) if self.error else None,
+        }
+
+    def pause(self):
+        # The connection is dropped - resume() reconnects with a Range request
+        # from whatever reached the disk
+        self.pause_event.set()
+
+    def resume(self):
+        self.pause_event.clear()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="Transfer", daemon=True)
+        self.thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def run(self):
+        # Returns file_path once the file is complete, None when the transfer
+        # failed or was cancelled
+        self.state = "running"
+        self.start_time = time.time()
+        with self.downloader.transfers_lock:
+            self.downloader.transfers.append(self)
+        try:
+            while True:
+                self.result = self._run_slot()
+                if self.result is not None:
+                    self.state = "done"
+                    break
+                if self.cancelled.is_set():
+                    self.state = "cancelled"
+                    break
+                if not self.pause_event.is_set():
+                    self.state = "failed"
+                    break
+                self.state = "paused"
+                while self.pause_event.is_set() and not self.cancelled.wait(0.1):
                     pass
+                if self.cancelled.is_set():
+                    self.state = "cancelled"
+                    break
+                self.state = "running"
+                self.allow_resume = True
+        except Exception as e:
+            self.error = e
+            self.state = "failed"
+        finally:
+            self.finish_time = time.time()
+            with self.downloader.transfers_lock:
+                if self in self.downloader.transfers:
+                    self.downloader.transfers.remove(self)
+            self.done_event.set()
+        return self.result
+
+    def _run_slot(self):
+        # Paused or cancelled transfers don't hold on to a host slot
+        tuner = self.downloader.tuner
+        if tuner is None:
+            return self._run_attempts()
+        if not tuner.acquire(self.host, self.stop_event):
+            return None
+        try:
+            return self._run_attempts()
+        finally:
+            tuner.release(self.host)
 
-            if cancel_event and cancel_event.is_set():
+    def _progress(self):
+        now = time.monotonic()
+        if not self.samples or now - self.samples[-1][0] >= 0.5:
+            self.samples.append((now, self.bytes_downloaded))
+            tuner = self.downloader.tuner
+            if tuner:
+                tuner.add_bytes(
+                    self.host, max(0, self.bytes_downloaded - self.tuned_bytes)
+                )
+                self.tuned_bytes = self.bytes_downloaded
+        if self.callback:
+            self.callback(self.bytes_downloaded, self.total, self.start_time)
+
+    def _run_attempts(self):
+        d = self.downloader
+        file_path = self.file_path
+        failures = 0
+
+        while True:
+            if self.stop_event.is_set():
+                return None
+            attempt_start = self.bytes_downloaded
+            try:
+                return self._stream_attempt()
+            except RequestCancelled:
+                return None
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code
+                if status == 416 and self.allow_resume and self.bytes_downloaded > 0:
+                    d._update_status(
+                        f"Server returned 416. Retrying download from scratch for {os.path.basename(file_path)}."
+                    )
+                    self.retries += 1
+                    if d.metrics:
+                        d.metrics.incr("retries")
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                    self.bytes_downloaded = 0
+                    self.total = -1
+                    self.allow_resume = False
+                    continue
+                if status not in RETRY_STATUS_CODES:
+                    d._update_status(f"Download failed due to HTTP error: {e}")
+                    self.error = e
+                    return None
+                error = e
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                TransferStalled,
+            ) as e:
+                error = e
+            except Exception as e:
+                d._update_status(f"Download failed due to unexpected error: {e}")
+                self.error = e
                 return None
 
-            req = requests.get(
-                url,
-                headers={**self.headers, **self.resume_header},
-                stream=True,
-                timeout=30,
+            # The budget counts consecutive failures - an attempt that moved
+            # real data before dropping starts the count again
+            if self.bytes_downloaded - attempt_start >= d.retry_reset_bytes:
+                failures = 0
+            failures += 1
+            if failures > d.max_retries:
+                d._update_status(
+                    f"Download failed after {d.max_retries} retries: {error}"
+                )
+                self.error = error
+                return None
+            delay = min(d.backoff_cap, d.backoff_base * 2 ** (failures - 1))
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            d._update_status(
+                "{} - reconnecting {} at {} in {:.1f}s (retry {} of {})".format(
+                    error,
+                    os.path.basename(file_path),
+                    d.get_size(self.bytes_downloaded).strip(),
+                    delay,
+                    failures,
+                    d.max_retries,
+                )
             )
+            self.retries += 1
+            if d.metrics:
+                d.metrics.incr("retries")
+            if d.tuner:
+                d.tuner.add_error(self.host)
+            # Whatever reached the disk is kept and resumed with a Range request
+            self.allow_resume = True
+            if self.stop_event.wait(delay):
+                return None
+
+    def _stream_attempt(self):
+        d = self.downloader
+        file_path = self.file_path
+        stop_event = self.stop_event
+        # Resume from the last byte that actually made it to disk
+        if self.allow_resume and os.path.exists(file_path):
+            self.bytes_downloaded = os.path.getsize(file_path)
+        elif not self.allow_resume:
+            self.bytes_downloaded = 0
+        offset = self.tuned_bytes = self.bytes_downloaded
+
+        self.resume_header = (
+            {"Range": "bytes={}-".format(offset)}
+            if self.allow_resume and offset > 0
+            else {}
+        )
+        req = d.fetch(
+            self.url,
+            headers={**d.headers, **self.resume_header},
+            stream=True,
+            cancel_event=stop_event,
+        )
+        if d.metrics:
+            d.metrics.incr("requests")
+
+        with contextlib.closing(req):
+            req.raise_for_status()
+            self.response_headers = req.headers
+            mode = "ab" if self.resume_header else "wb"
+            if self.resume_header and req.status_code != 206:
+                # The server ignored the Range header and sent the whole file
+                mode = "wb"
+                self.bytes_downloaded = offset = 0
 
             if self.total == -1:
                 try:
-                    self.total = int(req.headers["Content-Length"])
+                    content_range = req.headers.get("Content-Range", "")
+                    if "/" in content_range:
+                        self.total = int(content_range.rsplit("/", 1)[1])
+                    else:
+                        self.total = offset + int(req.headers["Content-Length"])
                 except:
                     pass
 
-            chunk_size = 1024 * 8  # Increased chunk size for better performance
-
-            with open(file_path, "ab" if allow_resume else "wb") as f:
-                for chunk in req.iter_content(chunk_size=chunk_size):
-                    if cancel_event and cancel_event.is_set():
-                        return None
-                    if chunk:
-                        f.write(chunk)
-                        self.bytes_downloaded += len(chunk)
-                        if callback:
-                            callback(self.bytes_downloaded, self.total, self.start_time)
-            return file_path
-
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 416 and allow_resume and resume_bytes > 0:
-                print(
-                    f"Server returned 416. Retrying download from scratch for {os.path.basename(file_path)}."
+            tuner = d.tuner
+            chunk_size = tuner.get(self.host, "chunk_size") if tuner else d.chunk_size
+
+            done = threading.Event()
+            stalled = threading.Event()
+            watchdog = threading.Thread(
+                target=self._watch_stall,
+                args=(req, done, stalled),
+                daemon=True,
+            )
+            watchdog.start()
+
+            # Time spent waiting on the network vs blocked on disk writes
+            network_time = disk_time = 0.0
+            try:
+                with open(file_path, mode) as f:
+                    if d.preallocate and self.total > 0:
+                        d.preallocate_file(f, self.total)
+                    chunks = req.iter_content(chunk_size=chunk_size)
+                    while True:
+                        t0 = time.perf_counter()
+                        try:
+                            chunk = next(chunks, None)
+                        except Exception:
+                            if stop_event.is_set():
+                                return None
+                            if stalled.is_set():
+                                break
+                            raise
+                        t1 = time.perf_counter()
+                        network_time += t1 - t0
+                        if chunk is None:
+                            break
+                        if stop_event.is_set():
+                            return None
+                        if chunk:
+                            f.write(chunk)
+                            disk_time += time.perf_counter() - t1
+                            self.bytes_downloaded += len(chunk)
+                            self._progress()
+            finally:
+                done.set()
+                if d.metrics:
+                    d.metrics.observe("network_wait", network_time)
+                    d.metrics.observe("disk_write", disk_time)
+                    d.metrics.incr("downloaded_bytes", self.bytes_downloaded - offset)
+                # Read size is judged on the attempt's own rate, and only
+                # once it moved enough to mean something
+                moved = self.bytes_downloaded - offset
+                if tuner and moved >= d.tuner_min_bytes:
+                    tuner.record(
+                        self.host,
+                        "chunk_size",
+                        chunk_size,
+                        moved / max(network_time + disk_time, 1e-6),
+                    )
+
+        if stalled.is_set():
+            raise TransferStalled(
+                "Transfer stalled below {}/s for {}s".format(
+                    d.get_size(d.stall_threshold).strip(), d.stall_window
                 )
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                return self.stream_to_file(
-                    url,
-                    file_path,
-                    resume_bytes=0,
-                    total_bytes=-1,
-                    allow_resume=False,
-                    callback=callback,
-                    cancel_event=cancel_event,
+            )
+        if self.total > 0 and self.bytes_downloaded < self.total:
+            raise requests.exceptions.ConnectionError(
+                "Connection closed after {} of {}".format(
+                    d.get_size(self.bytes_downloaded).strip(),
+                    d.get_size(self.total).strip(),
                 )
-            else:
-                print(f"Download failed due to HTTP error: {e}")
-                return None
-        except Exception as e:
-            print(f"Download failed due to unexpected error: {e}")
-            return None
+            )
+        return file_path
+
+    def _watch_stall(self, req, done, stalled):
+        # Samples progress once a second and drops the connection when less
+        # than stall_threshold bytes/s arrived over the last stall_window
+        # seconds - or right away on cancel or pause, so a read blocked on
+        # the socket doesn't hold them up
+        d = self.downloader
+        samples = collections.deque([(time.monotonic(), self.bytes_downloaded)])
+        next_sample = time.monotonic() + 1.0
+        while not done.wait(0.05):
+            if self.stop_event.is_set():
+                d._abort_response(req)
+                return
+            now = time.monotonic()
+            if now < next_sample:
+                continue
+            next_sample = now + 1.0
+            samples.append((now, self.bytes_downloaded))
+            while len(samples) > 2 and samples[1][0] <= now - d.stall_window:
+                samples.popleft()
+            elapsed = now - samples[0][0]
+            if elapsed < d.stall_window:
+                continue
+            if (samples[-1][1] - samples[0][1]) / elapsed < d.stall_threshold:
+                stalled.set()
+                d._abort_response(req)
+                return
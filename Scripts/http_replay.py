@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Title: HTTP Record/Replay
+Description: Record and replay transport adapters for the gibMacOS GUI Downloader
+Features:
+  - Records every request made through Downloader sessions to a zip archive
+    (catalogs, SMD, dist files and package response headers)
+  - Response bodies stored once per content (deduplicated) and compressed
+  - Streamed responses keep their headers and size only, replay sends zeros
+    of the recorded length - unless the body is read whole through .content,
+    so package downloads stay small and cancellable fetches keep their body
+  - Replay with the recorded timing, or with delays scaled up or down
+  - Requests that are not in the archive fail instead of going to the network
+Usage:
+  - GIBGUI_HTTP_RECORD=refresh.zip python gibmacos_cli.py refresh
+  - GIBGUI_HTTP_REPLAY=refresh.zip GIBGUI_REPLAY_SCALE=0 python gibmacos_cli.py refresh
+  - python benchmarks/bench.py --replay refresh.zip
+Dependencies: requests
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import atexit
+import collections
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+import requests
+from urllib3.response import HTTPResponse
+
+from Scripts import persist
+
+ARCHIVE_VERSION = 1
+# Bodies are stored decoded, the replayed response has a fixed length
+DROP_HEADERS = ("content-encoding", "transfer-encoding", "connection")
+
+_lock = threading.Lock()
+# One recorder or replayer per archive, shared by every session
+_recorders = {}
+_replayers = {}
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        self.exchanges = []
+        self.bodies = {}
+        self.lock = threading.Lock()
+        atexit.register(self.save)
+
+    def add(self, request, response=None, elapsed=0.0, body=None, error=None):
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "range": request.headers.get("Range", ""),
+            "elapsed": round(elapsed, 6),
+        }
+        if error is not None:
+            entry["error"] = type(error).__name__
+            entry["message"] = str(error)
+        else:
+            headers = {
+                k: v
+                for k, v in response.headers.items()
+                if k.lower() not in DROP_HEADERS
+            }
+            entry.update(status=response.status_code, reason=response.reason)
+            entry["headers"] = headers
+        with self.lock:
+            if body is not None:
+                self._set_body(entry, body)
+            self.exchanges.append(entry)
+        return entry
+
+    def add_body(self, entry, body, elapsed):
+        # For a streamed response whose body was read after add()
+        with self.lock:
+            self._set_body(entry, body)
+            entry["elapsed"] = round(elapsed, 6)
+
+    def _set_body(self, entry, body):
+        entry["headers"]["Content-Length"] = str(len(body))
+        entry["body"] = hashlib.sha1(body).hexdigest()
+        self.bodies.setdefault(entry["body"], body)
+
+    def save(self):
+        with self.lock:
+            if not self.exchanges:
+                return
+            data = io.BytesIO()
+            with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr(
+                    "index.json",
+                    json.dumps(
+                        {"version": ARCHIVE_VERSION, "exchanges": self.exchanges}
+                    ),
+                )
+                for name, body in self.bodies.items():
+                    archive.writestr("bodies/" + name, body)
+            persist.write_atomic(self.path, data.getvalue())
+
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, recorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+
+    def send(self, request, stream=False, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+            body = None
+            if not stream:
+                # Read here so the transfer time is part of the recording -
+                # the response keeps the content for the caller
+                body = response.content
+        except requests.exceptions.RequestException as e:
+            self.recorder.add(request, elapsed=time.perf_counter() - start, error=e)
+            raise
+        entry = self.recorder.add(
+            request, response, elapsed=time.perf_counter() - start, body=body
+        )
+        if stream:
+            response.__class__ = RecordedResponse
+            response.recording = (self.recorder, entry, start)
+        return response
+
+
+class RecordedResponse(requests.Response):
+    # A streamed response that records its body if the caller reads all of it
+    # through .content - Downloader.fetch streams every cancellable request
+    recording = None
+
+    @property
+    def content(self):
+        body = super().content
+        if self.recording is not None and isinstance(body, bytes):
+            recorder, entry, start = self.recording
+            self.recording = None
+            recorder.add_body(entry, body, elapsed=time.perf_counter() - start)
+        return body
+
+
+class ZeroBody(io.RawIOBase):
+    # Stands in for a package body that was not recorded
+    def __init__(self, size):
+        self.remaining = max(0, size)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self.remaining)
+        b[:n] = bytes(n)
+        self.remaining -= n
+        return n
+
+
+class Replayer:
+    def __init__(self, path, scale=1.0):
+        self.path = path
+        self.scale = scale
+        self.archive = zipfile.ZipFile(path, "r")
+        index = json.loads(self.archive.read("index.json"))
+        # Identical requests get the recorded responses in order, the last
+        # one repeats once they run out
+        self.queues = collections.defaultdict(collections.deque)
+        for entry in index["exchanges"]:
+            self.queues[self.key(entry["method"], entry["url"], entry["range"])].append(
+                entry
+            )
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(method, url, range_header):
+        return (method.upper(), url, range_header or "")
+
+    def catalog_url(self):
+        for (method, url, range_header), queue in self.queues.items():
+            if method == "GET" and ".sucatalog" in url:
+                return url
+        return None
+
+    def lookup(self, request):
+        key = self.key(request.method, request.url, request.headers.get("Range"))
+        with self.lock:
+            self.requests += 1
+            queue = self.queues.get(key)
+            if not queue:
+                self.misses += 1
+                return None
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def read_body(self, entry):
+        with self.lock:
+            return self.archive.read("bodies/" + entry["body"])
+
+
+class ReplayAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, replayer, **kwargs):
+        super().__init__(**kwargs)
+        self.replayer = replayer
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        entry = self.replayer.lookup(request)
+        if entry is None:
+            raise requests.exceptions.ConnectionError(
+                "No recorded response for {} {}".format(request.method, request.url),
+                request=request,
+            )
+        if self.replayer.scale > 0:
+            time.sleep(entry["elapsed"] * self.replayer.scale)
+        if "error" in entry:
+            error = getattr(requests.exceptions, entry["error"], None)
+            if not (
+                isinstance(error, type)
+                and issubclass(error, requests.exceptions.RequestException)
+            ):
+                error = requests.exceptions.ConnectionError
+            raise error(entry["message"], request=request)
+        if "body" in entry:
+            body = io.BytesIO(self.replayer.read_body(entry))
+        else:
+            try:
+                size = int(entry["headers"].get("Content-Length", 0))
+            except ValueError:
+                size = 0
+            body = io.BufferedReader(ZeroBody(0 if request.method == "HEAD" else size))
+        raw = HTTPResponse(
+            body=body,
+            headers=entry["headers"],
+            status=entry["status"],
+            reason=entry["reason"],
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
+
+
+def get_recorder(path):
+    path = os.path.abspath(path)
+    with _lock:
+        if not path in _recorders:
+            _recorders[path] = Recorder(path)
+        return _recorders[path]
+
+
+def get_replayer(path, scale=1.0):
+    path = os.path.abspath(path)
+    with _lock:
+        if not path in _replayers:
+            _replayers[path] = Replayer(path, scale=scale)
+        return _replayers[path]
+
+
+def mount(session, pool_size=16):
+    # Puts the adapter named by GIBGUI_HTTP_REPLAY / GIBGUI_HTTP_RECORD on a
+    # session - every session shares the same recorder or replayer
+    replay = os.environ.get("GIBGUI_HTTP_REPLAY")
+    record = os.environ.get("GIBGUI_HTTP_RECORD")
+    if replay:
+        try:
+            scale = float(os.environ.get("GIBGUI_REPLAY_SCALE", 1.0))
+        except ValueError:
+            scale = 1.0
+        adapter = ReplayAdapter(get_replayer(replay, scale=scale))
+    elif record:
+        adapter = RecordingAdapter(
+            get_recorder(record), pool_connections=pool_size, pool_maxsize=pool_size
+        )
+    else:
+        return False
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return True
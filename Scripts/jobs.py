@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Title: Job Executor
+Description: Bounded worker pool for gibMacOS GUI backend operations
+Features:
+  - Jobs with an ID, kind, status, result and error
+  - Each job has its own cancellation token (a threading.Event)
+  - Catalog refreshes, scans and downloads can run side by side
+  - Completion callbacks for the UI
+Usage: GibMacOSBackend.jobs.submit("Refresh", task, kind="refresh")
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import concurrent.futures
+import itertools
+import threading
+import time
+
+
+class Job:
+    STATUSES = ("pending", "running", "done", "failed", "cancelled")
+
+    def __init__(self, job_id, name, kind, func, args, kwargs, on_done=None):
+        self.id = job_id
+        self.name = name
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        # Handed to backend calls as their cancel_event
+        self.cancel_event = threading.Event()
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.added = time.time()
+        self.started = None
+        self.finished = None
+        self.done_event = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ("pending", "running")
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def __repr__(self):
+        return "Job({!r}, {!r}, status={!r})".format(self.id, self.name, self.status)
+
+
+class JobExecutor:
+    def __init__(self, max_workers=4, update_callback=None):
+        self.max_workers = max(1, int(max_workers))
+        self.update_callback = update_callback
+        self.pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="Job"
+        )
+        self.jobs = {}
+        self.history = 50
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def _update_status(self, message):
+        if self.update_callback:
+            self.update_callback(message)
+
+    def submit(self, name, func, *args, kind=None, on_done=None, **kwargs):
+        # func is called as func(job, *args, **kwargs) and should pass
+        # job.cancel_event on to whatever it runs
+        with self.lock:
+            job = Job(
+                next(self.ids), name, kind or name, func, args, kwargs, on_done=on_done
+            )
+            self.jobs[job.id] = job
+            # Finished jobs are kept for a while so results can be looked up
+            finished = [x for x in self.jobs.values() if not x.active]
+            for old in finished[: max(0, len(finished) - self.history)]:
+                del self.jobs[old.id]
+        self.pool.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            # Cancelled while it was waiting for a worker
+            return self._finish(job, "cancelled")
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = job.func(job, *job.args, **job.kwargs)
+        except Exception as e:
+            job.error = e
+            return self._finish(
+                job, "cancelled" if job.cancel_event.is_set() else "failed"
+            )
+        self._finish(job, "done")
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        job.done_event.set()
+        if job.on_done:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                self._update_status("Job {} callback failed: {}".format(job.name, e))
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self, kind=None, active_only=False):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [
+            x
+            for x in jobs
+            if (kind is None or x.kind == kind) and (x.active or not active_only)
+        ]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+        return job
+
+    def cancel_all(self, kind=None):
+        jobs = self.list_jobs(kind=kind, active_only=True)
+        for job in jobs:
+            job.cancel()
+        return jobs
+
+    def clear_finished(self):
+        with self.lock:
+            for job_id in [x for x, job in self.jobs.items() if not job.active]:
+                del self.jobs[job_id]
+
+    def shutdown(self, cancel=True, timeout=None):
+        if cancel:
+            self.cancel_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in self.list_jobs(active_only=True):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            job.wait(remaining)
+        self.pool.shutdown(wait=False)
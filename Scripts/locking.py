@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Title: Locking
+Description: Advisory file locks and lease files shared between gibMacOS GUI processes
+Features:
+  - Exclusive advisory locks (flock on POSIX, msvcrt.locking on Windows)
+  - Works between threads too - every acquire opens its own handle
+  - Released by the OS when the holder exits, so a crash never leaves a
+    stale lock behind
+  - Lock files are removed on release, without racing a waiting process
+  - Leases record who holds them (pid, host, start time, URL)
+Usage: GibMacOSBackend._download_package (package leases), Persister (cache writes)
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import json
+import os
+import socket
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _try_lock(fd):
+    try:
+        if os.name == "nt":
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd):
+    try:
+        if os.name == "nt":
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    except OSError:
+        pass
+
+
+class FileLock:
+    def __init__(self, path, poll=0.1):
+        self.path = path
+        self.poll = poll
+        self.fd = None
+
+    @property
+    def locked(self):
+        return self.fd is not None
+
+    def acquire(self, blocking=True, timeout=None, cancel_event=None):
+        # True once held - False when not blocking, on timeout or when
+        # cancel_event was set first
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if _try_lock(fd):
+                # The last holder removes the file on release - a handle
+                # opened before that points at a file nobody else will lock
+                try:
+                    current = os.path.samestat(os.fstat(fd), os.stat(self.path))
+                except OSError:
+                    current = False
+                if current:
+                    self.fd = fd
+                    return True
+                _unlock(fd)
+            os.close(fd)
+            if not blocking:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if cancel_event is not None:
+                if cancel_event.wait(self.poll):
+                    return False
+            else:
+                time.sleep(self.poll)
+
+    def release(self):
+        if self.fd is None:
+            return
+        if os.name != "nt":
+            # Removed while still held, so nobody can lock the old file
+            # after this and think they hold the new one
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        _unlock(self.fd)
+        os.close(self.fd)
+        self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class Lease(FileLock):
+    # A FileLock that says who holds it, for whoever is waiting on it
+    def acquire(self, blocking=True, timeout=None, cancel_event=None, info=None):
+        if not super().acquire(blocking, timeout, cancel_event):
+            return False
+        data = {
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "started": time.time(),
+        }
+        data.update(info or {})
+        try:
+            os.ftruncate(self.fd, 0)
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            os.write(self.fd, json.dumps(data).encode("utf-8"))
+        except OSError:
+            pass
+        return True
+
+    def holder(self):
+        # What the current holder wrote, {} when it can't be read
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except:
+            return {}
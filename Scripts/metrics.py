@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Title: Performance Metrics
+Description: Per-phase timers and counters for the gibMacOS GUI backend
+Features:
+  - Thread-safe phase timers (count, total, max) and counters
+  - Per-operation summaries from snapshot deltas
+  - JSON and Prometheus text exposition export
+Usage: Created by GibMacOSBackend, shared with its Downloader instances
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import contextlib
+import functools
+import json
+import re
+import threading
+import time
+
+from Scripts import persist
+
+
+def timed(name):
+    # Method decorator - times the call on the instance's "metrics" attribute
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.phase(name):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class Metrics:
+    def __init__(self, prefix="gibmacos"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds, count=1):
+        with self.lock:
+            timer = self.timers.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            timer["count"] += count
+            timer["total"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "timers": {k: dict(v) for k, v in self.timers.items()},
+                "counters": dict(self.counters),
+            }
+
+    def delta(self, since):
+        now = self.snapshot()
+        timers = {}
+        for name, timer in now["timers"].items():
+            old = since["timers"].get(name, {"count": 0, "total": 0.0})
+            if timer["count"] != old["count"]:
+                timers[name] = {
+                    "count": timer["count"] - old["count"],
+                    "total": timer["total"] - old["total"],
+                }
+        counters = {}
+        for name, value in now["counters"].items():
+            if value != since["counters"].get(name, 0):
+                counters[name] = value - since["counters"].get(name, 0)
+        return {"timers": timers, "counters": counters}
+
+    def summary(self, operation, since, elapsed, get_size=None):
+        delta = self.delta(since)
+        parts = [
+            "{} {:.2f}s{}".format(
+                name,
+                timer["total"],
+                " (x{})".format(timer["count"]) if timer["count"] > 1 else "",
+            )
+            for name, timer in sorted(delta["timers"].items())
+        ]
+        for name, value in sorted(delta["counters"].items()):
+            if name.endswith("_bytes") and get_size:
+                parts.append("{} {}".format(name, get_size(value).strip()))
+            else:
+                parts.append("{} {}".format(name, value))
+        return "Metrics for {} ({:.2f}s): {}".format(
+            operation, elapsed, ", ".join(parts) if parts else "no activity"
+        )
+
+    def to_json(self):
+        return json.dumps(dict(self.snapshot(), exported=time.time()), indent=2)
+
+    def to_prometheus(self):
+        def metric_name(name):
+            return "{}_{}".format(self.prefix, re.sub(r"[^a-zA-Z0-9_]", "_", name))
+
+        snapshot = self.snapshot()
+        lines = []
+        for name, timer in sorted(snapshot["timers"].items()):
+            name = metric_name(name) + "_seconds"
+            lines.append("# TYPE {} summary".format(name))
+            lines.append("{}_count {}".format(name, timer["count"]))
+            lines.append("{}_sum {:.6f}".format(name, timer["total"]))
+            lines.append("# TYPE {}_max gauge".format(name))
+            lines.append("{}_max {:.6f}".format(name, timer["max"]))
+        for name, value in sorted(snapshot["counters"].items()):
+            name = metric_name(name) + "_total"
+            lines.append("# TYPE {} counter".format(name))
+            lines.append("{} {}".format(name, value))
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, fmt="json"):
+        data = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        persist.write_atomic(path, data.encode("utf-8"))
+        return path
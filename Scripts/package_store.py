@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Title: Package Store
+Description: Content-addressed local store for downloaded gibMacOS packages
+Features:
+  - Packages keyed by catalog digest, or by URL + size when there is none
+  - Product folders populated with hard links (reflinks/copies as fallback)
+  - Existing complete downloads adopted into the store
+  - Pruning of objects no product folder links to anymore, skipping
+    objects a download holds the lease on
+Usage: Used by GibMacOSBackend.download_prod when use_package_store is enabled
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import sys
+import threading
+
+from Scripts import locking
+
+
+class PackageStore:
+    def __init__(self, root):
+        self.root = root
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+
+    def key_for(self, package):
+        digest = str(package.get("Digest", "")).lower()
+        if re.match(r"^[0-9a-f]{40}$", digest):
+            return "sha1-" + digest
+        return (
+            "url-"
+            + hashlib.sha256(
+                "{}|{}".format(package["URL"], package.get("Size", -1)).encode("utf-8")
+            ).hexdigest()
+        )
+
+    def object_path(self, package):
+        key = self.key_for(package)
+        return os.path.join(
+            self.root, "objects", key[-2:], key, os.path.basename(package["URL"])
+        )
+
+    def lock_for(self, package):
+        # Serialises downloads of the same object between threads
+        key = self.key_for(package)
+        with self.locks_lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def is_complete(self, package, path=None):
+        path = path or self.object_path(package)
+        size = package.get("Size", -1)
+        return os.path.isfile(path) and size > 0 and os.path.getsize(path) == size
+
+    def adopt(self, package, existing_path):
+        # Pulls a complete file downloaded before the store existed into it
+        store_path = self.object_path(package)
+        if self.is_complete(package, store_path) or not self.is_complete(
+            package, existing_path
+        ):
+            return False
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        if os.path.exists(store_path):
+            os.remove(store_path)
+        self._link(existing_path, store_path)
+        return True
+
+    def link_into(self, package, dest_path):
+        store_path = self.object_path(package)
+        if os.path.exists(dest_path):
+            if os.path.samefile(store_path, dest_path):
+                return "existing"
+            os.remove(dest_path)
+        return self._link(store_path, dest_path)
+
+    def prune(self):
+        removed = freed = 0
+        objects_dir = os.path.join(self.root, "objects")
+        for path, dirs, files in os.walk(objects_dir, topdown=False):
+            for name in files:
+                if name.endswith((".lease", ".lock")):
+                    continue
+                file_path = os.path.join(path, name)
+                # An object (or its .part) is only touched while holding its
+                # lease - a download in any process holds it until the file
+                # is complete and linked
+                object_path = (
+                    file_path[: -len(".part")] if name.endswith(".part") else file_path
+                )
+                lease = locking.Lease(object_path + ".lease")
+                try:
+                    if not lease.acquire(blocking=False):
+                        continue
+                except OSError:
+                    continue
+                try:
+                    st = os.stat(file_path)
+                    if st.st_nlink > 1:
+                        continue
+                    os.remove(file_path)
+                    removed += 1
+                    freed += st.st_size
+                except OSError:
+                    pass
+                finally:
+                    lease.release()
+            if path != objects_dir and not os.listdir(path):
+                os.rmdir(path)
+        return removed, freed
+
+    def _link(self, src, dst):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+        try:
+            if self._reflink(src, dst):
+                return "reflink"
+        except Exception:
+            if os.path.exists(dst):
+                os.remove(dst)
+        shutil.copy2(src, dst)
+        return "copy"
+
+    def _reflink(self, src, dst):
+        if sys.platform.startswith("linux"):
+            import fcntl
+
+            FICLONE = 0x40049409
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        if sys.platform == "darwin":
+            import ctypes
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.clonefile(src.encode("utf-8"), dst.encode("utf-8"), 0) == 0:
+                return True
+        return False
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Title: Persistence
+Description: Debounced, atomic background writes for gibMacOS GUI state files
+Features:
+  - Crash-safe writes (temp file + fsync + rename + directory fsync)
+  - Rapid saves of the same file coalesced into one write
+  - Writes done on a background thread, off the Tk thread
+  - Pending writes flushed on exit
+  - Writes serialized between processes with an advisory lock
+    (Scripts/locking.py) held while serialize() runs, so it can merge in
+    what another process wrote
+Usage: GibMacOSBackend.persister - settings, prod_cache, local catalog, download queue
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+
+from Scripts import locking
+
+
+def write_atomic(path, data):
+    # Readers see either the old file or the new one, never a partial write
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if os.name == "posix":
+        # Makes the rename itself durable
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+
+class Persister:
+    def __init__(self, delay=1.0, update_callback=None):
+        self.delay = delay
+        self.update_callback = update_callback
+        # path -> (due time, serialize)
+        self.pending = {}
+        self.condition = threading.Condition()
+        # Held while a file is written, so a newer version is never
+        # overtaken by an older one
+        self.write_lock = threading.Lock()
+        # Seconds to wait for another process writing the same file
+        self.lock_timeout = 30
+        self.thread = None
+        atexit.register(self.flush)
+
+    def _update_status(self, message):
+        if self.update_callback:
+            self.update_callback(message)
+
+    def schedule(self, path, serialize, delay=None):
+        # serialize() returns bytes and runs on the writer thread - it should
+        # work on a snapshot, not on an object that is still being changed
+        due = time.monotonic() + (self.delay if delay is None else delay)
+        with self.condition:
+            if path in self.pending:
+                # Coalesce, but never push an already scheduled write back
+                due = min(due, self.pending[path][0])
+            self.pending[path] = (due, serialize)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, name="Persister", daemon=True
+                )
+                self.thread.start()
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                path, (due, serialize) = min(
+                    self.pending.items(), key=lambda item: item[1][0]
+                )
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+            with self.write_lock:
+                with self.condition:
+                    entry = self.pending.pop(path, None)
+                if entry:
+                    self._write(path, entry[1])
+
+    def _write(self, path, serialize):
+        lock = locking.FileLock(path + ".lock")
+        try:
+            if not lock.acquire(timeout=self.lock_timeout):
+                self._update_status(
+                    "{} is locked by another process, saving anyway".format(path)
+                )
+            write_atomic(path, serialize())
+        except Exception as e:
+            self._update_status("Failed to save {}: {}".format(path, e))
+        finally:
+            lock.release()
+
+    def flush(self):
+        # Writes everything that is pending right now, on the calling thread
+        with self.write_lock:
+            with self.condition:
+                pending = list(self.pending.items())
+                self.pending.clear()
+            for path, (due, serialize) in pending:
+                self._write(path, serialize)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Title: Opt-in Profiling
+Description: cProfile and tracemalloc sessions around gibMacOS GUI backend operations
+Features:
+  - Enabled with GIBGUI_PROFILE=1 or "profile_operations": true in settings.json
+  - Wraps methods only when enabled (no overhead when off)
+  - cProfile, pstats and tracemalloc are only imported once a profile runs
+  - .prof, text profile and allocation reports named by time, operation,
+    process ID and a per-process counter, so runs never overwrite each other
+Usage: Applied by GibMacOSBackend.__init__
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import functools
+import io
+import itertools
+import os
+import threading
+import time
+
+PROFILE_ENV = "GIBGUI_PROFILE"
+
+
+def is_enabled(settings=None):
+    if os.environ.get(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    return bool((settings or {}).get("profile_operations", False))
+
+
+class Profiler:
+    def __init__(self, out_dir, update_callback=None, top=40):
+        self.out_dir = out_dir
+        self.update_callback = update_callback
+        self.top = top
+        # cProfile and tracemalloc are effectively process-wide, so only one
+        # session runs at a time - overlapping calls run unprofiled
+        self.lock = threading.Lock()
+        self.runs = itertools.count(1)
+
+    def _update_status(self, message):
+        if self.update_callback:
+            self.update_callback(message)
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.lock.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return self._run(name, func, args, kwargs)
+            finally:
+                self.lock.release()
+
+        return wrapper
+
+    def _run(self, name, func, args, kwargs):
+        import cProfile
+        import tracemalloc
+
+        profiler = cProfile.Profile()
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(25)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (or debugger) already owns the hooks
+            profiler = None
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                self._write_reports(name, elapsed, profiler, before, after, peak)
+            except Exception as e:
+                self._update_status(f"Failed to write profile for {name}: {e}")
+
+    def _write_reports(self, name, elapsed, profiler, before, after, peak):
+        # Runs within the same second, and other processes profiling into
+        # the same folder, get their own files
+        suffix = "{}-{}-{}-{}".format(
+            time.strftime("%Y%m%d-%H%M%S"), name, os.getpid(), next(self.runs)
+        )
+        base = os.path.join(self.out_dir, "profile-" + suffix)
+        if profiler:
+            import pstats
+
+            profiler.dump_stats(base + ".prof")
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            with open(base + ".txt", "w") as f:
+                f.write("{} took {:.3f}s\n\n".format(name, elapsed))
+                f.write(stream.getvalue())
+
+        alloc_path = os.path.join(self.out_dir, "allocations-{}.txt".format(suffix))
+        with open(alloc_path, "w") as f:
+            f.write(
+                "{} took {:.3f}s, peak traced memory {:.1f} MB\n\n".format(
+                    name, elapsed, peak / 1024**2
+                )
+            )
+            f.write("Top {} allocation changes by line:\n".format(self.top))
+            for stat in after.compare_to(before, "lineno")[: self.top]:
+                f.write("{}\n".format(stat))
+        self._update_status(
+            "Profiled {} ({:.2f}s) - reports written to {}".format(
+                name, elapsed, self.out_dir
+            )
+        )
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Title: Product Records
+Description: Compact, slotted product and package records for the gibMacOS GUI backend
+Features:
+  - __slots__ records instead of one dict per product and package
+  - Read-mostly mapping interface (prod["version"], x.get("URL"), items())
+    so code written against the old dicts keeps working
+  - Device ID and catalog name strings interned and shared between products
+  - Packages copied out of the catalog so the parsed catalog can be released
+Usage: Created by GibMacOSBackend.get_dict_for_prods
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import sys
+
+
+class Record:
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        for key in self.__slots__:
+            setattr(self, key, kwargs.pop(key, None))
+        if kwargs:
+            raise TypeError(
+                "Unexpected {} fields: {}".format(
+                    type(self).__name__, ", ".join(sorted(kwargs))
+                )
+            )
+
+    @classmethod
+    def from_dict(cls, data):
+        # Keys the record has no slot for are dropped
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    # Unset fields (None) behave like missing dict keys
+
+    def __getitem__(self, key):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [key for key in self.__slots__ if getattr(self, key) is not None]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join("{}={!r}".format(key, value) for key, value in self.items()),
+        )
+
+
+class Package(Record):
+    __slots__ = (
+        "URL",
+        "Size",
+        "Digest",
+        "MetadataURL",
+        "IntegrityDataURL",
+        "IntegrityDataSize",
+    )
+
+
+class Product(Record):
+    __slots__ = (
+        "product",
+        "title",
+        "version",
+        "build",
+        "date",
+        "time",
+        "description",
+        "device_ids",
+        "installer",
+        "packages",
+        "size",
+        "catalogs",
+    )
+
+    @classmethod
+    def from_dict(cls, data):
+        prod = super().from_dict(data)
+        if prod.device_ids is not None:
+            prod.device_ids = tuple(sys.intern(str(x)) for x in prod.device_ids)
+        if prod.catalogs is not None:
+            prod.catalogs = tuple(sys.intern(str(x)) for x in prod.catalogs)
+        if prod.packages is not None:
+            prod.packages = tuple(
+                x if isinstance(x, Package) else Package.from_dict(x)
+                for x in prod.packages
+            )
+        return prod
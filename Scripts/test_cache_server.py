@@ -0,0 +1,139 @@
+import http.client
+import io
+import os
+import threading
+
+import pytest
+
+from Scripts import cache_server
+
+CATALOG = b"<string>https://swcdn.apple.com/content/downloads/a/BaseSystem.dmg</string>"
+PAYLOAD = os.urandom(3 * cache_server.BLOCK_SIZE // 2)
+
+
+class FakeDownloader:
+    # Stands in for Scripts/downloader.Downloader - serves fixed bytes
+    def __init__(self, total=None):
+        self.total = len(PAYLOAD) if total is None else total
+        self.urls = []
+
+    def get_bytes(self, url, progress=True):
+        self.urls.append(url)
+        return CATALOG
+
+    def stream_to_file(
+        self, url, path, resume_bytes=0, allow_resume=False, callback=None
+    ):
+        self.urls.append(url)
+        with open(path, "wb") as f:
+            for i in range(0, len(PAYLOAD), 4096):
+                f.write(PAYLOAD[i : i + 4096])
+                f.flush()
+                if callback:
+                    callback(i, self.total, 0)
+        return path
+
+
+@pytest.fixture
+def server(tmp_path):
+    servers = []
+
+    def start(downloader):
+        server = cache_server.CacheServer(
+            str(tmp_path), downloader, host="127.0.0.1", port=0
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def get(server, path, headers=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def test_upstream_path():
+    url = "https://swcdn.apple.com/content/downloads/a/BaseSystem.dmg"
+    assert cache_server.get_upstream_path(url) == cache_server.get_upstream_path(
+        "http://10.0.0.2:8000/pkg/swcdn.apple.com/content/downloads/a/BaseSystem.dmg"
+    )
+    assert cache_server.get_upstream_path(url) != cache_server.get_upstream_path(
+        url.replace("/a/", "/b/")
+    )
+
+
+def test_catalog_urls_point_at_server(server):
+    s = server(FakeDownloader())
+    response, body = get(s, "/content/catalogs/others/index-15.merged-1.sucatalog")
+    assert response.status == 200
+    host = "{}:{}".format(*s.server_address)
+    assert body == CATALOG.replace(
+        b"https://swcdn.apple.com/",
+        "http://{}/pkg/swcdn.apple.com/".format(host).encode("utf-8"),
+    )
+
+
+@pytest.mark.parametrize("total", [None, -1])
+def test_package_fill_and_cached(server, total):
+    d = FakeDownloader(total)
+    s = server(d)
+    path = "/pkg/swcdn.apple.com/content/downloads/a/BaseSystem.dmg"
+    response, body = get(s, path)
+    assert response.status == 200
+    assert body == PAYLOAD
+    # Served from the cache afterwards, ranges included
+    response, body = get(s, path, {"Range": "bytes=10-19"})
+    assert response.status == 206
+    assert body == PAYLOAD[10:20]
+    assert d.urls == ["https://swcdn.apple.com/content/downloads/a/BaseSystem.dmg"]
+
+
+def test_package_outside_apple_is_refused(server):
+    response, body = get(server(FakeDownloader()), "/pkg/example.com/file.dmg")
+    assert response.status == 404
+
+
+class FinishingCondition:
+    # Finishes the fill the first time the reader checks on it, so the last
+    # bytes land after the reader has already looked at the file
+    def __init__(self, fill, tail):
+        self.fill = fill
+        self.tail = tail
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        if self.tail:
+            with open(self.fill.part_path, "ab") as f:
+                f.write(self.tail)
+            self.tail = b""
+            self.fill.done = True
+        return self.condition.__enter__()
+
+    def __exit__(self, *args):
+        return self.condition.__exit__(*args)
+
+    def wait(self, timeout=None):
+        return self.condition.wait(timeout)
+
+
+def test_tail_fill_sends_bytes_written_before_done(tmp_path):
+    file_path = str(tmp_path / "BaseSystem.dmg")
+    with open(file_path + ".part", "wb") as f:
+        f.write(PAYLOAD[:100])
+    fill = cache_server.Fill(file_path + ".part")
+    fill.started = True
+    fill.condition = FinishingCondition(fill, PAYLOAD[100:])
+    handler = cache_server.CacheHandler.__new__(cache_server.CacheHandler)
+    handler.wfile = io.BytesIO()
+    handler.close_connection = False
+    handler.tail_fill(fill, file_path, 0, None)
+    assert handler.wfile.getvalue() == PAYLOAD
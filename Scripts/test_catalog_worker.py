@@ -0,0 +1,71 @@
+import plistlib
+
+import pytest
+
+from Scripts import catalog_worker
+
+PACKAGE = {
+    "URL": "https://swcdn.apple.com/content/downloads/a/InstallAssistant.pkg",
+    "Size": 4,
+    "Digest": "a" * 40,
+    "Unused": "dropped",
+}
+INSTALLER = {
+    "PostDate": "2023-09-26T00:00:00Z",
+    "ServerMetadataURL": "https://swcdn.apple.com/a.smd",
+    "ExtendedMetaInfo": {
+        "InstallAssistantPackageIdentifiers": {
+            "SharedSupport": "com.apple.pkg.InstallAssistant.macOSSonoma"
+        },
+        "Other": "dropped",
+    },
+    "Distributions": {"English": "https://swcdn.apple.com/a.dist", "fr": "dropped"},
+    "Packages": [PACKAGE],
+}
+RECOVERY = {
+    "Packages": [
+        dict(
+            PACKAGE,
+            URL="https://swcdn.apple.com/content/downloads/b/RecoveryHDMetaDmg.pkg",
+        )
+    ]
+}
+CATALOG = plistlib.dumps(
+    {"Products": {"012-34567": INSTALLER, "012-34568": RECOVERY, "012-34569": {}}}
+)
+DIST = """<title>macOS Sonoma</title>
+<key>macOSProductBuildVersion</key><string>23A344</string>
+<key>macOSProductVersion</key><string>14.0</string>
+var supportedDeviceIDs = ['J413AP','j413ap','J414AP'];"""
+
+
+def test_scan_catalog_trims_installers():
+    products = catalog_worker.scan_catalog(CATALOG)["Products"]
+    assert list(products) == ["012-34567"]
+    product = products["012-34567"]
+    assert product["ExtendedMetaInfo"] == {
+        "InstallAssistantPackageIdentifiers": INSTALLER["ExtendedMetaInfo"][
+            "InstallAssistantPackageIdentifiers"
+        ]
+    }
+    assert list(product["Distributions"]) == ["English"]
+    assert "Unused" not in product["Packages"][0]
+
+
+def test_scan_catalog_recovery():
+    products = catalog_worker.scan_catalog(
+        CATALOG, find_recovery=True, recovery_suffixes=("RecoveryHDMetaDmg.pkg",)
+    )["Products"]
+    assert list(products) == ["012-34568"]
+
+
+def test_scan_catalog_rejects_non_dict():
+    with pytest.raises(ValueError):
+        catalog_worker.scan_catalog(plistlib.dumps(["not", "a", "catalog"]))
+
+
+def test_parse_dist():
+    build, version, name, device_ids = catalog_worker.parse_dist(DIST)
+    assert (build, version, name) == ("23A344", "14.0", "macOS Sonoma")
+    assert sorted(device_ids) == ["j413ap", "j414ap"]
+    assert catalog_worker.parse_dist("") == ("Unknown", "Unknown", "Unknown", [])
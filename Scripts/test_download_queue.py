@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+
+from Scripts import download_queue
+
+
+def make_queue(tmp_path, runner, **kwargs):
+    return download_queue.DownloadQueue(
+        str(tmp_path / "download_queue.json"), runner, **kwargs
+    )
+
+
+def product(name):
+    return {"product": name, "title": name}
+
+
+def test_runs_jobs_by_priority(tmp_path):
+    order = []
+    queue = make_queue(
+        tmp_path,
+        lambda job, cancel_event, progress: order.append(job["product"]["product"]),
+    )
+    queue.add(product("low"), str(tmp_path), priority=0)
+    queue.add(product("high"), str(tmp_path), priority=5)
+    queue.add(product("low-later"), str(tmp_path), priority=0)
+    queue.start()
+    assert queue.wait(5)
+    assert order == ["high", "low", "low-later"]
+    assert [x["status"] for x in queue.get_jobs()] == ["done"] * 3
+
+
+def test_failed_job_keeps_error(tmp_path):
+    def runner(job, cancel_event, progress):
+        raise Exception("no route to host")
+
+    queue = make_queue(tmp_path, runner)
+    job = queue.add(product("a"), str(tmp_path))
+    queue.start()
+    assert queue.wait(5)
+    assert queue.get_job(job["id"])["status"] == "failed"
+    assert queue.get_job(job["id"])["error"] == "no route to host"
+    assert queue.retry(job["id"])
+    assert queue.get_job(job["id"])["status"] == "queued"
+
+
+def test_start_right_after_stop_resumes(tmp_path):
+    started = threading.Event()
+    calls = []
+
+    def runner(job, cancel_event, progress):
+        calls.append(job["id"])
+        if len(calls) == 1:
+            started.set()
+            cancel_event.wait(5)
+            # Still winding down when Start is pressed
+            time.sleep(0.2)
+            raise Exception("cancelled")
+
+    queue = make_queue(tmp_path, runner)
+    job = queue.add(product("a"), str(tmp_path))
+    queue.start()
+    assert started.wait(5)
+    queue.stop()
+    queue.start()
+    deadline = time.time() + 5
+    while queue.get_job(job["id"])["status"] != "done" and time.time() < deadline:
+        time.sleep(0.02)
+    assert queue.get_job(job["id"])["status"] == "done"
+    assert len(calls) == 2
+    assert queue.wait(5)
+
+
+def test_stop_requeues_running_jobs(tmp_path):
+    started = threading.Event()
+
+    def runner(job, cancel_event, progress):
+        started.set()
+        cancel_event.wait(5)
+        raise Exception("cancelled")
+
+    queue = make_queue(tmp_path, runner)
+    job = queue.add(product("a"), str(tmp_path))
+    queue.start()
+    assert started.wait(5)
+    queue.stop()
+    assert queue.wait(5)
+    assert queue.get_job(job["id"])["status"] == "queued"
+
+
+def test_running_jobs_are_queued_after_reload(tmp_path):
+    path = tmp_path / "download_queue.json"
+    path.write_text(
+        json.dumps({"jobs": [{"id": "a", "status": "running", "product": {}}]})
+    )
+    queue = make_queue(tmp_path, None)
+    assert queue.get_job("a")["status"] == "queued"
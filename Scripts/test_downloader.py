@@ -0,0 +1,186 @@
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from Scripts import downloader
+
+PAYLOAD = os.urandom(256 * 1024)
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        name = self.path.strip("/")
+        with server.lock:
+            server.requests.append((name, self.headers.get("Range")))
+            attempt = sum(1 for x in server.requests if x[0] == name)
+        if name == "hang":
+            server.stopped.wait(5)
+            return
+        start = 0
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range",
+                "bytes {}-{}/{}".format(start, len(PAYLOAD) - 1, len(PAYLOAD)),
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD) - start))
+        self.end_headers()
+        body = PAYLOAD[start:]
+        if attempt == 1 and name == "drop":
+            # Connection lost half way through
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        if attempt == 1 and name == "stall":
+            # Trickles a little and then goes quiet
+            self.wfile.write(body[: 16 * 1024])
+            self.wfile.flush()
+            server.stopped.wait(5)
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.stopped = threading.Event()
+    server.base_url = "http://{}:{}/".format(*server.server_address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.stopped.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def d():
+    d = downloader.Downloader(interactive=False)
+    d.backoff_base = 0.01
+    d.timeout = 5
+    return d
+
+
+def test_stream_to_file(server, d, tmp_path):
+    path = str(tmp_path / "file")
+    assert d.stream_to_file(server.base_url + "file", path) == path
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_resume_after_dropped_connection(server, d, tmp_path):
+    path = str(tmp_path / "drop")
+    transfer = d.transfer(server.base_url + "drop", path)
+    assert transfer.run() == path
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert transfer.retries == 1
+    # The second request picks up where the first stopped
+    assert server.requests[1][1].startswith("bytes=")
+    assert server.requests[1][1] != "bytes=0-"
+
+
+def test_reconnect_stalled_transfer(server, d, tmp_path):
+    d.stall_window = 1
+    d.stall_threshold = 1024**2
+    path = str(tmp_path / "stall")
+    start = time.monotonic()
+    transfer = d.transfer(server.base_url + "stall", path)
+    assert transfer.run() == path
+    assert time.monotonic() - start < 4
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert transfer.retries == 1
+    assert server.requests[1][1] == "bytes={}-".format(16 * 1024)
+
+
+def test_gives_up_after_max_retries(d, tmp_path, capsys):
+    d.max_retries = 2
+    messages = []
+    d.update_callback = messages.append
+    # Nothing listens on this port
+    transfer = d.transfer("http://127.0.0.1:9/file", str(tmp_path / "file"))
+    assert transfer.run() is None
+    assert transfer.state == "failed"
+    assert transfer.retries == 2
+    # Two reconnects and the failure, none of it on stdout
+    assert len(messages) == 3
+    assert messages[-1].startswith("Download failed after 2 retries")
+    assert capsys.readouterr().out == ""
+
+
+def test_errors_go_to_stderr_without_callback(d, capsys):
+    assert d.get_bytes("http://127.0.0.1:9/file") is None
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert err.startswith("Error getting bytes from http://127.0.0.1:9/file")
+
+
+def test_preallocate_keeps_file_size(tmp_path):
+    path = str(tmp_path / "file")
+    with open(path, "wb") as f:
+        f.write(b"data")
+        downloader.Downloader.preallocate_file(f, 1024**2)
+    assert os.path.getsize(path) == 4
+
+
+def test_cancel_interrupts_request(server, d):
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+    start = time.monotonic()
+    with pytest.raises(downloader.RequestCancelled):
+        d.fetch(server.base_url + "hang", cancel_event=cancel_event)
+    assert time.monotonic() - start < 2
+    assert d.get_bytes(server.base_url + "hang", cancel_event=cancel_event) is None
+
+
+def test_cancel_interrupts_transfer(server, d, tmp_path):
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+    start = time.monotonic()
+    path = str(tmp_path / "file")
+    assert (
+        d.stream_to_file(server.base_url + "hang", path, cancel_event=cancel_event)
+        is None
+    )
+    assert time.monotonic() - start < 2
+
+
+def test_cancelled_transfer(server, d, tmp_path):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    transfer = d.transfer(
+        server.base_url + "file", str(tmp_path / "file"), cancel_event=cancel_event
+    )
+    assert transfer.run() is None
+    assert transfer.state == "cancelled"
+    assert d.list_transfers() == []
+
+
+def test_transfer_handles_are_independent(server, d, tmp_path):
+    transfers = [
+        d.transfer(server.base_url + "file", str(tmp_path / str(i))).start()
+        for i in range(3)
+    ]
+    for transfer in transfers:
+        assert transfer.wait(10)
+        assert transfer.state == "done"
+        assert transfer.stats()["bytes"] == len(PAYLOAD)
+    assert d.list_transfers() == []
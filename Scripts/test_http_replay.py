@@ -0,0 +1,124 @@
+import atexit
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from Scripts import downloader, http_replay
+
+CATALOG = b"<plist>" + b"catalog " * 1000 + b"</plist>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = CATALOG if self.path.endswith(".sucatalog") else b"\xff" * 4096
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Test", self.path)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://{}:{}/".format(*server.server_address)
+    server.shutdown()
+    server.server_close()
+
+
+def session_with(adapter):
+    session = requests.Session()
+    session.mount("http://", adapter)
+    return session
+
+
+@pytest.fixture
+def archive(base_url, tmp_path):
+    path = str(tmp_path / "refresh.zip")
+    recorder = http_replay.Recorder(path)
+    atexit.unregister(recorder.save)
+    session = session_with(http_replay.RecordingAdapter(recorder))
+    assert session.get(base_url + "index.sucatalog").content == CATALOG
+    # Read in chunks like a package transfer, so only the size is kept
+    with session.get(base_url + "InstallAssistant.pkg", stream=True) as r:
+        assert sum(len(chunk) for chunk in r.iter_content(1024)) == 4096
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get("http://127.0.0.1:9/missing.pkg")
+    recorder.save()
+    return path, base_url
+
+
+def test_replay_recorded_responses(archive):
+    path, base_url = archive
+    replayer = http_replay.Replayer(path, scale=0)
+    assert replayer.catalog_url() == base_url + "index.sucatalog"
+    session = session_with(http_replay.ReplayAdapter(replayer))
+    r = session.get(base_url + "index.sucatalog")
+    assert r.status_code == 200
+    assert r.content == CATALOG
+    assert r.headers["X-Test"] == "/index.sucatalog"
+    # Repeats once the recorded responses run out
+    assert session.get(base_url + "index.sucatalog").content == CATALOG
+
+
+def test_streamed_body_replayed_as_zeros(archive):
+    path, base_url = archive
+    session = session_with(http_replay.ReplayAdapter(http_replay.Replayer(path, 0)))
+    with session.get(base_url + "InstallAssistant.pkg", stream=True) as r:
+        assert r.content == bytes(4096)
+
+
+def test_recorded_error_and_miss(archive):
+    path, base_url = archive
+    replayer = http_replay.Replayer(path, scale=0)
+    session = session_with(http_replay.ReplayAdapter(replayer))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get("http://127.0.0.1:9/missing.pkg")
+    # Never goes to the network
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get(base_url + "unrecorded.pkg")
+    assert replayer.misses == 1
+
+
+def test_cancellable_fetch_recorded_and_replayed(base_url, tmp_path):
+    # Downloader.fetch streams a request that has a cancel_event and then reads
+    # .content, the recording still needs the body
+    path = str(tmp_path / "refresh.zip")
+    recorder = http_replay.Recorder(path)
+    atexit.unregister(recorder.save)
+    d = downloader.Downloader(
+        interactive=False,
+        session=session_with(http_replay.RecordingAdapter(recorder)),
+    )
+    url = base_url + "index.sucatalog"
+    assert d.get_bytes(url, cancel_event=threading.Event()) == CATALOG
+    recorder.save()
+    d = downloader.Downloader(
+        interactive=False,
+        session=session_with(
+            http_replay.ReplayAdapter(http_replay.Replayer(path, scale=0))
+        ),
+    )
+    assert d.get_bytes(url, cancel_event=threading.Event()) == CATALOG
+
+
+def test_recorder_and_replayer_for_the_same_path(archive, monkeypatch):
+    monkeypatch.setattr(http_replay, "_recorders", {})
+    monkeypatch.setattr(http_replay, "_replayers", {})
+    path, base_url = archive
+    recorder = http_replay.get_recorder(path)
+    atexit.unregister(recorder.save)
+    assert http_replay.get_recorder(path) is recorder
+    replayer = http_replay.get_replayer(path, scale=0)
+    assert isinstance(replayer, http_replay.Replayer)
+    assert http_replay.get_replayer(path) is replayer
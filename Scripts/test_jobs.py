@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from Scripts import jobs
+
+
+@pytest.fixture
+def executor():
+    executor = jobs.JobExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(timeout=5)
+
+
+def test_result_and_callback(executor):
+    finished = []
+    job = executor.submit(
+        "Add", lambda job, a, b=0: a + b, 1, b=2, on_done=finished.append
+    )
+    assert job.wait(5)
+    assert job.status == "done"
+    assert job.result == 3
+    assert finished == [job]
+
+
+def test_failure_recorded(executor):
+    def fail(job):
+        raise ValueError("broken")
+
+    job = executor.submit("Fail", fail)
+    assert job.wait(5)
+    assert job.status == "failed"
+    assert isinstance(job.error, ValueError)
+
+
+def test_cancel_running_job(executor):
+    started = threading.Event()
+
+    def task(job):
+        started.set()
+        job.cancel_event.wait(5)
+        raise RuntimeError("stopped")
+
+    job = executor.submit("Refresh", task, kind="refresh")
+    assert started.wait(5)
+    assert executor.list_jobs(kind="refresh", active_only=True) == [job]
+    assert executor.cancel_all(kind="refresh") == [job]
+    assert job.wait(5)
+    assert job.status == "cancelled"
+
+
+def test_cancel_before_start():
+    executor = jobs.JobExecutor(max_workers=1)
+    release = threading.Event()
+    blocker = executor.submit("Block", lambda job: release.wait(5))
+    ran = []
+    job = executor.submit("Queued", lambda job: ran.append(job))
+    executor.cancel(job.id)
+    release.set()
+    assert job.wait(5)
+    assert job.status == "cancelled"
+    assert not ran
+    assert blocker.wait(5)
+    executor.shutdown(timeout=5)
+
+
+def test_history_limit(executor):
+    executor.history = 2
+    for i in range(4):
+        executor.submit("Job", lambda job: None).wait(5)
+    executor.submit("Last", lambda job: None).wait(5)
+    # The newest finished jobs are kept
+    assert len(executor.list_jobs()) == 3
+    assert executor.get(1) is None
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from Scripts import locking
+
+HOLD = """
+import sys, time
+from Scripts import locking
+lock = locking.FileLock(sys.argv[1])
+assert lock.acquire(blocking=False)
+print("locked", flush=True)
+time.sleep(30)
+"""
+
+
+def test_exclusive_between_threads(tmp_path):
+    path = str(tmp_path / "settings.json.lock")
+    first = locking.FileLock(path)
+    second = locking.FileLock(path, poll=0.01)
+    assert first.acquire()
+    assert not second.acquire(blocking=False)
+    assert not second.acquire(timeout=0.05)
+    first.release()
+    # Removed on release
+    assert not os.path.exists(path)
+    with second:
+        assert second.locked
+    assert not second.locked
+
+
+def test_cancel_while_waiting(tmp_path):
+    path = str(tmp_path / "pkg.lease")
+    held = locking.FileLock(path)
+    assert held.acquire()
+    cancel_event = threading.Event()
+    threading.Timer(0.1, cancel_event.set).start()
+    start = time.monotonic()
+    assert not locking.FileLock(path).acquire(cancel_event=cancel_event)
+    assert time.monotonic() - start < 2
+    held.release()
+
+
+def test_lease_holder(tmp_path):
+    path = str(tmp_path / "pkg.lease")
+    lease = locking.Lease(path)
+    assert lease.acquire(info={"url": "https://swcdn.apple.com/a.pkg"})
+    holder = locking.Lease(path).holder()
+    assert holder["pid"] == os.getpid()
+    assert holder["url"] == "https://swcdn.apple.com/a.pkg"
+    lease.release()
+    assert locking.Lease(path).holder() == {}
+
+
+def test_released_when_holder_exits(tmp_path):
+    path = str(tmp_path / "prod_cache.plist.lock")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(locking.__file__)))
+    proc = subprocess.Popen(
+        [sys.executable, "-c", HOLD, path],
+        cwd=root,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert proc.stdout.readline().strip() == b"locked"
+        lock = locking.FileLock(path)
+        assert not lock.acquire(blocking=False)
+        proc.kill()
+        proc.wait()
+        # No stale lock after a crash
+        assert lock.acquire(timeout=5)
+        lock.release()
+    finally:
+        proc.kill()
+        proc.wait()
+        proc.stdout.close()
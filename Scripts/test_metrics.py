@@ -0,0 +1,56 @@
+import json
+import os
+
+from Scripts import metrics
+
+
+class Timed:
+    def __init__(self):
+        self.metrics = metrics.Metrics()
+
+    @metrics.timed("work")
+    def work(self, value):
+        return value * 2
+
+
+def test_timed_method():
+    obj = Timed()
+    assert obj.work(2) == 4
+    obj.work(3)
+    assert obj.metrics.snapshot()["timers"]["work"]["count"] == 2
+
+
+def test_delta_and_summary():
+    m = metrics.Metrics()
+    m.incr("packages_downloaded")
+    m.observe("catalog_fetch", 1.0)
+    since = m.snapshot()
+    m.incr("packages_downloaded", 2)
+    m.incr("catalog_bytes", 2048)
+    m.observe("catalog_fetch", 0.5)
+    m.observe("catalog_fetch", 0.25)
+    delta = m.delta(since)
+    assert delta["counters"] == {"packages_downloaded": 2, "catalog_bytes": 2048}
+    assert delta["timers"] == {"catalog_fetch": {"count": 2, "total": 0.75}}
+    summary = m.summary("refresh", since, 1.0, get_size=lambda x: "2 KB ")
+    assert summary == (
+        "Metrics for refresh (1.00s): catalog_fetch 0.75s (x2), "
+        "catalog_bytes 2 KB, packages_downloaded 2"
+    )
+    assert m.summary("idle", m.snapshot(), 0).endswith("no activity")
+
+
+def test_export(tmp_path):
+    m = metrics.Metrics()
+    m.observe("package-download", 2.0)
+    m.incr("packages_failed")
+    path = m.export(str(tmp_path / "metrics.json"))
+    with open(path) as f:
+        assert json.load(f)["counters"] == {"packages_failed": 1}
+    # Written through persist.write_atomic, no temporary file is left over
+    assert os.listdir(str(tmp_path)) == ["metrics.json"]
+    text = m.to_prometheus()
+    assert "gibmacos_package_download_seconds_count 1\n" in text
+    assert "gibmacos_package_download_seconds_sum 2.000000\n" in text
+    assert "# TYPE gibmacos_packages_failed_total counter\n" in text
+    assert text.endswith("gibmacos_packages_failed_total 1\n")
@@ -0,0 +1,74 @@
+import os
+
+from Scripts import locking, package_store
+
+URL = "https://swcdn.apple.com/content/downloads/00/00/012-34567/abc/BaseSystem.dmg"
+
+
+def package(size=4, digest=""):
+    return {"URL": URL, "Size": size, "Digest": digest}
+
+
+def write(path, data=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_key_prefers_digest():
+    store = package_store.PackageStore("store")
+    assert store.key_for(package(digest="A" * 40)) == "sha1-" + "a" * 40
+    assert store.key_for(package()).startswith("url-")
+    assert store.key_for(package()) != store.key_for(package(size=5))
+
+
+def test_link_into_product_folder(tmp_path):
+    store = package_store.PackageStore(str(tmp_path / "store"))
+    x = package()
+    write(store.object_path(x))
+    assert store.is_complete(x)
+    dest = str(tmp_path / "product" / "BaseSystem.dmg")
+    os.makedirs(os.path.dirname(dest))
+    store.link_into(x, dest)
+    assert os.path.samefile(dest, store.object_path(x))
+    assert store.link_into(x, dest) == "existing"
+
+
+def test_adopt_existing_download(tmp_path):
+    store = package_store.PackageStore(str(tmp_path / "store"))
+    x = package()
+    existing = str(tmp_path / "product" / "BaseSystem.dmg")
+    write(existing)
+    assert store.adopt(x, existing)
+    assert store.is_complete(x)
+    assert not store.adopt(x, existing)
+
+
+def test_prune_removes_unlinked_objects(tmp_path):
+    store = package_store.PackageStore(str(tmp_path / "store"))
+    linked = package(digest="a" * 40)
+    unlinked = package(digest="b" * 40)
+    write(store.object_path(linked))
+    write(store.object_path(unlinked))
+    dest = str(tmp_path / "product" / "BaseSystem.dmg")
+    os.makedirs(os.path.dirname(dest))
+    store.link_into(linked, dest)
+    assert store.prune() == (1, 4)
+    assert os.path.isfile(store.object_path(linked))
+    assert not os.path.exists(os.path.dirname(store.object_path(unlinked)))
+
+
+def test_prune_skips_objects_being_downloaded(tmp_path):
+    store = package_store.PackageStore(str(tmp_path / "store"))
+    x = package()
+    part_path = store.object_path(x) + ".part"
+    write(part_path, b"da")
+    lease = locking.Lease(store.object_path(x) + ".lease")
+    assert lease.acquire(blocking=False)
+    try:
+        assert store.prune() == (0, 0)
+        assert os.path.isfile(part_path)
+    finally:
+        lease.release()
+    # Left behind by a download that is no longer running
+    assert store.prune() == (1, 2)
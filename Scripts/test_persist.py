@@ -0,0 +1,72 @@
+import os
+
+from Scripts import persist
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_write_atomic_replaces_file(tmp_path):
+    path = str(tmp_path / "settings.json")
+    persist.write_atomic(path, b"old")
+    persist.write_atomic(path, b"new")
+    assert read(path) == b"new"
+    # No temp files left behind
+    assert os.listdir(str(tmp_path)) == ["settings.json"]
+
+
+def test_write_atomic_keeps_old_file_on_error(tmp_path):
+    path = str(tmp_path / "settings.json")
+    persist.write_atomic(path, b"old")
+    try:
+        persist.write_atomic(path, "not bytes")
+    except TypeError:
+        pass
+    assert read(path) == b"old"
+    assert os.listdir(str(tmp_path)) == ["settings.json"]
+
+
+def test_saves_coalesced(tmp_path):
+    path = str(tmp_path / "prod_cache.plist")
+    calls = []
+
+    def serialize(data):
+        def inner():
+            calls.append(data)
+            return data
+
+        return inner
+
+    persister = persist.Persister(delay=60)
+    for data in (b"1", b"2", b"3"):
+        persister.schedule(path, serialize(data))
+    assert not os.path.exists(path)
+    persister.flush()
+    assert calls == [b"3"]
+    assert read(path) == b"3"
+
+
+def test_background_write(tmp_path):
+    path = str(tmp_path / "queue.json")
+    persister = persist.Persister(delay=0)
+    persister.schedule(path, lambda: b"queued")
+    for _ in range(200):
+        if os.path.exists(path):
+            break
+        persister.thread.join(0.01)
+    assert read(path) == b"queued"
+
+
+def test_failed_serialize_reported(tmp_path):
+    messages = []
+
+    def serialize():
+        raise ValueError("broken")
+
+    persister = persist.Persister(delay=60, update_callback=messages.append)
+    persister.schedule(str(tmp_path / "settings.json"), serialize)
+    persister.flush()
+    assert any("broken" in x for x in messages)
+    assert not os.path.exists(str(tmp_path / "settings.json"))
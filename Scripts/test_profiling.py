@@ -0,0 +1,33 @@
+import os
+
+from Scripts import profiling
+
+
+def test_is_enabled(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    assert not profiling.is_enabled({})
+    assert profiling.is_enabled({"profile_operations": True})
+    monkeypatch.setenv(profiling.PROFILE_ENV, "yes")
+    assert profiling.is_enabled()
+
+
+def test_wrap_writes_reports(tmp_path):
+    messages = []
+    profiler = profiling.Profiler(str(tmp_path), update_callback=messages.append)
+    wrapped = profiler.wrap("refresh", lambda x: [x] * 1000)
+    assert wrapped(1) == [1] * 1000
+    names = sorted(os.listdir(str(tmp_path)))
+    assert [x.split("-")[0] for x in names] == ["allocations", "profile", "profile"]
+    assert any(x.endswith(".prof") for x in names)
+    assert messages and messages[0].startswith("Profiled refresh")
+    # A second run in the same second gets its own reports
+    wrapped(2)
+    assert len(os.listdir(str(tmp_path))) == 6
+
+
+def test_overlapping_calls_run_unprofiled(tmp_path):
+    profiler = profiling.Profiler(str(tmp_path))
+    inner = profiler.wrap("inner", lambda: "done")
+    outer = profiler.wrap("outer", inner)
+    assert outer() == "done"
+    assert not [x for x in os.listdir(str(tmp_path)) if "inner" in x]
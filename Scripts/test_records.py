@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+
+from Scripts import records
+
+PRODUCT = {
+    "product": "012-34567",
+    "title": "macOS Sonoma",
+    "version": "14.0",
+    "device_ids": ["J413AP", "J414AP"],
+    "catalogs": ["publicrelease"],
+    "packages": [{"URL": "https://swcdn.apple.com/a.pkg", "Size": 4, "Extra": 1}],
+    "unknown": "dropped",
+}
+
+
+def test_unset_fields_act_like_missing_keys():
+    x = records.Package(URL="https://swcdn.apple.com/a.pkg", Size=4)
+    assert x["Size"] == 4
+    assert "Digest" not in x
+    assert x.get("Digest", "") == ""
+    with pytest.raises(KeyError):
+        x["Digest"]
+    assert x.to_dict() == {"URL": "https://swcdn.apple.com/a.pkg", "Size": 4}
+    assert len(x) == 2
+
+
+def test_unknown_fields_rejected():
+    with pytest.raises(TypeError):
+        records.Package(Name="a.pkg")
+    with pytest.raises(KeyError):
+        records.Package()["Name"] = "a.pkg"
+
+
+def test_product_from_dict():
+    prod = records.Product.from_dict(PRODUCT)
+    assert "unknown" not in prod.keys()
+    assert prod["device_ids"] == ("J413AP", "J414AP")
+    assert prod["catalogs"] == ("publicrelease",)
+    assert isinstance(prod["packages"][0], records.Package)
+    assert prod["packages"][0].to_dict() == {
+        "URL": "https://swcdn.apple.com/a.pkg",
+        "Size": 4,
+    }
+    # Interned, so every product shares one copy of each string
+    other = records.Product.from_dict(dict(PRODUCT, product="012-34568"))
+    assert other["device_ids"][0] is prod["device_ids"][0]
+    assert other["catalogs"][0] is prod["catalogs"][0]
+
+
+def test_product_pickles():
+    # Products cross the catalog worker process boundary
+    prod = records.Product.from_dict(PRODUCT)
+    assert repr(pickle.loads(pickle.dumps(prod))) == repr(prod)
@@ -0,0 +1,68 @@
+import threading
+
+from Scripts import persist, tuner
+
+HOST = "swcdn.apple.com"
+
+
+def feed(t, value, rate, setting="connections"):
+    for _ in range(t.min_samples):
+        t.record(HOST, setting, value, rate)
+
+
+def test_climbs_while_throughput_improves():
+    t = tuner.Tuner()
+    assert t.get(HOST, "connections") == 4
+    feed(t, 4, 100)
+    # Probes the next step up
+    assert t.get(HOST, "connections") == 6
+    feed(t, 6, 200)
+    assert t.hosts[HOST]["connections"]["value"] == 6
+    # The next sample at the new value starts the next probe
+    t.record(HOST, "connections", 6, 200)
+    assert t.get(HOST, "connections") == 8
+    # Not enough of a gain to pay for more connections
+    feed(t, 8, 202)
+    assert t.get(HOST, "connections") == 6
+
+
+def test_settles_on_cheaper_value():
+    t = tuner.Tuner()
+    feed(t, 4, 100)
+    feed(t, 6, 101)
+    assert t.get(HOST, "connections") == 3
+    feed(t, 3, 100)
+    assert t.hosts[HOST]["connections"]["value"] == 3
+
+
+def test_errors_back_off():
+    t = tuner.Tuner()
+    t.record(HOST, "connections", 4, failed=True)
+    assert t.get(HOST, "connections") == 3
+
+
+def test_slots_capped_per_host():
+    t = tuner.Tuner()
+    t.record(HOST, "connections", 2, failed=True)
+    assert t.get(HOST, "connections") == 1
+    assert t.acquire(HOST)
+    stop_event = threading.Event()
+    stop_event.set()
+    assert not t.acquire(HOST, stop_event)
+    # Other hosts have their own slots
+    assert t.acquire("updates.cdn-apple.com", stop_event)
+    t.release(HOST)
+    assert t.acquire(HOST, stop_event)
+
+
+def test_history_persisted(tmp_path):
+    path = str(tmp_path / "tuning.json")
+    persister = persist.Persister(delay=60)
+    t = tuner.Tuner(path, persister)
+    feed(t, 4, 100)
+    feed(t, 6, 200)
+    feed(t, 64 * 1024, 100, "chunk_size")
+    persister.flush()
+    loaded = tuner.Tuner(path)
+    assert loaded.get(HOST, "connections") == 6
+    assert loaded.dump() == t.dump()
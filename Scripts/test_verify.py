@@ -0,0 +1,82 @@
+import hashlib
+
+import pytest
+
+from Scripts import verify
+
+DATA = bytes(range(256)) * 40
+
+
+def chunklist(chunks):
+    # Built the way Apple lays it out - header, then one entry per chunk
+    header_size = verify.CHUNKLIST_HEADER.size
+    header = verify.CHUNKLIST_HEADER.pack(
+        verify.CHUNKLIST_MAGIC,
+        header_size,
+        1,
+        verify.CHUNK_METHOD_SHA256,
+        2,
+        len(chunks),
+        header_size,
+        0,
+    )
+    return header + b"".join(
+        verify.CHUNKLIST_ENTRY.pack(size, bytes.fromhex(digest))
+        for size, digest in chunks
+    )
+
+
+def chunks_for(data, size):
+    return [
+        (len(data[i : i + size]), hashlib.sha256(data[i : i + size]).hexdigest())
+        for i in range(0, len(data), size)
+    ]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "InstallAssistant.pkg"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+def test_parse_chunklist():
+    chunks = chunks_for(DATA, 4096)
+    assert verify.parse_chunklist(chunklist(chunks)) == chunks
+    with pytest.raises(ValueError):
+        verify.parse_chunklist(b"CNKL")
+    with pytest.raises(ValueError):
+        verify.parse_chunklist(b"XXXX" + chunklist(chunks)[4:])
+    with pytest.raises(ValueError):
+        verify.parse_chunklist(chunklist(chunks)[:-1])
+
+
+def test_digests(path):
+    sha1 = hashlib.sha1(DATA).hexdigest()
+    sha256 = hashlib.sha256(DATA).hexdigest()
+    assert verify.verify_file(path, len(DATA), sha1)["status"] == "ok"
+    assert verify.verify_file(path, len(DATA), sha256.upper())["status"] == "ok"
+    assert verify.verify_file(path, len(DATA), "0" * 40)["status"] == "digest"
+    assert verify.verify_file(path, len(DATA) + 1, sha1)["status"] == "size"
+    assert verify.verify_file(path, len(DATA))["detail"] == "size only"
+
+
+def test_chunklist_across_blocks(path):
+    # Chunks that do not line up with the read size
+    chunks = chunks_for(DATA, 3000)
+    result = verify.verify_file(path, chunks=chunks, block_size=1024)
+    assert result["status"] == "ok"
+    chunks[2] = (chunks[2][0], "0" * 64)
+    result = verify.verify_file(path, chunks=chunks, block_size=1024)
+    assert result["status"] == "chunklist"
+    assert result["detail"].startswith("chunk 2 ")
+
+
+def test_chunklist_size_mismatch(path):
+    chunks = chunks_for(DATA[:-1], 4096)
+    assert verify.verify_file(path, chunks=chunks)["status"] == "chunklist"
+
+
+def test_missing_file(tmp_path):
+    result = verify.verify_file(str(tmp_path / "missing.pkg"), 4)
+    assert result["status"] == "error"
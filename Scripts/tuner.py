@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Title: Transfer Tuner
+Description: Per-host auto-tuning of download connections and read buffer size for the gibMacOS GUI
+Features:
+  - Throughput history per host and per setting value (EWMA of bytes/s)
+  - Hill climbing along a ladder of values - probes the next step up,
+    moves up while throughput improves, stays on the cheaper value on flat
+    gains
+  - Backs off a step on connection errors, retries and stalls
+  - Re-probes neighbouring values now and then, as links change
+  - Caps concurrent transfers per host at the tuned connection count
+  - History persisted to Scripts/tuning.json between runs
+Usage: GibMacOSBackend.tuner, attached to the Downloader as d.tuner
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import json
+import os
+import threading
+import time
+
+# setting -> (ladder of values, starting value) - the ladder goes from the
+# cheapest value to the dearest, where fewer connections are cheaper but
+# smaller reads cost more CPU per byte
+SETTINGS = {
+    "connections": ((1, 2, 3, 4, 6, 8), 4),
+    "chunk_size": (tuple(1024 * 2**x for x in range(10, 3, -1)), 64 * 1024),
+}
+
+
+class Tuner:
+    def __init__(
+        self,
+        path=None,
+        persister=None,
+        gain=0.05,
+        min_samples=2,
+        reprobe=20,
+        alpha=0.3,
+        window=10.0,
+    ):
+        self.path = path
+        self.persister = persister
+        # A value has to beat the cheaper one by this fraction to be worth it
+        self.gain = gain
+        # Samples needed before a value is compared
+        self.min_samples = min_samples
+        # Samples at the chosen value before its neighbours are tried again
+        self.reprobe = reprobe
+        self.alpha = alpha
+        # Seconds of combined host throughput per connections sample
+        self.window = window
+        # host -> setting -> {"value", "probe", "count", "rates": {value: [rate, samples]}}
+        self.hosts = {}
+        self.lock = threading.RLock()
+        # Per host slots for the connections setting
+        self.condition = threading.Condition(self.lock)
+        self.active = {}
+        self.waiting = {}
+        self.windows = {}
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                hosts = json.load(f)
+            assert isinstance(hosts, dict)
+        except:
+            return
+        for host, settings in hosts.items():
+            for setting, state in settings.items():
+                ladder = SETTINGS.get(setting, ((), None))[0]
+                if not isinstance(state, dict) or state.get("value") not in ladder:
+                    continue
+                self.hosts.setdefault(host, {})[setting] = {
+                    "value": state["value"],
+                    "probe": None,
+                    "count": 0,
+                    "rates": {
+                        int(value): list(stats)
+                        for value, stats in state.get("rates", {}).items()
+                        if int(value) in ladder
+                    },
+                }
+
+    def save(self):
+        if not self.path or not self.persister:
+            return
+        with self.lock:
+            data = json.dumps(self.dump(), indent=2).encode("utf-8")
+        self.persister.schedule(self.path, lambda: data)
+
+    def dump(self):
+        with self.lock:
+            return {
+                host: {
+                    setting: {
+                        "value": state["value"],
+                        "rates": {
+                            str(value): [round(stats[0]), stats[1]]
+                            for value, stats in sorted(state["rates"].items())
+                        },
+                    }
+                    for setting, state in settings.items()
+                }
+                for host, settings in self.hosts.items()
+            }
+
+    def reset(self, host=None):
+        with self.lock:
+            if host is None:
+                self.hosts.clear()
+            else:
+                self.hosts.pop(host, None)
+            self.windows.clear()
+        self.save()
+
+    def _state(self, host, setting):
+        settings = self.hosts.setdefault(host, {})
+        if setting not in settings:
+            settings[setting] = {
+                "value": SETTINGS[setting][1],
+                "probe": None,
+                "count": 0,
+                "rates": {},
+            }
+        return settings[setting]
+
+    def get(self, host, setting):
+        # The value to use right now - a probe while one is running
+        with self.lock:
+            state = self._state(host, setting)
+            return state["probe"] or state["value"]
+
+    def record(self, host, setting, value, rate=0, failed=False):
+        ladder = SETTINGS[setting][0]
+        with self.lock:
+            state = self._state(host, setting)
+            if failed:
+                # Errors at this value - it counts as measured at zero until
+                # the next re-probe, and the chosen value drops below it
+                state["rates"][value] = [0.0, self.min_samples]
+                state["probe"] = None
+                index = ladder.index(value)
+                if index > 0 and ladder.index(state["value"]) >= index:
+                    state["value"] = ladder[index - 1]
+                    state["count"] = 0
+            else:
+                stats = state["rates"].setdefault(value, [0.0, 0])
+                stats[0] = (
+                    rate
+                    if not stats[1]
+                    else self.alpha * rate + (1 - self.alpha) * stats[0]
+                )
+                stats[1] += 1
+                if value == state["value"]:
+                    state["count"] += 1
+                self._climb(state, ladder)
+            self.condition.notify_all()
+        self.save()
+
+    def _climb(self, state, ladder):
+        if state["count"] >= self.reprobe:
+            # Measure the neighbours again
+            state["count"] = 0
+            index = ladder.index(state["value"])
+            for x in ladder[max(0, index - 1) : index + 2]:
+                if x != state["value"] and x in state["rates"]:
+                    state["rates"][x][1] = 0
+
+        def measured(value):
+            stats = state["rates"].get(value)
+            return stats[0] if stats and stats[1] >= self.min_samples else None
+
+        state["probe"] = None
+        current = measured(state["value"])
+        if current is None:
+            return
+        index = ladder.index(state["value"])
+        lower = ladder[index - 1] if index > 0 else None
+        upper = ladder[index + 1] if index + 1 < len(ladder) else None
+        if lower is not None:
+            below = measured(lower)
+            if below is not None and current < below * (1 + self.gain):
+                # No real gain over the cheaper value
+                state["value"] = lower
+                state["count"] = 0
+                return
+        if upper is not None:
+            above = measured(upper)
+            if above is None:
+                state["probe"] = upper
+                return
+            if above >= current * (1 + self.gain):
+                state["value"] = upper
+                state["count"] = 0
+                return
+        if lower is not None and measured(lower) is None:
+            # Going up didn't pay - see if less does just as well
+            state["probe"] = lower
+
+    def acquire(self, host, stop_event=None):
+        # Waits for one of the host's connection slots - False when
+        # stop_event was set first
+        with self.condition:
+            self.waiting[host] = self.waiting.get(host, 0) + 1
+            try:
+                while self.active.get(host, 0) >= self.get(host, "connections"):
+                    if stop_event is not None and stop_event.is_set():
+                        return False
+                    self.condition.wait(0.1)
+            finally:
+                self.waiting[host] -= 1
+            self.active[host] = self.active.get(host, 0) + 1
+            return True
+
+    def release(self, host):
+        with self.condition:
+            self.active[host] = max(0, self.active.get(host, 0) - 1)
+            self.condition.notify_all()
+
+    def add_bytes(self, host, count):
+        # Combined throughput of the host's transfers - a sample only counts
+        # when every slot was in use, otherwise the connection count wasn't
+        # what limited it
+        sample = None
+        with self.lock:
+            now = time.monotonic()
+            value = self.get(host, "connections")
+            window = self.windows.get(host)
+            if window is None or window["value"] != value:
+                window = self.windows[host] = {
+                    "value": value,
+                    "start": now,
+                    "bytes": 0,
+                    "busy": 0,
+                    "calls": 0,
+                }
+            window["bytes"] += count
+            window["calls"] += 1
+            if self.active.get(host, 0) >= value or self.waiting.get(host, 0):
+                window["busy"] += 1
+            if now - window["start"] >= self.window:
+                del self.windows[host]
+                if window["busy"] >= 0.8 * window["calls"]:
+                    sample = (value, window["bytes"] / (now - window["start"]))
+        if sample:
+            self.record(host, "connections", *sample)
+
+    def add_error(self, host):
+        # A retry on a busy host is taken as too many connections
+        with self.lock:
+            value = self.get(host, "connections")
+            busy = self.active.get(host, 0) >= value and value > 1
+            self.windows.pop(host, None)
+        if busy:
+            self.record(host, "connections", value, failed=True)
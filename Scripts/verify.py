@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Title: Library Verification
+Description: Integrity checks for packages already in the gibMacOS GUI download directory
+Features:
+  - Size, catalog digest (SHA-1/SHA-256) and chunklist (per-chunk SHA-256) checks
+  - One sequential pass per file with large reads into a reused buffer
+  - Chunklist mismatches stop reading at the first bad chunk
+  - Plain functions, so files are hashed in parallel in a process pool
+Usage: GibMacOSBackend.verify_library / python gibmacos_cli.py verify
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import hashlib
+import os
+import struct
+
+BLOCK_SIZE = 8 * 1024 * 1024
+CHUNKLIST_MAGIC = b"CNKL"
+# magic, header size, file version, chunk method, signature method, padding,
+# chunk count, chunk offset, signature offset
+CHUNKLIST_HEADER = struct.Struct("<4sIBBBxQQQ")
+CHUNKLIST_ENTRY = struct.Struct("<I32s")
+CHUNK_METHOD_SHA256 = 1
+
+
+def parse_chunklist(data):
+    # Returns [(size, sha256 hex), ...] for each chunk of the file it covers
+    if len(data) < CHUNKLIST_HEADER.size:
+        raise ValueError("Chunklist is too short")
+    magic, header_size, version, method, signature, count, offset, _ = (
+        CHUNKLIST_HEADER.unpack_from(data)
+    )
+    if magic != CHUNKLIST_MAGIC:
+        raise ValueError("Not a chunklist")
+    if method != CHUNK_METHOD_SHA256:
+        raise ValueError("Unsupported chunk method {}".format(method))
+    if offset + count * CHUNKLIST_ENTRY.size > len(data):
+        raise ValueError("Chunklist is truncated")
+    return [
+        (size, digest.hex())
+        for size, digest in CHUNKLIST_ENTRY.iter_unpack(
+            data[offset : offset + count * CHUNKLIST_ENTRY.size]
+        )
+    ]
+
+
+def get_hasher(digest):
+    # The catalog's Digest is SHA-1 - a 64 character one is treated as SHA-256
+    digest = str(digest or "").lower()
+    if len(digest) == 40:
+        return hashlib.sha1()
+    if len(digest) == 64:
+        return hashlib.sha256()
+    return None
+
+
+def verify_file(path, size=-1, digest="", chunks=None, block_size=BLOCK_SIZE):
+    # Runs in a worker process - everything in and out has to pickle
+    result = {"path": path, "status": "ok", "detail": "", "bytes": 0}
+    try:
+        actual = os.path.getsize(path)
+        result["bytes"] = actual
+        if size > 0 and actual != size:
+            result.update(
+                status="size", detail="expected {} bytes, found {}".format(size, actual)
+            )
+            return result
+        if chunks and sum(x[0] for x in chunks) != actual:
+            result.update(
+                status="chunklist", detail="chunklist does not cover the file size"
+            )
+            return result
+        hasher = get_hasher(digest)
+        if hasher is None and not chunks:
+            result["detail"] = "size only"
+            return result
+
+        index = 0
+        chunk_hasher = hashlib.sha256() if chunks else None
+        chunk_left = chunks[0][0] if chunks else 0
+        offset = 0
+        buf = bytearray(block_size)
+        view = memoryview(buf)
+        with open(path, "rb", buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                # Larger kernel read-ahead for the single sequential pass
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                data = view[:n]
+                if hasher:
+                    hasher.update(data)
+                while chunks and len(data):
+                    take = min(chunk_left, len(data))
+                    chunk_hasher.update(data[:take])
+                    data = data[take:]
+                    chunk_left -= take
+                    offset += take
+                    if chunk_left:
+                        continue
+                    if chunk_hasher.hexdigest() != chunks[index][1]:
+                        result.update(
+                            status="chunklist",
+                            detail="chunk {} (ending at byte {}) does not match".format(
+                                index, offset
+                            ),
+                        )
+                        return result
+                    index += 1
+                    if index < len(chunks):
+                        chunk_hasher = hashlib.sha256()
+                        chunk_left = chunks[index][0]
+        if hasher and hasher.hexdigest() != str(digest).lower():
+            result.update(status="digest", detail="digest does not match the catalog")
+    except OSError as e:
+        result.update(status="error", detail=str(e))
+    return result
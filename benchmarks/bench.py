@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Title: GibMacOS GUI Benchmarks
+Description: Reproducible catalog, metadata and download benchmarks against local fixtures
+Features:
+  - Local fixture server (benchmarks/fixtures.py) in a separate process
+  - Configurable latency, bandwidth, catalog size and payload size
+  - Catalog fetch/parse, get_installers and get_dict_for_prods (cold/warm prod_cache)
+  - Download throughput and client CPU seconds per GB for stream_to_file
+  - Results saved as JSON and compared against earlier runs
+  - Offline runs against recorded Apple traffic (Scripts/http_replay.py)
+Usage:
+  - python benchmarks/bench.py
+  - python benchmarks/bench.py --latency-ms 50 --bandwidth-mbps 200 --compare latest
+  - python benchmarks/bench.py --replay refresh.zip --replay-scale 0 --compare latest
+Dependencies: requests, gibMacOS checkout (for Scripts/utils.py, run.py, plist.py)
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def setup_path(gibmacos_dir):
+    # The working tree comes first so the code under test is what gets measured,
+    # the gibMacOS checkout supplies the upstream Scripts modules
+    sys.path.insert(0, REPO_DIR)
+    if gibmacos_dir and os.path.isdir(gibmacos_dir):
+        sys.path.insert(1, gibmacos_dir)
+        sys.path.insert(2, os.path.join(gibmacos_dir, "Scripts"))
+
+
+def start_fixture_server(args):
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(BENCH_DIR, "fixtures.py"),
+            "--latency-ms",
+            str(args.latency_ms),
+            "--bandwidth-mbps",
+            str(args.bandwidth_mbps),
+            "--products",
+            str(args.products),
+            "--noise",
+            str(args.noise),
+            "--payload-mb",
+            str(args.payload_mb),
+            "--seed",
+            str(args.seed),
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    base_url = json.loads(proc.stdout.readline())["base_url"]
+    return proc, base_url
+
+
+def get_stats(d, base_url):
+    return json.loads(d.get_string(base_url + "/__stats"))
+
+
+def summarize(values):
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+        "runs": values,
+    }
+
+
+def run_once(backend, base_url, temp_dir, results):
+    from Scripts import plist
+
+    d = backend.d
+    catalog_url = base_url + "/catalog.sucatalog"
+
+    def timed(name, func, *args):
+        before = get_stats(d, base_url)["requests"]
+        start = time.perf_counter()
+        value = func(*args)
+        results.setdefault(name, []).append(time.perf_counter() - start)
+        # The /__stats request itself is excluded from the count
+        requests = get_stats(d, base_url)["requests"] - before - 1
+        results.setdefault(name + "_requests", []).append(requests)
+        return value
+
+    raw = timed("catalog_fetch", d.get_bytes, catalog_url)
+    results.setdefault("catalog_bytes", []).append(len(raw))
+    timed("catalog_parse", plist.loads, raw)
+    assert timed("catalog_load", backend.get_catalog_data)
+    prods = timed("get_installers", backend.get_installers)
+
+    backend.prod_cache = {}
+    timed("metadata_cold", backend.get_dict_for_prods, prods)
+    timed("metadata_warm", backend.get_dict_for_prods, prods)
+
+    payload_url = next(
+        x["URL"]
+        for x in backend.catalog_data["Products"][prods[0]]["Packages"]
+        if x["URL"].endswith("InstallAssistant.pkg")
+    )
+    file_path = os.path.join(temp_dir, "InstallAssistant.pkg")
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    assert d.stream_to_file(payload_url, file_path, allow_resume=False)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    size = os.path.getsize(file_path)
+    results.setdefault("download", []).append(elapsed)
+    results.setdefault("download_mb_per_s", []).append(size / 1024**2 / elapsed)
+    results.setdefault("download_cpu_s_per_gb", []).append(cpu / (size / 1024**3))
+    os.remove(file_path)
+
+
+def run_replay_once(backend, replayer, results):
+    # Same catalog phases as run_once, served from a recorded archive - the
+    # request counts come from the replayer
+    def timed(name, func, *args):
+        before = replayer.requests
+        start = time.perf_counter()
+        value = func(*args)
+        results.setdefault(name, []).append(time.perf_counter() - start)
+        results.setdefault(name + "_requests", []).append(replayer.requests - before)
+        return value
+
+    assert timed("catalog_load", backend.get_catalog_data)
+    prods = timed("get_installers", backend.get_installers)
+    backend.prod_cache = {}
+    timed("metadata_cold", backend.get_dict_for_prods, prods)
+    timed("metadata_warm", backend.get_dict_for_prods, prods)
+
+
+def run_replay_benchmarks(args):
+    # The adapter is picked up when the backend creates its session
+    os.environ["GIBGUI_HTTP_REPLAY"] = os.path.abspath(args.replay)
+    os.environ["GIBGUI_REPLAY_SCALE"] = str(args.replay_scale)
+    from gibmacos_backend import GibMacOSBackend
+    from Scripts import http_replay
+
+    replayer = http_replay.get_replayer(args.replay, scale=args.replay_scale)
+    catalog_url = replayer.catalog_url()
+    if not catalog_url:
+        raise SystemExit("No catalog request in {}".format(args.replay))
+    temp_dir = tempfile.mkdtemp(prefix="gibgui-bench-")
+    try:
+        backend = GibMacOSBackend()
+        backend.save_local = backend.force_local = backend.find_recovery = False
+        backend.prod_cache_path = os.path.join(temp_dir, "prod_cache.plist")
+        backend.build_url = lambda **kwargs: catalog_url
+
+        results = {}
+        for i in range(args.warmup + args.runs):
+            run_replay_once(backend, replayer, results if i >= args.warmup else {})
+        results["replay_misses"] = [replayer.misses]
+        return {name: summarize(values) for name, values in results.items()}
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def run_benchmarks(args):
+    from gibmacos_backend import GibMacOSBackend
+
+    if args.replay:
+        return run_replay_benchmarks(args)
+    proc, base_url = start_fixture_server(args)
+    temp_dir = tempfile.mkdtemp(prefix="gibgui-bench-")
+    try:
+        backend = GibMacOSBackend()
+        # Never touch the user's settings, catalog or product cache
+        backend.save_local = backend.force_local = backend.find_recovery = False
+        backend.prod_cache_path = os.path.join(temp_dir, "prod_cache.plist")
+        backend.build_url = lambda **kwargs: base_url + "/catalog.sucatalog"
+
+        results = {}
+        for i in range(args.warmup + args.runs):
+            run_results = results if i >= args.warmup else {}
+            run_once(backend, base_url, temp_dir, run_results)
+            print(
+                "Run {} of {}{}".format(
+                    i + 1,
+                    args.warmup + args.runs,
+                    " (warm-up)" if i < args.warmup else "",
+                ),
+                file=sys.stderr,
+            )
+        return {name: summarize(values) for name, values in results.items()}
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            universal_newlines=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def find_previous_result(exclude=None):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    results = sorted(
+        os.path.join(RESULTS_DIR, x)
+        for x in os.listdir(RESULTS_DIR)
+        if x.endswith(".json")
+    )
+    results = [x for x in results if x != exclude]
+    return results[-1] if results else None
+
+
+def print_comparison(current, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    print("\nCompared with {} ({}):".format(baseline_path, baseline.get("revision")))
+    if baseline.get("config") != current["config"]:
+        print("  Warning: benchmark configuration differs from the baseline")
+    print(
+        "  {:<28}{:>14}{:>14}{:>10}".format("metric", "baseline", "current", "change")
+    )
+    for name, summary in current["results"].items():
+        if name not in baseline.get("results", {}):
+            continue
+        old = baseline["results"][name]["median"]
+        new = summary["median"]
+        change = "{:+.1f}%".format((new - old) / old * 100) if old else "n/a"
+        print("  {:<28}{:>14.4f}{:>14.4f}{:>10}".format(name, old, new, change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gibMacOS GUI backend.")
+    parser.add_argument(
+        "--gibmacos-dir",
+        default=os.environ.get("GIBMACOS_DIR", os.path.join(REPO_DIR, "gibMacOS")),
+        help="gibMacOS checkout providing Scripts/utils.py, run.py and plist.py",
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--bandwidth-mbps", type=float, default=0.0, help="0 means unlimited"
+    )
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument(
+        "--noise", type=int, default=20, help="non-installer products per installer"
+    )
+    parser.add_argument("--payload-mb", type=float, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="result file to compare against, or 'latest'")
+    parser.add_argument(
+        "--replay",
+        help="run the catalog benchmarks offline against a GIBGUI_HTTP_RECORD archive",
+    )
+    parser.add_argument(
+        "--replay-scale",
+        type=float,
+        default=1.0,
+        help="multiplier for recorded response times (0 replays without delays)",
+    )
+    args = parser.parse_args()
+
+    setup_path(args.gibmacos_dir)
+    config = {
+        x: getattr(args, x)
+        for x in (
+            "runs",
+            "warmup",
+            "latency_ms",
+            "bandwidth_mbps",
+            "products",
+            "noise",
+            "payload_mb",
+            "seed",
+            "replay",
+            "replay_scale",
+        )
+    }
+    current = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "revision": get_git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": run_benchmarks(args),
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(current, f, indent=2)
+
+    print("{:<28}{:>14}{:>14}{:>14}".format("metric", "median", "min", "max"))
+    for name, summary in current["results"].items():
+        print(
+            "{:<28}{:>14.4f}{:>14.4f}{:>14.4f}".format(
+                name, summary["median"], summary["min"], summary["max"]
+            )
+        )
+    print("\nSaved results to {}".format(output))
+
+    if args.compare:
+        baseline = (
+            find_previous_result(exclude=output)
+            if args.compare == "latest"
+            else args.compare
+        )
+        if baseline:
+            print_comparison(current, baseline)
+        else:
+            print("No earlier results to compare against.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Title: Benchmark HTTP Fixtures
+Description: Local HTTP server with synthetic Apple software update content
+Features:
+  - Synthetic merged sucatalog with installer and non-installer products
+  - Matching SMD plists, English dist files and binary package payloads
+  - Byte-range support for payloads
+  - Configurable per-request latency and bandwidth cap
+  - Request counters at /__stats
+Usage:
+  - python benchmarks/fixtures.py --port 8000 --products 40
+  - Imported by benchmarks/bench.py
+Dependencies: None
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import argparse
+import datetime
+import json
+import plistlib
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCK_SIZE = 64 * 1024
+
+
+class FixtureSet:
+    def __init__(
+        self, base_url, products=40, noise=20, payload_size=64 * 1024**2, seed=1
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.payload_size = payload_size
+        rng = random.Random(seed)
+        self.block = bytes(rng.getrandbits(8) for _ in range(BLOCK_SIZE))
+        self.smds = {}
+        self.dists = {}
+        self.payloads = {}
+
+        catalog_products = {}
+        post_date = datetime.datetime(2020, 1, 1)
+        for i in range(products * (noise + 1)):
+            prod = "{:03d}-{:05d}".format(rng.randint(1, 999), i)
+            post_date += datetime.timedelta(hours=rng.randint(1, 72))
+            if i % (noise + 1):
+                # Noise - regular software updates that get_installers skips
+                catalog_products[prod] = {
+                    "PostDate": post_date,
+                    "Packages": [
+                        {
+                            "URL": "{}/pkg/{}/Update.pkg".format(self.base_url, prod),
+                            "Size": rng.randint(10**5, 10**8),
+                        }
+                    ],
+                }
+                continue
+            major = rng.randint(11, 15)
+            version = "{}.{}".format(major, rng.randint(0, 6))
+            build = "{}{}{}".format(major + 9, chr(65 + rng.randint(0, 7)), i)
+            device_ids = sorted(
+                set("Mac-{:016X}".format(rng.getrandbits(64)) for _ in range(20))
+            )
+            packages = []
+            for name, size in (
+                ("InstallAssistant.pkg", payload_size),
+                ("BaseSystem.dmg", payload_size // 8),
+                ("BaseSystem.chunklist", 2048),
+            ):
+                url = "{}/pkg/{}/{}".format(self.base_url, prod, name)
+                self.payloads["/pkg/{}/{}".format(prod, name)] = size
+                packages.append({"URL": url, "Size": size})
+            catalog_products[prod] = {
+                "PostDate": post_date,
+                "ExtendedMetaInfo": {
+                    "InstallAssistantPackageIdentifiers": {
+                        "OSInstall": "com.apple.mpkg.OSInstall",
+                        "SharedSupport": "com.apple.pkg.InstallAssistant.macOS",
+                    }
+                },
+                "ServerMetadataURL": "{}/smd/{}.smd".format(self.base_url, prod),
+                "Distributions": {
+                    "English": "{}/dist/{}.English.dist".format(self.base_url, prod)
+                },
+                "Packages": packages,
+            }
+            self.smds["/smd/{}.smd".format(prod)] = plistlib.dumps(
+                {
+                    "CFBundleShortVersionString": version,
+                    "localization": {
+                        "English": {
+                            "title": "macOS {}".format(major),
+                            "description": '<p class="p1">macOS {}</a>'.format(
+                                version
+                            ).encode("utf-8"),
+                        }
+                    },
+                }
+            )
+            self.dists["/dist/{}.English.dist".format(prod)] = (
+                (
+                    '<?xml version="1.0"?>\n<installer-gui-script>\n'
+                    "<title>macOS {major}</title>\n<script><![CDATA[\n"
+                    "var supportedDeviceIDs = [{ids}];\n]]></script>\n"
+                    "<auxinfo><dict>\n"
+                    "<key>macOSProductBuildVersion</key><string>{build}</string>\n"
+                    "<key>macOSProductVersion</key><string>{version}</string>\n"
+                    "</dict></auxinfo>\n</installer-gui-script>\n"
+                )
+                .format(
+                    major=major,
+                    ids=",".join("'{}'".format(x) for x in device_ids),
+                    build=build,
+                    version=version,
+                )
+                .encode("utf-8")
+            )
+        self.catalog = plistlib.dumps({"Products": catalog_products})
+
+    def payload_range(self, size, start, end):
+        # Deterministic content - the byte at offset n is block[n % BLOCK_SIZE]
+        pos = start
+        while pos <= end:
+            offset = pos % BLOCK_SIZE
+            length = min(BLOCK_SIZE - offset, end - pos + 1)
+            yield self.block[offset : offset + length]
+            pos += length
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request(head=True)
+
+    def do_GET(self):
+        self.handle_request(head=False)
+
+    def handle_request(self, head=False):
+        server = self.server
+        path = self.path.split("?", 1)[0]
+        with server.stats_lock:
+            server.stats["requests"] += 1
+            kind = path.split("/")[1] if path.count("/") > 1 else path.strip("/")
+            server.stats.setdefault(kind, 0)
+            server.stats[kind] += 1
+
+        if path == "/__stats":
+            return self.send_body(json.dumps(server.stats).encode("utf-8"), head)
+        if server.latency:
+            time.sleep(server.latency)
+
+        fixtures = server.fixtures
+        if path == "/catalog.sucatalog":
+            return self.send_body(fixtures.catalog, head)
+        if path in fixtures.smds:
+            return self.send_body(fixtures.smds[path], head)
+        if path in fixtures.dists:
+            return self.send_body(fixtures.dists[path], head)
+        if path in fixtures.payloads:
+            return self.send_payload(fixtures.payloads[path], head)
+        self.send_error(404)
+
+    def send_body(self, body, head):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.throttled_write([body])
+
+    def send_payload(self, size, head):
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = re.match(r"bytes=(\d+)-(\d*)", range_header)
+            if not match or int(match.group(1)) >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */{}".format(size))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(start, end, size))
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if not head:
+            self.throttled_write(self.server.fixtures.payload_range(size, start, end))
+
+    def throttled_write(self, chunks):
+        bandwidth = self.server.bandwidth
+        start = time.time()
+        sent = 0
+        try:
+            for chunk in chunks:
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if bandwidth:
+                    ahead = sent / bandwidth - (time.time() - start)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        bandwidth=0,
+        products=40,
+        noise=20,
+        payload_size=64 * 1024**2,
+        seed=1,
+    ):
+        super().__init__((host, port), FixtureHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.stats = {"requests": 0}
+        self.stats_lock = threading.Lock()
+        self.fixtures = FixtureSet(
+            self.base_url,
+            products=products,
+            noise=noise,
+            payload_size=payload_size,
+            seed=seed,
+        )
+
+    @property
+    def base_url(self):
+        return "http://{}:{}".format(*self.server_address[:2])
+
+    @property
+    def catalog_url(self):
+        return self.base_url + "/catalog.sucatalog"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic sucatalog fixtures.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--bandwidth-mbps", type=float, default=0.0, help="0 means unlimited"
+    )
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument("--noise", type=int, default=20)
+    parser.add_argument("--payload-mb", type=float, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = FixtureServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency_ms / 1000.0,
+        bandwidth=int(args.bandwidth_mbps * 1000**2 / 8),
+        products=args.products,
+        noise=args.noise,
+        payload_size=int(args.payload_mb * 1024**2),
+        seed=args.seed,
+    )
+    # The first line tells a parent process where to find us
+    print(json.dumps({"base_url": server.base_url}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Title: GibMacOS GUI Startup Benchmark
+Description: Import time and time to first window paint, checked against a budget
+Features:
+  - Every measurement in a fresh interpreter (nothing already imported)
+  - Interpreter baseline, backend/GUI import time and backend construction
+  - Launch to first paint of the main window (its first update_idletasks)
+  - Slowest imports from python -X importtime
+  - Budgets per metric - exits with 1 when a median goes over
+  - Results saved as JSON and compared against earlier runs
+Usage:
+  - python benchmarks/startup.py
+  - python benchmarks/startup.py --budget import_gui=0.08 --compare latest
+Dependencies: tkinter, requests, gibMacOS checkout (for Scripts/utils.py, run.py, plist.py)
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from bench import REPO_DIR, RESULTS_DIR, get_git_revision, print_comparison, summarize
+
+STARTUP_RESULTS_DIR = os.path.join(RESULTS_DIR, "startup")
+# Seconds, compared against the median of the runs
+BUDGETS = {
+    "import_backend": 0.040,
+    "import_gui": 0.060,
+    "backend_init": 0.010,
+    "first_paint": 0.750,
+}
+PAINT_MARKER = "gibgui-first-paint"
+
+TIMED_IMPORT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+# Runs the GUI until the main window's first update_idletasks, which is where
+# it is first drawn - the backend is only built after that
+FIRST_PAINT = """
+import gibmacos_gui
+
+def update_idletasks(self):
+    gibmacos_gui.tk.Tk.update_idletasks(self)
+    print("{marker}", flush=True)
+    raise SystemExit(0)
+
+gibmacos_gui.GibMacOSGUI.update_idletasks = update_idletasks
+gibmacos_gui.GibMacOSGUI().mainloop()
+"""
+
+TIMED_INIT = """
+import time
+import gibmacos_backend
+start = time.perf_counter()
+gibmacos_backend.GibMacOSBackend()
+print(time.perf_counter() - start)
+"""
+
+
+def get_env(gibmacos_dir):
+    # Same layout as bench.setup_path - the working tree, then the gibMacOS
+    # checkout for the upstream Scripts modules
+    paths = [REPO_DIR]
+    if gibmacos_dir and os.path.isdir(gibmacos_dir):
+        paths += [gibmacos_dir, os.path.join(gibmacos_dir, "Scripts")]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        paths + [x for x in [env.get("PYTHONPATH")] if x]
+    )
+    return env
+
+
+def run_child(code, env):
+    # Returns the last line printed by the child
+    output = subprocess.check_output(
+        [sys.executable, "-c", code],
+        cwd=REPO_DIR,
+        env=env,
+        universal_newlines=True,
+    )
+    return output.strip().splitlines()[-1]
+
+
+def time_interpreter(env):
+    start = time.perf_counter()
+    run_child("print(0)", env)
+    return time.perf_counter() - start
+
+
+def has_display():
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+
+def time_first_paint(env, timeout=60):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", FIRST_PAINT.format(marker=PAINT_MARKER)],
+        cwd=REPO_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    try:
+        for line in proc.stdout:
+            if line.strip() == PAINT_MARKER:
+                return time.perf_counter() - start
+        return None
+    finally:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def get_slowest_imports(module, env, top=10):
+    # -X importtime writes "import time: self | cumulative | name" to stderr
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=REPO_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    imports = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not line.startswith("import time:"):
+            continue
+        if parts[2].strip() == "site":
+            # Everything so far was interpreter startup
+            imports = []
+            continue
+        try:
+            self_us = int(parts[0].split(":")[1])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue
+        imports.append((cumulative_us, self_us, parts[2].strip()))
+    imports.sort(reverse=True)
+    return [
+        {"module": name, "self": self_us / 1e6, "cumulative": cumulative_us / 1e6}
+        for cumulative_us, self_us, name in imports[:top]
+    ]
+
+
+def run_benchmarks(args, env):
+    measures = {
+        # Interpreter startup on its own, to read the others against
+        "python": lambda: time_interpreter(env),
+        "import_backend": lambda: float(
+            run_child(TIMED_IMPORT.format(module="gibmacos_backend"), env)
+        ),
+        "import_gui": lambda: float(
+            run_child(TIMED_IMPORT.format(module="gibmacos_gui"), env)
+        ),
+        "backend_init": lambda: float(run_child(TIMED_INIT, env)),
+    }
+    results = {}
+    for name, func in measures.items():
+        values = []
+        for i in range(args.warmup + args.runs):
+            value = func()
+            if i >= args.warmup:
+                values.append(value)
+        results[name] = summarize(values)
+
+    if args.no_gui or not has_display():
+        print("Skipping first_paint (--no-gui or no display)")
+    else:
+        values = []
+        for i in range(args.warmup + args.runs):
+            value = time_first_paint(env)
+            if value is None:
+                print("Skipping first_paint (the GUI exited before painting)")
+                break
+            if i >= args.warmup:
+                values.append(value)
+        else:
+            results["first_paint"] = summarize(values)
+    return results
+
+
+def parse_budgets(values):
+    budgets = dict(BUDGETS)
+    for value in values or []:
+        name, _, seconds = value.partition("=")
+        try:
+            budgets[name.strip()] = float(seconds)
+        except ValueError:
+            raise SystemExit("Invalid budget {!r}, expected name=seconds".format(value))
+    return budgets
+
+
+def find_previous_result(exclude=None):
+    if not os.path.isdir(STARTUP_RESULTS_DIR):
+        return None
+    results = sorted(
+        os.path.join(STARTUP_RESULTS_DIR, x)
+        for x in os.listdir(STARTUP_RESULTS_DIR)
+        if x.endswith(".json")
+    )
+    results = [x for x in results if x != exclude]
+    return results[-1] if results else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark gibMacOS GUI startup against a time budget."
+    )
+    parser.add_argument(
+        "--gibmacos-dir",
+        default=os.environ.get("GIBMACOS_DIR", os.path.join(REPO_DIR, "gibMacOS")),
+        help="gibMacOS checkout providing Scripts/utils.py, run.py and plist.py",
+    )
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument(
+        "--budget",
+        action="append",
+        metavar="NAME=SECONDS",
+        help="override a budget, e.g. import_gui=0.08 (repeatable)",
+    )
+    parser.add_argument(
+        "--no-gui", action="store_true", help="skip the first paint measurement"
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="slowest imports to list (0 for none)"
+    )
+    parser.add_argument(
+        "--output", help="result file (default: benchmarks/results/startup/)"
+    )
+    parser.add_argument("--compare", help="result file to compare against, or 'latest'")
+    args = parser.parse_args()
+
+    budgets = parse_budgets(args.budget)
+    env = get_env(args.gibmacos_dir)
+    current = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "revision": get_git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"runs": args.runs, "warmup": args.warmup},
+        "budgets": budgets,
+        "results": run_benchmarks(args, env),
+    }
+    if args.top > 0:
+        current["slowest_imports"] = get_slowest_imports("gibmacos_gui", env, args.top)
+
+    output = args.output or os.path.join(
+        STARTUP_RESULTS_DIR,
+        datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(current, f, indent=2)
+
+    over = []
+    print(
+        "{:<20}{:>12}{:>12}{:>12}{:>12}".format(
+            "metric", "median", "min", "max", "budget"
+        )
+    )
+    for name, summary in current["results"].items():
+        budget = budgets.get(name)
+        if budget is not None and summary["median"] > budget:
+            over.append(name)
+        print(
+            "{:<20}{:>12.4f}{:>12.4f}{:>12.4f}{:>12}{}".format(
+                name,
+                summary["median"],
+                summary["min"],
+                summary["max"],
+                "-" if budget is None else "{:.4f}".format(budget),
+                "  OVER" if name in over else "",
+            )
+        )
+    if current.get("slowest_imports"):
+        print("\nSlowest imports under gibmacos_gui (cumulative seconds):")
+        for entry in current["slowest_imports"]:
+            print("  {:<40}{:>10.4f}".format(entry["module"], entry["cumulative"]))
+    print("\nSaved results to {}".format(output))
+
+    if args.compare:
+        baseline = (
+            find_previous_result(exclude=output)
+            if args.compare == "latest"
+            else args.compare
+        )
+        if baseline:
+            print_comparison(current, baseline)
+        else:
+            print("No earlier results to compare against.")
+
+    if over:
+        print("\nOver budget: {}".format(", ".join(over)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import importlib
+import plistlib
+import sys
+import types
+
+import Scripts
+
+# utils.py, run.py and plist.py come from the gibMacOS checkout run_gui.py
+# clones - without one, the tests get the little of them the backend uses
+
+
+class Utils:
+    def __init__(self, name="Python Script", interactive=True):
+        self.name = name
+        self.interactive = interactive
+
+
+class Run:
+    pass
+
+
+STAND_INS = {
+    "utils": {"Utils": Utils},
+    "run": {"Run": Run},
+    "plist": {
+        "load": plistlib.load,
+        "loads": plistlib.loads,
+        "dump": plistlib.dump,
+        "dumps": plistlib.dumps,
+    },
+}
+
+for name, attrs in STAND_INS.items():
+    try:
+        importlib.import_module("Scripts." + name)
+    except ImportError:
+        module = types.ModuleType("Scripts." + name)
+        module.__dict__.update(attrs)
+        sys.modules[module.__name__] = module
+        setattr(Scripts, name, module)
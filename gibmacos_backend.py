@@ -0,0 +1,1678 @@
+#!/usr/bin/env python3
+"""
+Title: GibMacOS Backend
+Description: Catalog, product and download logic shared by the GUI and CLI
+Features:
+  - Catalog download and local caching
+  - Product scanning with metadata cache into compact product records
+  - Package downloads with resume support
+  - Free-space preflight and atomic .part finalization
+  - Incremental mirror sync for a macOS version range with retention
+  - Sleep prevention (macOS)
+  - Debounced, atomic background saves of settings and caches
+Usage: Imported by gibmacos_gui.py and gibmacos_cli.py
+Dependencies: requests
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import concurrent.futures
+import contextlib
+import io
+import os
+import sys
+import json
+import time
+import re
+import shutil
+import subprocess
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "Scripts"))
+from Scripts import utils, run, plist, metrics, profiling, records, persist, jobs
+from Scripts import verify, catalog_worker, locking
+
+# downloader (requests), download_queue, package_store and cache_server are
+# imported where they are first used, so the GUI window is not held up by them
+from Scripts.metrics import timed
+
+
+class ProgramError(Exception):
+    def __init__(self, message, title="Error"):
+        super(Exception, self).__init__(message)
+        self.title = title
+
+
+class CancelledError(ProgramError):
+    def __init__(self, message="Operation cancelled by user."):
+        super().__init__(message, title="Operation Cancelled")
+
+
+class GibMacOSBackend:
+    def __init__(self, update_callback=None, progress_callback=None, cancel_event=None):
+        self.metrics = metrics.Metrics()
+        # Per-job cancellation - GUI actions run here side by side
+        self.jobs = jobs.JobExecutor(update_callback=self._update_status)
+        # Settings, product cache, local catalog and queue writes
+        self.persister = persist.Persister(update_callback=self._update_status)
+        # Created on first use - see the d property
+        self._d = None
+        self._d_lock = threading.RLock()
+        self.u = utils.Utils("gibMacOSGUI", interactive=False)
+        self.r = run.Run()
+
+        self.update_callback = update_callback
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+
+        self.settings_path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "Scripts", "settings.json"
+        )
+        self.settings = {}
+        if os.path.exists(self.settings_path):
+            try:
+                self.settings = json.load(open(self.settings_path))
+            except:
+                pass
+
+        self.prod_cache_path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "Scripts", "prod_cache.plist"
+        )
+        # Loaded on first use - see the prod_cache property
+        self._prod_cache = None
+        self._prod_cache_lock = threading.Lock()
+
+        self.current_macos = self.settings.get("current_macos", 20)
+        self.min_macos = 5
+        self.current_catalog = self.settings.get("current_catalog", "publicrelease")
+        # Fetch every catalog in catalog_suffix and show their products together
+        self.merged_catalogs = self.settings.get("merged_catalogs", False)
+        self.find_recovery = self.settings.get("find_recovery", False)
+        self.caffeinate_downloads = self.settings.get("caffeinate_downloads", True)
+        self.catalog_data = None
+        self.mac_prods = []
+        # Parse catalogs in a worker process (Scripts/catalog_worker.py)
+        self.parse_in_worker = self.settings.get("parse_in_worker", True)
+        # Smaller catalogs are parsed here - handing them to a worker costs
+        # more than the parse
+        self.worker_parse_min = 1024**2
+        # Created on first use and kept - see get_parse_pool
+        self._parse_pool = None
+
+        self.save_local = self.settings.get("save_local", False)
+        self.force_local = self.settings.get("force_local", False)
+        self.print_urls = self.settings.get("print_urls", False)
+        self.print_json = self.settings.get("print_json", False)
+        self.queue_concurrency = self.settings.get("queue_concurrency", 2)
+        self.queue_path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            "Scripts",
+            "download_queue.json",
+        )
+        self.download_queue = None
+        self.use_package_store = self.settings.get("use_package_store", False)
+        self.package_store_dir = self.settings.get("package_store_dir", "")
+        self.package_stores = {}
+        # Base URL of a LAN cache server (Scripts/cache_server.py) to fetch
+        # catalogs and packages through instead of Apple
+        self.catalog_server = self.settings.get("catalog_server", "")
+        # Per product folder record of where each file came from
+        self.manifest_name = ".gibgui_manifest.json"
+        self.manifest_lock = threading.Lock()
+        # Headroom left on the volume after a download's preflight check
+        self.free_space_margin = 256 * 1024**2
+        # "json" or "prometheus" - written after every operation when set
+        self.metrics_export = self.settings.get("metrics_export", "")
+        # Tune connections per host and read size from past throughput
+        # (Scripts/tuner.py), history kept in Scripts/tuning.json
+        self.auto_tune = self.settings.get("auto_tune", True)
+        self.tuning_path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "Scripts", "tuning.json"
+        )
+        self._tuner = None
+
+        self.catalog_suffix = {
+            "public": "beta",
+            "publicrelease": "",
+            "customer": "customerseed",
+            "developer": "seed",
+        }
+        self.mac_os_names_url = {
+            "8": "mountainlion",
+            "7": "lion",
+            "6": "snowleopard",
+            "5": "leopard",
+        }
+        self.version_names = {
+            "tiger": "10.4",
+            "leopard": "10.5",
+            "snow leopard": "10.6",
+            "lion": "10.7",
+            "mountain lion": "10.8",
+            "mavericks": "10.9",
+            "yosemite": "10.10",
+            "el capitan": "10.11",
+            "sierra": "10.12",
+            "high sierra": "10.13",
+            "mojave": "10.14",
+            "catalina": "10.15",
+            "big sur": "11",
+            "monterey": "12",
+            "ventura": "13",
+            "sonoma": "14",
+            "sequoia": "15",
+        }
+        self.recovery_suffixes = ("RecoveryHDUpdate.pkg", "RecoveryHDMetaDmg.pkg")
+        # Named package selections - file name suffixes, None is every package
+        self.package_presets = {
+            "full": ("Full installer", None),
+            "installer": ("InstallAssistant.pkg only", ("InstallAssistant.pkg",)),
+            "recovery": (
+                "Recovery only",
+                (
+                    "BaseSystem.dmg",
+                    "BaseSystem.chunklist",
+                    "RecoveryImage.dmg",
+                    "RecoveryImage.chunklist",
+                )
+                + self.recovery_suffixes,
+            ),
+            "dmg": ("Disk images only", (".dmg",)),
+        }
+        # Shared by direct downloads, the queue and mirror syncs - started by
+        # the first of them and stopped when the last one is done
+        self.caffeinate_process = None
+        self.caffeinate_users = 0
+        self.caffeinate_lock = threading.Lock()
+
+        self.settings_to_save = (
+            "current_macos",
+            "current_catalog",
+            "merged_catalogs",
+            "find_recovery",
+            "caffeinate_downloads",
+            "save_local",
+            "force_local",
+            "queue_concurrency",
+            "use_package_store",
+            "package_store_dir",
+            "metrics_export",
+            "catalog_server",
+            "auto_tune",
+        )
+
+        # Profiling wrappers are only installed when asked for, so the normal
+        # code path is untouched
+        self.profiler = None
+        if profiling.is_enabled(self.settings):
+            self.profiler = profiling.Profiler(
+                os.path.dirname(self.settings_path),
+                update_callback=self._update_status,
+            )
+            for name in ("get_catalog_data", "get_dict_for_prods", "download_prod"):
+                setattr(self, name, self.profiler.wrap(name, getattr(self, name)))
+
+    @property
+    def d(self):
+        if self._d is None:
+            with self._d_lock:
+                if self._d is None:
+                    from Scripts import downloader
+
+                    d = downloader.Downloader(
+                        interactive=False, update_callback=self._update_status
+                    )
+                    d.metrics = self.metrics
+                    d.tuner = self.tuner if self.auto_tune else None
+                    self._d = d
+        return self._d
+
+    @property
+    def tuner(self):
+        if self._tuner is None:
+            with self._d_lock:
+                if self._tuner is None:
+                    from Scripts import tuner
+
+                    self._tuner = tuner.Tuner(
+                        self.tuning_path, persister=self.persister
+                    )
+        return self._tuner
+
+    def get_max_connections(self):
+        from Scripts import tuner
+
+        return tuner.SETTINGS["connections"][0][-1]
+
+    def set_auto_tune(self, enabled):
+        self.auto_tune = bool(enabled)
+        if self._d is not None:
+            self._d.tuner = self.tuner if self.auto_tune else None
+
+    @property
+    def prod_cache(self):
+        # Parsing the plist is only paid for by the first scan, not at startup
+        if self._prod_cache is None:
+            with self._prod_cache_lock:
+                if self._prod_cache is None:
+                    self._prod_cache = self.load_prod_cache()
+        return self._prod_cache
+
+    @prod_cache.setter
+    def prod_cache(self, value):
+        self._prod_cache = value
+
+    def load_prod_cache(self):
+        if os.path.exists(self.prod_cache_path):
+            try:
+                with open(self.prod_cache_path, "rb") as f:
+                    prod_cache = plist.load(f)
+                assert isinstance(prod_cache, dict)
+                return prod_cache
+            except:
+                pass
+        return {}
+
+    def _update_status(self, message):
+        if self.update_callback:
+            self.update_callback(message)
+
+    def _update_progress(self, current, total, start_time):
+        if self.progress_callback:
+            self.progress_callback(current, total, start_time)
+
+    @contextlib.contextmanager
+    def operation(self, name):
+        # Logs a per-phase summary of everything that happened during the
+        # operation and exports the cumulative counters
+        since = self.metrics.snapshot()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._update_status(
+                self.metrics.summary(
+                    name, since, time.perf_counter() - start, get_size=self.d.get_size
+                )
+            )
+            if self.metrics_export:
+                try:
+                    self.metrics.export(
+                        self.get_metrics_path(), fmt=self.metrics_export
+                    )
+                except Exception as e:
+                    self._update_status(f"Failed to export metrics: {e}")
+
+    def get_metrics_path(self):
+        return os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            "Scripts",
+            "metrics.prom" if self.metrics_export == "prometheus" else "metrics.json",
+        )
+
+    def save_settings(self):
+        for setting in self.settings_to_save:
+            self.settings[setting] = getattr(self, setting, None)
+        try:
+            data = json.dumps(self.settings, indent=2).encode("utf-8")
+        except Exception as e:
+            raise ProgramError(
+                "Failed to save settings to:\n\n{}\n\nWith error:\n\n - {}\n".format(
+                    self.settings_path, repr(e)
+                ),
+                title="Error Saving Settings",
+            )
+        self.persister.schedule(self.settings_path, lambda: data)
+
+    def save_prod_cache(self):
+        # Entries are replaced, never changed in place, so a shallow copy is
+        # a stable snapshot for the writer thread
+        snapshot = dict(self.prod_cache)
+        # A force_local refresh starts from an empty cache - merging would
+        # bring back the entries it just cleared
+        merge = not self.force_local
+
+        def serialize():
+            # Runs under the file's lock - keep what other processes cached
+            # since this one loaded it
+            merged = self.load_prod_cache() if merge else {}
+            merged.update(snapshot)
+            f = io.BytesIO()
+            plist.dump(merged, f)
+            return f.getvalue()
+
+        self.persister.schedule(self.prod_cache_path, serialize)
+
+    def set_catalog(self, catalog):
+        self.current_catalog = (
+            catalog.lower()
+            if catalog.lower() in self.catalog_suffix
+            else "publicrelease"
+        )
+
+    def num_to_macos(self, macos_num, for_url=True):
+        if for_url:
+            return (
+                self.mac_os_names_url.get(str(macos_num), "10.{}".format(macos_num))
+                if macos_num <= 16
+                else str(macos_num - 5)
+            )
+        return "10.{}".format(macos_num) if macos_num <= 15 else str(macos_num - 5)
+
+    def macos_to_num(self, macos):
+        try:
+            macos_parts = [int(x) for x in macos.split(".")][
+                : 2 if macos.startswith("10.") else 1
+            ]
+            if macos_parts[0] == 11:
+                macos_parts = [10, 16]
+        except:
+            return None
+        if len(macos_parts) > 1:
+            return macos_parts[1]
+        return 5 + macos_parts[0]
+
+    def get_macos_versions(self, minos=None, maxos=None, catalog=""):
+        if minos is None:
+            minos = self.min_macos
+        if maxos is None:
+            maxos = self.current_macos
+        if minos > maxos:
+            minos, maxos = maxos, minos
+        os_versions = [
+            self.num_to_macos(x, for_url=True) for x in range(minos, maxos + 1)
+        ]
+        if catalog:
+            custom_cat_entry = os_versions[-1] + catalog
+            os_versions.append(custom_cat_entry)
+        return os_versions
+
+    def build_url(self, **kwargs):
+        catalog = kwargs.get("catalog", self.current_catalog).lower()
+        catalog = catalog if catalog.lower() in self.catalog_suffix else "publicrelease"
+        version = int(kwargs.get("version", self.current_macos))
+        server = self.catalog_server.rstrip("/") or "https://swscan.apple.com"
+        return "{}/content/catalogs/others/index-{}.merged-1.sucatalog".format(
+            server,
+            "-".join(
+                reversed(
+                    self.get_macos_versions(
+                        int(kwargs.get("min_version", self.min_macos)),
+                        version,
+                        catalog=self.catalog_suffix.get(catalog, ""),
+                    )
+                )
+            ),
+        )
+
+    def get_catalog_data(self, cancel_event=None):
+        cancel_event = cancel_event or self.cancel_event
+        if cancel_event and cancel_event.is_set():
+            raise CancelledError()
+        if self.merged_catalogs:
+            return self.get_merged_catalog_data(cancel_event=cancel_event)
+
+        url = self.build_url(catalog=self.current_catalog, version=self.current_macos)
+        self._update_status(f"Downloading {self.current_catalog} catalog from:\n{url}")
+
+        local_catalog = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "Scripts", "sucatalog.plist"
+        )
+
+        if self.save_local:
+            self._update_status(f"Checking for local catalog at:\n{local_catalog}")
+            if os.path.exists(local_catalog) and not self.force_local:
+                self._update_status(" - Found - loading...")
+                try:
+                    with self.metrics.phase("catalog_local_load"):
+                        with open(local_catalog, "rb") as f:
+                            b = f.read()
+                        self.catalog_data = self.parse_catalog(
+                            b, cancel_event=cancel_event
+                        )
+                    self._update_status("Catalog loaded from local file.")
+                    return True
+                except Exception as e:
+                    self._update_status(
+                        f" - Error loading local catalog: {e}. Downloading instead..."
+                    )
+            elif self.force_local:
+                self._update_status(" - Forcing re-download of local catalog...")
+            else:
+                self._update_status(
+                    " - Local catalog not found - downloading instead..."
+                )
+
+        try:
+            with self.metrics.phase("catalog_fetch"):
+                b = self.d.get_bytes(url, False, cancel_event=cancel_event)
+            if cancel_event and cancel_event.is_set():
+                raise CancelledError()
+            self.metrics.incr("catalog_bytes", len(b or b""))
+            with self.metrics.phase("catalog_parse"):
+                self.catalog_data = self.parse_catalog(b, cancel_event=cancel_event)
+            self._update_status("Catalog downloaded successfully.")
+        except CancelledError:
+            raise
+        except Exception as e:
+            self._update_status(f"Error downloading catalog: {e}")
+            return False
+
+        if self.save_local or self.force_local:
+            self._update_status(f" - Saving catalog to:\n - {local_catalog}")
+            # The downloaded bytes are the snapshot - written as-is in the
+            # background instead of re-serializing the parsed catalog
+            self.persister.schedule(local_catalog, lambda: b, delay=0)
+        return True
+
+    def parse_catalog(self, data, cancel_event=None):
+        # A full catalog takes long enough to parse that the GUI would stall
+        # on the GIL, so it is parsed in another process and only the
+        # products a scan needs come back (catalog_worker.scan_catalog)
+        args = (data, self.find_recovery, self.recovery_suffixes)
+        if not self.parse_in_worker or len(data or b"") < self.worker_parse_min:
+            return catalog_worker.scan_catalog(*args)
+        try:
+            future = self.get_parse_pool().submit(catalog_worker.scan_catalog, *args)
+            while True:
+                try:
+                    return future.result(timeout=0.1)
+                except concurrent.futures.TimeoutError:
+                    if cancel_event and cancel_event.is_set():
+                        # The worker finishes the parse and its result is
+                        # dropped
+                        future.cancel()
+                        raise CancelledError()
+        except (OSError, NotImplementedError, concurrent.futures.BrokenExecutor) as e:
+            # No usable process pool here (or the worker died) - parse in
+            # this process instead, the next parse starts a new pool
+            self.close_parse_pool(wait=False)
+            self._update_status(f"Catalog worker unavailable ({e}), parsing here")
+            return catalog_worker.scan_catalog(*args)
+
+    def get_parse_pool(self):
+        # One pool for the whole session - a new worker process re-imports the
+        # main module under spawn (macOS, Windows), which costs more than the
+        # parse it takes over
+        with self._d_lock:
+            if self._parse_pool is None:
+                self._parse_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=max(
+                        1, min(len(self.catalog_suffix), os.cpu_count() or 1)
+                    )
+                )
+            return self._parse_pool
+
+    def close_parse_pool(self, wait=True):
+        with self._d_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool:
+            pool.shutdown(wait=wait)
+
+    def get_merged_catalog_data(self, catalogs=None, cancel_event=None):
+        # All catalogs are fetched side by side and their products merged by
+        # ID - each product lists the catalogs it is in under "Catalogs"
+        cancel_event = cancel_event or self.cancel_event
+        catalogs = [
+            x for x in (catalogs or self.catalog_suffix) if x in self.catalog_suffix
+        ]
+
+        def fetch(catalog):
+            url = self.build_url(catalog=catalog, version=self.current_macos)
+            self._update_status(f"Downloading {catalog} catalog from:\n{url}")
+            b = self.d.get_bytes(url, False, cancel_event=cancel_event)
+            if cancel_event and cancel_event.is_set():
+                raise CancelledError()
+            if not b:
+                raise IOError("no data received")
+            self.metrics.incr("catalog_bytes", len(b or b""))
+            return self.parse_catalog(b, cancel_event=cancel_event)
+
+        results = {}
+        with self.metrics.phase("catalog_fetch"):
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(catalogs) or 1
+            ) as pool:
+                futures = {pool.submit(fetch, x): x for x in catalogs}
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                    except CancelledError:
+                        raise
+                    except Exception as e:
+                        self._update_status(
+                            f"Error downloading {futures[future]} catalog: {e}"
+                        )
+        if not results:
+            return False
+
+        merged = {}
+        for catalog in catalogs:
+            for prod, data in results.get(catalog, {}).get("Products", {}).items():
+                if not prod in merged:
+                    merged[prod] = dict(data, Catalogs=[])
+                merged[prod]["Catalogs"].append(catalog)
+        self.catalog_data = {"Products": merged}
+        self._update_status(
+            f"Merged {len(merged)} products from {len(results)} catalogs."
+        )
+        return True
+
+    @timed("get_installers")
+    def get_installers(self, plist_dict=None, cancel_event=None):
+        cancel_event = cancel_event or self.cancel_event
+        if not plist_dict:
+            plist_dict = self.catalog_data
+        if not plist_dict:
+            return []
+        mac_prods = []
+        for p, product in plist_dict.get("Products", {}).items():
+            if cancel_event and cancel_event.is_set():
+                raise CancelledError()
+            if catalog_worker.is_installer(
+                product, self.find_recovery, self.recovery_suffixes
+            ):
+                mac_prods.append(p)
+        return mac_prods
+
+    def get_build_version(self, dist_dict, cancel_event=None):
+        try:
+            dist_url = dist_dict.get("English", dist_dict.get("en", ""))
+            assert dist_url
+            with self.metrics.phase("metadata_dist_fetch"):
+                dist_file = self.d.get_string(
+                    dist_url, False, cancel_event=cancel_event
+                )
+            assert isinstance(dist_file, str)
+        except Exception as e:
+            dist_file = ""
+        return catalog_worker.parse_dist(dist_file)
+
+    @timed("metadata_scan")
+    def get_dict_for_prods(self, prods, plist_dict=None, cancel_event=None):
+        cancel_event = cancel_event or self.cancel_event
+        self._update_status("Scanning products after catalog download...")
+        plist_dict = plist_dict or self.catalog_data or {}
+        prod_list = []
+        prod_keys = (
+            "build",
+            "date",
+            "description",
+            "device_ids",
+            "installer",
+            "product",
+            "time",
+            "title",
+            "version",
+        )
+
+        def get_packages_and_size(plist_dict, prod, recovery):
+            packages = []
+            if recovery:
+                packages = [
+                    x
+                    for x in plist_dict.get("Products", {})
+                    .get(prod, {})
+                    .get("Packages", [])
+                    if x["URL"].endswith(self.recovery_suffixes)
+                ]
+            else:
+                packages = (
+                    plist_dict.get("Products", {}).get(prod, {}).get("Packages", [])
+                )
+            size = self.d.get_size(sum([i["Size"] for i in packages]))
+            return (packages, size)
+
+        def get_catalogs(plist_dict, prod):
+            # Only merged catalog data has "Catalogs"
+            return plist_dict.get("Products", {}).get(prod, {}).get("Catalogs") or [
+                self.current_catalog
+            ]
+
+        def prod_valid(prod, prod_list, prod_keys):
+            if (
+                not isinstance(prod_list, dict)
+                or not prod in prod_list
+                or not all(x in prod_list[prod] for x in prod_keys)
+            ):
+                return False
+            if any(prod_list[prod].get(x, "Unknown") == "Unknown" for x in prod_keys):
+                return False
+            return True
+
+        prod_changed = False
+        for prod in prods:
+            if cancel_event and cancel_event.is_set():
+                raise CancelledError()
+            if prod_valid(prod, self.prod_cache, prod_keys):
+                self.metrics.incr("metadata_cache_hits")
+                prodd = {}
+                for key in self.prod_cache[prod]:
+                    prodd[key] = self.prod_cache[prod][key]
+                prodd["packages"], prodd["size"] = get_packages_and_size(
+                    plist_dict, prod, self.find_recovery
+                )
+                prodd["catalogs"] = get_catalogs(plist_dict, prod)
+                prod_list.append(prodd)
+                continue
+
+            self.metrics.incr("metadata_cache_misses")
+            prodd = {"product": prod}
+            try:
+                url = (
+                    plist_dict.get("Products", {})
+                    .get(prod, {})
+                    .get("ServerMetadataURL", "")
+                )
+                assert url
+                with self.metrics.phase("metadata_smd_fetch"):
+                    b = self.d.get_bytes(url, False, cancel_event=cancel_event)
+                smd = plist.loads(b)
+            except:
+                smd = {}
+
+            prodd["date"] = (
+                plist_dict.get("Products", {}).get(prod, {}).get("PostDate", "")
+            )
+            prodd["installer"] = (
+                plist_dict.get("Products", {})
+                .get(prod, {})
+                .get("ExtendedMetaInfo", {})
+                .get("InstallAssistantPackageIdentifiers", {})
+                .get("OSInstall", {})
+                == "com.apple.mpkg.OSInstall"
+            )
+            prodd["time"] = (
+                time.mktime(prodd["date"].timetuple()) + prodd["date"].microsecond / 1e6
+            )
+            prodd["version"] = smd.get("CFBundleShortVersionString", "Unknown").strip()
+            try:
+                desc = (
+                    smd.get("localization", {})
+                    .get("English", {})
+                    .get("description", "")
+                    .decode("utf-8")
+                )
+                desctext = desc.split('"p1">')[1].split("</a>")[0]
+            except:
+                desctext = ""
+            prodd["description"] = desctext
+            prodd["packages"], prodd["size"] = get_packages_and_size(
+                plist_dict, prod, self.find_recovery
+            )
+            prodd["size"] = self.d.get_size(sum([i["Size"] for i in prodd["packages"]]))
+            prodd["catalogs"] = get_catalogs(plist_dict, prod)
+            prodd["build"], v, n, prodd["device_ids"] = self.get_build_version(
+                plist_dict.get("Products", {}).get(prod, {}).get("Distributions", {}),
+                cancel_event=cancel_event,
+            )
+            if cancel_event and cancel_event.is_set():
+                # An aborted fetch must not end up in prod_cache as "Unknown"
+                raise CancelledError()
+            prodd["title"] = (
+                smd.get("localization", {}).get("English", {}).get("title", n)
+            )
+            if v.lower() != "unknown":
+                prodd["version"] = v
+            prod_list.append(prodd)
+
+            if smd or not plist_dict.get("Products", {}).get(prod, {}).get(
+                "ServerMetadataURL", ""
+            ):
+                prod_changed = True
+                temp_prod = {}
+                for key in prodd:
+                    if key in ("packages", "size", "catalogs"):
+                        continue
+                    if prodd[key] == "Unknown":
+                        temp_prod = None
+                        break
+                    temp_prod[key] = prodd[key]
+                if temp_prod:
+                    self.prod_cache[prod] = temp_prod
+
+        if prod_changed and self.prod_cache:
+            try:
+                self.save_prod_cache()
+            except:
+                pass
+
+        prod_list = sorted(
+            (records.Product.from_dict(x) for x in prod_list),
+            key=lambda x: x["time"],
+            reverse=True,
+        )
+        return prod_list
+
+    def release_catalog(self):
+        # Products hold their own package records, so the parsed catalog is
+        # only needed again for the next refresh
+        self.catalog_data = None
+
+    def version_tuple(self, version):
+        parts = []
+        for part in str(version).split("."):
+            try:
+                parts.append(int(part))
+            except ValueError:
+                break
+        return tuple(parts)
+
+    def load_board_ids(self, path):
+        board_ids = []
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    line = line.split("#", 1)[0]
+                    for board_id in re.split(r"[\s,;]+", line):
+                        if board_id and board_id.lower() not in board_ids:
+                            board_ids.append(board_id.lower())
+        except Exception as e:
+            raise ProgramError(
+                "Failed to read board IDs from:\n\n{}\n\nWith error:\n\n - {}\n".format(
+                    path, repr(e)
+                ),
+                title="Error Reading Board IDs",
+            )
+        return board_ids
+
+    def get_fleet_compatibility(self, board_ids, prods, cancel_event=None):
+        cancel_event = cancel_event or self.cancel_event
+        results = {x.lower(): {"compatible": [], "best": None} for x in board_ids}
+        wanted = set(results)
+
+        def rank(prod):
+            return (self.version_tuple(prod["version"]), prod["time"])
+
+        # A single pass over the products - each one is matched against the
+        # whole fleet at once through a set intersection of its device IDs.
+        for prod in prods:
+            if cancel_event and cancel_event.is_set():
+                raise CancelledError()
+            for board_id in wanted.intersection(prod.get("device_ids") or []):
+                entry = results[board_id]
+                entry["compatible"].append(prod["product"])
+                if entry["best"] is None or rank(prod) > rank(entry["best"]):
+                    entry["best"] = prod
+        return results
+
+    def start_caffeinate(self):
+        # Every call is paired with a term_caffeinate_proc
+        with self.caffeinate_lock:
+            self.caffeinate_users += 1
+            if (
+                sys.platform.lower() == "darwin"
+                and self.caffeinate_downloads
+                and os.path.isfile("/usr/bin/caffeinate")
+                and (
+                    self.caffeinate_process is None
+                    or self.caffeinate_process.poll() is not None
+                )
+            ):
+                self.caffeinate_process = subprocess.Popen(
+                    ["/usr/bin/caffeinate"],
+                    stderr=getattr(subprocess, "DEVNULL", open(os.devnull, "w")),
+                    stdout=getattr(subprocess, "DEVNULL", open(os.devnull, "w")),
+                    stdin=getattr(subprocess, "DEVNULL", open(os.devnull, "w")),
+                )
+            return self.caffeinate_process
+
+    def term_caffeinate_proc(self):
+        with self.caffeinate_lock:
+            self.caffeinate_users = max(0, self.caffeinate_users - 1)
+            if self.caffeinate_users or self.caffeinate_process is None:
+                return True
+            process, self.caffeinate_process = self.caffeinate_process, None
+        try:
+            if process.poll() is None:
+                start = time.time()
+                while process.poll() is None:
+                    if time.time() - start > 10:
+                        self._update_status(
+                            f"Timed out trying to terminate caffeinate process with PID {process.pid}!"
+                        )
+                        return False
+                    process.terminate()
+                    time.sleep(0.02)
+        except:
+            pass
+        return True
+
+    def get_product_folder(self, prod, download_dir):
+        name = (
+            "{} - {} {} ({})".format(
+                prod["product"], prod["version"], prod["title"], prod["build"]
+            )
+            .replace(":", "")
+            .strip()
+        )
+        return os.path.join(download_dir, name)
+
+    def get_download_list(self, prod, dmg=False, packages=None):
+        # packages limits the list to those file names
+        dl_list = []
+        for x in prod["packages"]:
+            if not x.get("URL", None):
+                continue
+            if dmg and not x.get("URL", "").lower().endswith(".dmg"):
+                continue
+            if packages is not None and os.path.basename(x["URL"]) not in packages:
+                continue
+            dl_list.append(x)
+        return dl_list
+
+    def get_preset_packages(self, prod, preset):
+        if not preset in self.package_presets:
+            raise ProgramError(
+                "Unknown package preset: {} (choose from {})".format(
+                    preset, ", ".join(self.package_presets)
+                ),
+                title="Invalid Input",
+            )
+        suffixes = self.package_presets[preset][1]
+        return [
+            os.path.basename(x["URL"])
+            for x in self.get_download_list(prod)
+            if suffixes is None
+            or x["URL"].lower().endswith(tuple(y.lower() for y in suffixes))
+        ]
+
+    def get_packages_size(self, prod, packages=None):
+        return sum(
+            max(0, x.get("Size", 0))
+            for x in self.get_download_list(prod, packages=packages)
+        )
+
+    def download_prod(
+        self,
+        prod,
+        download_dir,
+        dmg=False,
+        downloader=None,
+        progress_callback=None,
+        cancel_event=None,
+        caffeinate=True,
+        packages=None,
+    ):
+        d = downloader or self.d
+        progress_callback = progress_callback or self.progress_callback
+        cancel_event = cancel_event or self.cancel_event
+
+        full_download_path = self.get_product_folder(prod, download_dir)
+        dl_list = self.get_download_list(prod, dmg=dmg, packages=packages)
+
+        if not len(dl_list):
+            raise ProgramError("There were no files to download for this product.")
+
+        if not os.path.isdir(full_download_path):
+            os.makedirs(full_download_path)
+
+        store = self.get_package_store(download_dir) if self.use_package_store else None
+        if store:
+            os.makedirs(store.root, exist_ok=True)
+        self.check_free_space(
+            self.get_bytes_needed(dl_list, full_download_path, store),
+            store.root if store else full_download_path,
+        )
+
+        failed_downloads = []
+        if caffeinate:
+            self.start_caffeinate()
+        try:
+            for c, x in enumerate(dl_list, start=1):
+                if cancel_event and cancel_event.is_set():
+                    raise CancelledError()
+
+                file_name = os.path.basename(x["URL"])
+                try:
+                    self._download_package(
+                        x,
+                        full_download_path,
+                        d,
+                        store=store,
+                        progress_callback=progress_callback,
+                        cancel_event=cancel_event,
+                        counter=f"file {c} of {len(dl_list)}",
+                    )
+                except CancelledError:
+                    # Also raised while waiting on a store lock or another
+                    # process's lease - a cancel, not a failed file
+                    raise
+                except Exception as e:
+                    self.metrics.incr("packages_failed")
+                    self._update_status(f"Failed to download {file_name}: {e}")
+                    failed_downloads.append(file_name)
+        finally:
+            if caffeinate:
+                self.term_caffeinate_proc()
+
+        if failed_downloads:
+            raise ProgramError(
+                f"{len(failed_downloads)} files failed to download: {', '.join(failed_downloads)}",
+                title="Download Failed",
+            )
+
+    def _download_package(
+        self,
+        x,
+        full_download_path,
+        d,
+        store=None,
+        progress_callback=None,
+        cancel_event=None,
+        counter="file",
+    ):
+        url = x["URL"]
+        file_name = os.path.basename(url)
+        file_path = os.path.join(full_download_path, file_name)
+        store_lock = store.lock_for(x) if store else None
+        # Download into the store once and hard link it into the product
+        # folder - other products reuse the same object
+        target_path = store.object_path(x) if store else file_path
+        lease = None
+
+        if store_lock:
+            # Another job may be downloading the same object - wait for it,
+            # but still answer this job's Cancel
+            while not store_lock.acquire(timeout=0.1):
+                if cancel_event and cancel_event.is_set():
+                    raise CancelledError("Download cancelled by user.")
+        try:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            # Held while this process owns the file - another GUI or CLI
+            # run waits on it instead of downloading the same file
+            lease = self._acquire_lease(target_path, x, progress_callback, cancel_event)
+            if store:
+                store.adopt(x, file_path)
+                if store.is_complete(x, target_path):
+                    method = store.link_into(x, file_path)
+                    self.record_validator(full_download_path, x)
+                    self.metrics.incr("packages_reused")
+                    self._update_status(
+                        f"Reused {file_name} from the package store ({method})."
+                    )
+                    return "reused"
+
+            # Data goes to a .part file that is only renamed into place
+            # once it is complete, so a file under its real name is finished
+            size = x.get("Size", -1)
+            part_path = target_path + ".part"
+            if os.path.isfile(target_path):
+                existing = os.path.getsize(target_path)
+                if size <= 0 or existing == size:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    self.metrics.incr("packages_skipped")
+                    self._update_status(f"Already downloaded: {file_name}")
+                    return "skipped"
+                if existing < size and not os.path.exists(part_path):
+                    # Partial download from before .part files - resume it
+                    os.replace(target_path, part_path)
+                else:
+                    os.remove(target_path)
+
+            resume_bytes = 0
+            if os.path.exists(part_path):
+                resume_bytes = os.path.getsize(part_path)
+
+            self._update_status(
+                f"Downloading {counter}: {file_name} to {full_download_path}"
+            )
+            transfer = d.transfer(
+                url,
+                part_path,
+                resume_bytes=resume_bytes,
+                allow_resume=True,
+                callback=progress_callback,
+                cancel_event=cancel_event,
+            )
+            with self.metrics.phase("package_download"):
+                result = transfer.run()
+            if result is None:
+                if transfer.state == "cancelled" or (
+                    cancel_event and cancel_event.is_set()
+                ):
+                    raise CancelledError("Download cancelled by user.")
+                else:
+                    raise Exception(
+                        "Download failed or was interrupted ({}).".format(
+                            transfer.error or "no specific error"
+                        )
+                    )
+            actual = os.path.getsize(part_path)
+            if size > 0 and actual != size:
+                if actual > size:
+                    os.remove(part_path)
+                raise Exception(f"Size mismatch - expected {size} bytes, got {actual}.")
+            os.replace(part_path, target_path)
+            if store:
+                store.link_into(x, file_path)
+            self.record_validator(full_download_path, x, transfer.response_headers)
+            self.metrics.incr("packages_downloaded")
+            self._update_status(f"Successfully downloaded: {file_name}")
+            return "downloaded"
+        finally:
+            if lease:
+                lease.release()
+            if store_lock:
+                store_lock.release()
+
+    def _acquire_lease(self, target_path, x, progress_callback=None, cancel_event=None):
+        lease = locking.Lease(target_path + ".lease")
+        info = {"url": x["URL"]}
+        if lease.acquire(blocking=False, info=info):
+            return lease
+        # Another process (or job) is on it - follow its .part file for
+        # progress and take over once it lets go, by then the file is usually
+        # complete and gets skipped, otherwise the .part is resumed
+        holder = lease.holder()
+        file_name = os.path.basename(x["URL"])
+        self._update_status(
+            "{} is already being downloaded (pid {} on {}), waiting for it...".format(
+                file_name, holder.get("pid", "?"), holder.get("host", "?")
+            )
+        )
+        self.metrics.incr("packages_waited")
+        size = x.get("Size", -1)
+        start_time = time.time()
+        while not lease.acquire(timeout=1, cancel_event=cancel_event, info=info):
+            if cancel_event and cancel_event.is_set():
+                raise CancelledError("Download cancelled by user.")
+            if progress_callback:
+                current = 0
+                for path in (target_path + ".part", target_path):
+                    if os.path.isfile(path):
+                        current = os.path.getsize(path)
+                        break
+                progress_callback(current, size, start_time)
+        return lease
+
+    def load_manifest(self, folder):
+        try:
+            with open(os.path.join(folder, self.manifest_name), "r") as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def record_validator(self, folder, package, headers=None):
+        # Remembers what each file in a product folder was downloaded from, so
+        # a mirror sync can tell a stale file from a current one
+        headers = headers or {}
+        manifest_path = os.path.join(folder, self.manifest_name)
+        # Other processes may be adding their files to the same manifest
+        with self.manifest_lock, locking.FileLock(manifest_path + ".lock"):
+            manifest = self.load_manifest(folder)
+            manifest[os.path.basename(package["URL"])] = {
+                "URL": package["URL"],
+                "Size": package.get("Size", -1),
+                "Digest": package.get("Digest", ""),
+                "ETag": headers.get("ETag", ""),
+                "Last-Modified": headers.get("Last-Modified", ""),
+            }
+            try:
+                persist.write_atomic(
+                    manifest_path, json.dumps(manifest, indent=2).encode("utf-8")
+                )
+            except Exception as e:
+                self._update_status(f"Failed to update {manifest_path}: {e}")
+
+    def get_package_state(
+        self,
+        folder,
+        package,
+        manifest,
+        revalidate=False,
+        cancel_event=None,
+        store=None,
+    ):
+        file_path = os.path.join(folder, os.path.basename(package["URL"]))
+        size = package.get("Size", -1)
+        if not os.path.isfile(file_path):
+            if os.path.exists(file_path + ".part"):
+                return "incomplete"
+            # Only needs a link from the package store, nothing to download
+            if store and store.is_complete(package):
+                return "stored"
+            return "missing"
+        if size > 0 and os.path.getsize(file_path) != size:
+            return "incomplete"
+        entry = manifest.get(os.path.basename(package["URL"]))
+        if not entry:
+            # Downloaded before manifests existed - the size is all we have
+            return "complete"
+        from Scripts import cache_server
+
+        # Compared without the host a catalog_server puts in front, so
+        # switching to or from a cache server does not re-download the mirror
+        if (
+            cache_server.get_upstream_path(entry.get("URL"))
+            != cache_server.get_upstream_path(package["URL"])
+            or (size > 0 and entry.get("Size", -1) > 0 and entry["Size"] != size)
+            or (
+                entry.get("Digest")
+                and package.get("Digest")
+                and entry["Digest"] != package["Digest"]
+            )
+        ):
+            return "changed"
+        if revalidate and (entry.get("ETag") or entry.get("Last-Modified")):
+            from Scripts import downloader
+
+            try:
+                headers = self.d.fetch(
+                    package["URL"], method="HEAD", cancel_event=cancel_event
+                ).headers
+                for key in ("ETag", "Last-Modified"):
+                    if entry.get(key) and headers.get(key, entry[key]) != entry[key]:
+                        return "changed"
+            except downloader.RequestCancelled:
+                raise CancelledError()
+            except Exception as e:
+                self._update_status(f"Could not revalidate {package['URL']}: {e}")
+        return "complete"
+
+    def get_sync_plan(
+        self,
+        prods,
+        download_dir,
+        min_version=None,
+        max_version=None,
+        keep=0,
+        dmg=False,
+        revalidate=False,
+        cancel_event=None,
+    ):
+        # min_version/max_version are macOS numbers as used by
+        # get_macos_versions (10.15 -> 15, 14 -> 19)
+        cancel_event = cancel_event or self.cancel_event
+        versions = set(self.get_macos_versions(min_version, max_version))
+        in_range = [
+            prod
+            for prod in prods
+            if self.macos_to_num(prod["version"]) is not None
+            and self.num_to_macos(self.macos_to_num(prod["version"])) in versions
+        ]
+
+        def group(version):
+            parts = self.version_tuple(version)
+            return parts[:2] if parts[:1] == (10,) else parts[:1]
+
+        def newest_first(items):
+            return sorted(
+                items,
+                key=lambda x: (self.version_tuple(x[0]), x[1]),
+                reverse=True,
+            )
+
+        # Retention - only the newest "keep" builds of each major version are
+        # mirrored, older builds in the range are superseded
+        selected = in_range
+        if keep > 0:
+            by_group = {}
+            for prod in newest_first([(x["version"], x["build"], x) for x in in_range]):
+                by_group.setdefault(group(prod[0]), []).append(prod[2])
+            selected = [
+                x for group_prods in by_group.values() for x in group_prods[:keep]
+            ]
+
+        store = self.get_package_store(download_dir) if self.use_package_store else None
+        plan = {"products": [], "downloads": [], "bytes": 0, "superseded": []}
+        for prod in selected:
+            folder = self.get_product_folder(prod, download_dir)
+            manifest = self.load_manifest(folder)
+            states = {}
+            for x in self.get_download_list(prod, dmg=dmg):
+                if cancel_event and cancel_event.is_set():
+                    raise CancelledError()
+                state = self.get_package_state(
+                    folder,
+                    x,
+                    manifest,
+                    revalidate=revalidate,
+                    cancel_event=cancel_event,
+                    store=store,
+                )
+                states[state] = states.get(state, 0) + 1
+                if state != "complete":
+                    plan["downloads"].append((prod, folder, x, state))
+                if state not in ("complete", "stored"):
+                    plan["bytes"] += max(0, x.get("Size", 0))
+            plan["products"].append((prod, folder, states))
+
+        if keep > 0 and os.path.isdir(download_dir):
+            kept = set(os.path.basename(x[1]) for x in plan["products"])
+            for name in sorted(os.listdir(download_dir)):
+                match = re.match(r"^\d{3}-\d{5} - (\S+) .*\(([^)]+)\)$", name)
+                path = os.path.join(download_dir, name)
+                if not match or name in kept or not os.path.isdir(path):
+                    continue
+                num = self.macos_to_num(match.group(1))
+                if num is None or self.num_to_macos(num) not in versions:
+                    continue
+                plan["superseded"].append(path)
+        return plan
+
+    def sync_mirror(
+        self,
+        plan,
+        jobs=None,
+        prune=False,
+        progress_callback=None,
+        cancel_event=None,
+    ):
+        cancel_event = cancel_event or self.cancel_event
+        downloads = plan["downloads"]
+
+        def get_store(folder):
+            # Product folders sit directly in the download directory
+            if not self.use_package_store:
+                return None
+            return self.get_package_store(os.path.dirname(folder))
+
+        if not jobs:
+            # With tuning on, the tuner caps the connections per host and the
+            # extra workers just wait for a slot
+            jobs = self.get_max_connections() if self.auto_tune else 4
+        if downloads:
+            # Check against the bytes still missing, resumable .part files count
+            folders = {}
+            for prod, folder, x, state in downloads:
+                folders.setdefault(folder, []).append(x)
+            needed = sum(
+                self.get_bytes_needed(packages, folder, store=get_store(folder))
+                for folder, packages in folders.items()
+            )
+            download_dir = os.path.dirname(next(iter(folders)))
+            os.makedirs(download_dir, exist_ok=True)
+            self.check_free_space(needed, download_dir)
+
+        progress_lock = threading.Lock()
+        progress = {}
+        start_time = time.time()
+
+        def package_progress(key):
+            def callback(current, total, started):
+                with progress_lock:
+                    progress[key] = current
+                    done = sum(progress.values())
+                if progress_callback:
+                    progress_callback(done, plan["bytes"], start_time)
+
+            return callback
+
+        def sync_package(index, prod, folder, x, state):
+            if cancel_event and cancel_event.is_set():
+                raise CancelledError()
+            os.makedirs(folder, exist_ok=True)
+            file_path = os.path.join(folder, os.path.basename(x["URL"]))
+            if state == "changed" and os.path.exists(file_path):
+                os.remove(file_path)
+            return self._download_package(
+                x,
+                folder,
+                self.d,
+                store=get_store(folder),
+                progress_callback=package_progress(index),
+                cancel_event=cancel_event,
+                counter="{} ({} {})".format(
+                    os.path.basename(x["URL"]), prod["version"], prod["build"]
+                ),
+            )
+
+        failed = []
+        if downloads:
+            self.start_caffeinate()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = {
+                    pool.submit(sync_package, i, *entry): entry
+                    for i, entry in enumerate(downloads)
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    prod, folder, x, state = futures[future]
+                    try:
+                        future.result()
+                    except CancelledError:
+                        # Raised below once the pool has wound down
+                        pass
+                    except Exception as e:
+                        self.metrics.incr("packages_failed")
+                        failed.append(os.path.join(folder, os.path.basename(x["URL"])))
+                        self._update_status(
+                            f"Failed to sync {os.path.basename(x['URL'])}: {e}"
+                        )
+        finally:
+            if downloads:
+                self.term_caffeinate_proc()
+
+        if cancel_event and cancel_event.is_set():
+            raise CancelledError()
+        if failed:
+            # Superseded builds are only removed once the newer ones are complete
+            raise ProgramError(
+                f"{len(failed)} files failed to sync: {', '.join(failed)}",
+                title="Sync Failed",
+            )
+        pruned = []
+        if prune:
+            for path in plan["superseded"]:
+                self._update_status(f"Removing superseded build {path}")
+                shutil.rmtree(path, ignore_errors=True)
+                pruned.append(path)
+        return pruned
+
+    def get_library_folders(self, download_dir):
+        # product ID -> product folders, from the names get_product_folder uses
+        folders = {}
+        if not os.path.isdir(download_dir):
+            return folders
+        for name in sorted(os.listdir(download_dir)):
+            path = os.path.join(download_dir, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            folders.setdefault(name.split(" - ", 1)[0].strip(), []).append(path)
+        return folders
+
+    def get_chunklists(self, folder, packages, integrity=True, cancel_event=None):
+        # file name -> [(size, sha256), ...] for every package a chunklist covers
+        chunklists = {}
+        for x in packages:
+            name = os.path.basename(x["URL"])
+            sources = []
+            if name.lower().endswith(".chunklist"):
+                # BaseSystem.chunklist covers BaseSystem.dmg
+                path = os.path.join(folder, name)
+                if os.path.isfile(path):
+                    sources.append((os.path.splitext(name)[0] + ".dmg", path, None))
+            if integrity and x.get("IntegrityDataURL"):
+                sources.append((name, None, x["IntegrityDataURL"]))
+            for target, path, url in sources:
+                if not os.path.isfile(os.path.join(folder, target)):
+                    continue
+                try:
+                    if path:
+                        with open(path, "rb") as f:
+                            data = f.read()
+                    else:
+                        data = self.d.get_bytes(url, False, cancel_event=cancel_event)
+                        if cancel_event and cancel_event.is_set():
+                            raise CancelledError("Verification cancelled by user.")
+                        if not data:
+                            raise Exception("download failed")
+                    chunklists[target] = verify.parse_chunklist(data)
+                except CancelledError:
+                    raise
+                except Exception as e:
+                    self._update_status(
+                        f"Could not use the chunklist for {target}, checking without it: {e}"
+                    )
+        return chunklists
+
+    def verify_library(
+        self,
+        prods,
+        download_dir,
+        jobs=None,
+        dmg=False,
+        integrity=True,
+        progress_callback=None,
+        cancel_event=None,
+    ):
+        # Checks every product folder in download_dir against the catalog
+        # without downloading anything again (chunklists from IntegrityDataURL
+        # are the only exception). Returns one entry per package, status is
+        # "ok", "missing", "incomplete", "size", "digest", "chunklist" or "error".
+        cancel_event = cancel_event or self.cancel_event
+        prods_by_id = {x["product"]: x for x in prods}
+        results = []
+        work = []
+        for product_id, folders in self.get_library_folders(download_dir).items():
+            prod = prods_by_id.get(product_id)
+            for folder in folders:
+                if prod:
+                    packages = self.get_download_list(prod, dmg=dmg)
+                else:
+                    # Not in this catalog - check what the manifest recorded
+                    packages = [
+                        records.Package.from_dict(x)
+                        for x in self.load_manifest(folder).values()
+                    ]
+                    if not packages:
+                        self._update_status(
+                            f"Skipping {folder} - no matching product in the catalog."
+                        )
+                        continue
+                chunklists = self.get_chunklists(
+                    folder, packages, integrity=integrity, cancel_event=cancel_event
+                )
+                for x in packages:
+                    name = os.path.basename(x["URL"])
+                    file_path = os.path.join(folder, name)
+                    entry = {
+                        "product": product_id,
+                        "title": prod["title"] if prod else "",
+                        "version": prod["version"] if prod else "",
+                        "build": prod["build"] if prod else "",
+                        "folder": folder,
+                        "file": file_path,
+                        "url": x["URL"],
+                        "status": "ok",
+                        "detail": "",
+                    }
+                    if not os.path.isfile(file_path):
+                        entry["status"] = (
+                            "incomplete"
+                            if os.path.exists(file_path + ".part")
+                            else "missing"
+                        )
+                        results.append(entry)
+                        continue
+                    work.append(
+                        (
+                            entry,
+                            (
+                                file_path,
+                                x.get("Size", -1),
+                                x.get("Digest", ""),
+                                chunklists.get(name),
+                            ),
+                        )
+                    )
+
+        total = sum(os.path.getsize(args[0]) for entry, args in work)
+        self._update_status(
+            f"Verifying {len(work)} files ({self.d.get_size(total)}) in {download_dir}"
+        )
+        done = 0
+        start_time = time.time()
+        # Hashing is CPU bound - processes rather than threads
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs or None)
+        cancelled = False
+        pending = {}
+        try:
+            with self.metrics.phase("library_verify"):
+                pending = {
+                    pool.submit(verify.verify_file, *args): entry
+                    for entry, args in work
+                }
+                while pending:
+                    if cancel_event and cancel_event.is_set():
+                        cancelled = True
+                        raise CancelledError("Verification cancelled by user.")
+                    finished, _ = concurrent.futures.wait(
+                        pending,
+                        timeout=0.5,
+                        return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                    for future in finished:
+                        entry = pending.pop(future)
+                        result = future.result()
+                        entry["status"] = result["status"]
+                        entry["detail"] = result["detail"]
+                        results.append(entry)
+                        done += result["bytes"]
+                        self.metrics.incr("packages_verified")
+                        if entry["status"] != "ok":
+                            self.metrics.incr("packages_corrupt")
+                            self._update_status(
+                                f"Failed verification ({entry['status']}): {entry['file']} - {entry['detail']}"
+                            )
+                        if progress_callback:
+                            progress_callback(done, total, start_time)
+        finally:
+            # cancel_futures needs Python 3.9
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=not cancelled)
+        results.sort(key=lambda x: (x["folder"], x["file"]))
+        return results
+
+    def repair_library(self, results, prods, download_dir, dmg=False):
+        # Deletes files that failed verification and queues just those
+        # packages to download again. Files of products that are no longer
+        # in the catalog could not be downloaded again, so they are only
+        # reported. Returns (removed, queued).
+        store = self.get_package_store(download_dir) if self.use_package_store else None
+        prods_by_id = {x["product"]: x for x in prods}
+        removed = []
+        queued = {}
+        for entry in results:
+            if entry["status"] not in (
+                "size",
+                "digest",
+                "chunklist",
+                "missing",
+                "incomplete",
+            ):
+                continue
+            prod = prods_by_id.get(entry["product"])
+            if prod is None:
+                self._update_status(
+                    f"{entry['file']} is not in the current catalog and cannot be queued, leaving it as it is."
+                )
+                continue
+            if entry["status"] in ("size", "digest", "chunklist"):
+                if store:
+                    # A hard link shares the bad data with the store object
+                    package = {"URL": entry["url"]}
+                    for x in prod.get("packages", []):
+                        if x["URL"] == entry["url"]:
+                            package = x
+                    store_path = store.object_path(package)
+                    if os.path.isfile(store_path) and os.path.samefile(
+                        store_path, entry["file"]
+                    ):
+                        os.remove(store_path)
+                os.remove(entry["file"])
+                removed.append(entry["file"])
+            queued.setdefault(prod["product"], []).append(
+                os.path.basename(entry["file"])
+            )
+        for product_id, packages in queued.items():
+            self.queue_prod(
+                prods_by_id[product_id], download_dir, dmg=dmg, packages=packages
+            )
+        return removed, list(queued)
+
+    def get_bytes_needed(self, packages, folder, store=None):
+        # Bytes still to be written, counting complete files and partial
+        # downloads that will be resumed as already there
+        needed = 0
+        for x in packages:
+            size = x.get("Size", -1)
+            if size <= 0:
+                continue
+            paths = [os.path.join(folder, os.path.basename(x["URL"]))]
+            if store:
+                paths.insert(0, store.object_path(x))
+            have = 0
+            for path in paths:
+                for candidate in (path, path + ".part"):
+                    if os.path.isfile(candidate):
+                        have = max(have, min(os.path.getsize(candidate), size))
+            needed += size - have
+        return needed
+
+    def check_free_space(self, needed, path):
+        free = shutil.disk_usage(path).free
+        if needed + self.free_space_margin > free:
+            raise ProgramError(
+                "This download needs {} but only {} is free on the volume holding {}.".format(
+                    self.d.get_size(needed + self.free_space_margin).strip(),
+                    self.d.get_size(free).strip(),
+                    path,
+                ),
+                title="Not Enough Disk Space",
+            )
+
+    def get_cache_server(self, cache_dir, host="0.0.0.0", port=8000, catalog_ttl=3600):
+        from Scripts import cache_server
+
+        return cache_server.CacheServer(
+            cache_dir,
+            self.d,
+            host=host,
+            port=port,
+            catalog_ttl=catalog_ttl,
+            update_callback=self._update_status,
+        )
+
+    def get_package_store(self, download_dir):
+        # The store defaults to a hidden folder inside the download directory so
+        # that it sits on the same volume and hard links work
+        root = self.package_store_dir or os.path.join(download_dir, ".package_store")
+        if root not in self.package_stores:
+            from Scripts import package_store
+
+            self.package_stores.setdefault(root, package_store.PackageStore(root))
+        return self.package_stores[root]
+
+    def serialize_product(self, prod):
+        prodd = {}
+        for key, value in prod.items():
+            if key == "date":
+                value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+            elif key == "packages":
+                value = [
+                    {k: v for k, v in x.items() if isinstance(v, (str, int, float))}
+                    for x in value
+                ]
+            prodd[key] = value
+        return prodd
+
+    def get_download_queue(self):
+        if self.download_queue is None:
+            from Scripts import download_queue
+
+            self.download_queue = download_queue.DownloadQueue(
+                self.queue_path,
+                self._run_queue_job,
+                concurrency=self.queue_concurrency,
+                update_callback=self.update_callback,
+                on_start=self.start_caffeinate,
+                on_idle=self.term_caffeinate_proc,
+                persister=self.persister,
+            )
+        return self.download_queue
+
+    def queue_prod(self, prod, download_dir, priority=0, dmg=False, packages=None):
+        return self.get_download_queue().add(
+            self.serialize_product(prod),
+            download_dir,
+            priority=priority,
+            dmg=dmg,
+            packages=packages,
+        )
+
+    def _run_queue_job(self, job, cancel_event, progress_callback):
+        with self.operation("queue job {}".format(job["id"])):
+            self.download_prod(
+                job["product"],
+                job["download_dir"],
+                dmg=job.get("dmg", False),
+                packages=job.get("packages"),
+                progress_callback=progress_callback,
+                cancel_event=cancel_event,
+                caffeinate=False,
+            )
@@ -0,0 +1,751 @@
+#!/usr/bin/env python3
+"""
+Title: GibMacOS Command Line Interface
+Description: Headless companion to the gibMacOS GUI for servers and CI pipelines
+Features:
+  - Catalog refresh without a display (tkinter is never imported)
+  - Product listing as JSON, optionally merged across every catalog
+  - Downloads by product ID, build or version, of every package or a subset
+  - Machine-readable (JSON lines) progress on stdout
+  - Fleet compatibility report for a file of board/device IDs
+  - Persistent, prioritised download queue for unattended batch pulls
+  - Incremental mirror sync of a macOS version range with retention
+  - Parallel verification of an existing download library
+  - LAN cache server mode so a fleet downloads each package from Apple once
+  - Connections and read size tuned per host from past throughput (--no-tune)
+Usage:
+  - python gibmacos_cli.py refresh
+  - python gibmacos_cli.py list
+  - python gibmacos_cli.py --merged list
+  - python gibmacos_cli.py download --build 23A344 --dest ~/macOS\\ Downloads
+  - python gibmacos_cli.py download --version 14 --preset recovery
+  - python gibmacos_cli.py fleet board_ids.txt [--json]
+  - python gibmacos_cli.py queue add --version 14 --priority 5
+  - python gibmacos_cli.py queue run --concurrency 3
+  - python gibmacos_cli.py sync --min 12 --max 14 --keep 2 --prune
+  - python gibmacos_cli.py verify --repair
+  - python gibmacos_cli.py serve --port 8000
+  - python gibmacos_cli.py --catalog-server http://cache.lan:8000 list
+  - python gibmacos_cli.py tuning [--reset]
+Dependencies: requests
+License: MIT
+Author: Anoop Kumar
+Date: 18/10/2026 (DD/MM/YYYY)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from gibmacos_backend import GibMacOSBackend, ProgramError, CancelledError
+
+
+def print_status(message):
+    print(message, file=sys.stderr)
+
+
+def emit_event(event, **data):
+    data["event"] = event
+    print(json.dumps(data), flush=True)
+
+
+def make_progress(args):
+    # Progress callback that emits at most one progress event every
+    # --progress-interval seconds, and always the last one
+    last_emit = [0]
+
+    def progress(current, total, start_time):
+        now = time.time()
+        if now - last_emit[0] < args.progress_interval and current != total:
+            return
+        last_emit[0] = now
+        elapsed = now - start_time
+        emit_event(
+            "progress",
+            bytes=current,
+            total=total,
+            rate=int(current / elapsed) if elapsed > 0 else 0,
+        )
+
+    return progress
+
+
+def get_backend(args, update_callback=print_status, progress_callback=None):
+    backend = GibMacOSBackend(
+        update_callback=update_callback, progress_callback=progress_callback
+    )
+    if args.catalog:
+        backend.set_catalog(args.catalog)
+    if args.merged:
+        backend.merged_catalogs = True
+    if args.max_macos:
+        version_num = backend.macos_to_num(args.max_macos)
+        if not version_num:
+            raise ProgramError(
+                "Invalid macOS version: {}".format(args.max_macos),
+                title="Invalid Input",
+            )
+        backend.current_macos = version_num
+    if args.recovery:
+        backend.find_recovery = True
+    if args.local_catalog:
+        backend.save_local = True
+    if args.package_store:
+        backend.use_package_store = True
+    if args.metrics:
+        backend.metrics_export = args.metrics
+    if args.catalog_server:
+        backend.catalog_server = args.catalog_server
+    if args.no_tune:
+        backend.set_auto_tune(False)
+    return backend
+
+
+def load_products(backend):
+    with backend.operation("catalog refresh"):
+        if not backend.get_catalog_data():
+            raise ProgramError(
+                "Failed to retrieve catalog data. Check internet connection or catalog settings."
+            )
+        prods = backend.get_dict_for_prods(backend.get_installers())
+        backend.release_catalog()
+        return prods
+
+
+def find_product(prods, product=None, build=None, version=None):
+    for prod in prods:
+        if product and prod["product"].lower() != product.lower():
+            continue
+        if build and prod["build"].lower() != build.lower():
+            continue
+        if version and not (
+            prod["version"] == version or prod["version"].startswith(version + ".")
+        ):
+            continue
+        # Products are sorted newest first
+        return prod
+    return None
+
+
+def get_package_selection(backend, prod, args):
+    # File names to download, None for every package
+    if args.packages:
+        names = [x.strip() for x in args.packages.split(",") if x.strip()]
+        available = [
+            os.path.basename(x["URL"]) for x in backend.get_download_list(prod)
+        ]
+        unknown = [x for x in names if not x in available]
+        if unknown:
+            raise ProgramError(
+                "{} has no package named {} (available: {})".format(
+                    prod["product"], ", ".join(unknown), ", ".join(available)
+                ),
+                title="Not Found",
+            )
+        return names
+    if args.preset:
+        return backend.get_preset_packages(prod, args.preset)
+    return None
+
+
+def cmd_refresh(args):
+    backend = get_backend(args)
+    if args.local_catalog:
+        backend.force_local = True
+        backend.prod_cache = {}
+    prods = load_products(backend)
+    if backend.merged_catalogs:
+        info = {
+            "catalogs": list(backend.catalog_suffix),
+            "urls": [backend.build_url(catalog=x) for x in backend.catalog_suffix],
+        }
+    else:
+        info = {"catalog": backend.current_catalog, "url": backend.build_url()}
+    info["products"] = len(prods)
+    print(json.dumps(info))
+    return 0
+
+
+def cmd_list(args):
+    backend = get_backend(args)
+    prods = load_products(backend)
+    if not args.packages:
+        prods = [{k: v for k, v in x.items() if k != "packages"} for x in prods]
+    print(json.dumps([backend.serialize_product(x) for x in prods], indent=2))
+    return 0
+
+
+def cmd_download(args):
+    progress = make_progress(args)
+    backend = get_backend(
+        args,
+        update_callback=lambda message: emit_event("status", message=message),
+        progress_callback=progress,
+    )
+    prod = find_product(
+        load_products(backend),
+        product=args.product,
+        build=args.build,
+        version=args.version,
+    )
+    if prod is None:
+        raise ProgramError("No product matched the given filters.", title="Not Found")
+    packages = get_package_selection(backend, prod, args)
+    emit_event(
+        "start",
+        product=prod["product"],
+        title=prod["title"],
+        version=prod["version"],
+        build=prod["build"],
+        size=backend.d.get_size(backend.get_packages_size(prod, packages)),
+        packages=[
+            os.path.basename(x["URL"])
+            for x in backend.get_download_list(prod, dmg=args.dmg, packages=packages)
+        ],
+    )
+    dest = os.path.abspath(os.path.expanduser(args.dest))
+    with backend.operation("download"):
+        backend.download_prod(prod, dest, dmg=args.dmg, packages=packages)
+    emit_event("done", product=prod["product"], path=dest)
+    return 0
+
+
+def cmd_queue(args):
+    if args.queue_command == "run":
+        backend = get_backend(
+            args, update_callback=lambda message: emit_event("status", message=message)
+        )
+    else:
+        backend = get_backend(args)
+    dl_queue = backend.get_download_queue()
+
+    if args.queue_command == "add":
+        prod = find_product(
+            load_products(backend),
+            product=args.product,
+            build=args.build,
+            version=args.version,
+        )
+        if prod is None:
+            raise ProgramError(
+                "No product matched the given filters.", title="Not Found"
+            )
+        job = backend.queue_prod(
+            prod,
+            os.path.abspath(os.path.expanduser(args.dest)),
+            priority=args.priority,
+            dmg=args.dmg,
+            packages=get_package_selection(backend, prod, args),
+        )
+        print(json.dumps({"id": job["id"], "product": prod["product"]}))
+    elif args.queue_command == "list":
+        print(
+            json.dumps(
+                [
+                    {
+                        "id": x["id"],
+                        "product": x["product"]["product"],
+                        "title": x["product"].get("title", ""),
+                        "version": x["product"].get("version", ""),
+                        "build": x["product"].get("build", ""),
+                        "priority": x["priority"],
+                        "status": x["status"],
+                        "error": x["error"],
+                        "download_dir": x["download_dir"],
+                    }
+                    for x in dl_queue.get_jobs()
+                ],
+                indent=2,
+            )
+        )
+    elif args.queue_command == "remove":
+        if not dl_queue.remove(args.id):
+            raise ProgramError("No queue job with ID {}".format(args.id))
+    elif args.queue_command == "clear":
+        dl_queue.clear_finished()
+    elif args.queue_command == "run":
+        if args.concurrency:
+            dl_queue.concurrency = args.concurrency
+        dl_queue.start()
+        try:
+            while not dl_queue.wait(args.progress_interval):
+                for job in dl_queue.get_jobs():
+                    if job["status"] == "running":
+                        emit_event(
+                            "progress",
+                            id=job["id"],
+                            product=job["product"]["product"],
+                            bytes=job["bytes"],
+                            total=job["total"],
+                        )
+        except KeyboardInterrupt:
+            dl_queue.stop()
+            dl_queue.wait()
+            raise
+        failed = [x for x in dl_queue.get_jobs() if x["status"] == "failed"]
+        emit_event("done", failed=[x["id"] for x in failed])
+        return 1 if failed else 0
+    return 0
+
+
+def cmd_prune_store(args):
+    backend = get_backend(args)
+    store = backend.get_package_store(os.path.abspath(os.path.expanduser(args.dest)))
+    removed, freed = store.prune()
+    print(json.dumps({"store": store.root, "removed": removed, "freed": freed}))
+    return 0
+
+
+def cmd_sync(args):
+    progress = make_progress(args)
+    backend = get_backend(
+        args, update_callback=lambda message: emit_event("status", message=message)
+    )
+    min_version = backend.macos_to_num(args.min) if args.min else backend.min_macos
+    max_version = backend.macos_to_num(args.max) if args.max else backend.current_macos
+    if not min_version or not max_version:
+        raise ProgramError(
+            "Invalid macOS version range: {} - {}".format(args.min, args.max),
+            title="Invalid Input",
+        )
+    # The catalog has to reach the top of the range
+    backend.current_macos = max(backend.current_macos, min_version, max_version)
+    dest = os.path.abspath(os.path.expanduser(args.dest))
+    plan = backend.get_sync_plan(
+        load_products(backend),
+        dest,
+        min_version=min_version,
+        max_version=max_version,
+        keep=args.keep,
+        dmg=args.dmg,
+        revalidate=args.revalidate,
+    )
+    emit_event(
+        "plan",
+        products=[
+            dict(
+                {x: prod[x] for x in ("product", "title", "version", "build")},
+                folder=folder,
+                packages=states,
+            )
+            for prod, folder, states in plan["products"]
+        ],
+        downloads=[
+            {"path": os.path.join(folder, os.path.basename(x["URL"])), "state": state}
+            for prod, folder, x, state in plan["downloads"]
+        ],
+        bytes=plan["bytes"],
+        superseded=plan["superseded"],
+    )
+    if args.dry_run:
+        return 0
+    with backend.operation("sync"):
+        pruned = backend.sync_mirror(
+            plan, jobs=args.jobs, prune=args.prune, progress_callback=progress
+        )
+    emit_event("done", downloaded=len(plan["downloads"]), pruned=pruned)
+    return 0
+
+
+def cmd_verify(args):
+    progress = make_progress(args)
+    backend = get_backend(
+        args, update_callback=lambda message: emit_event("status", message=message)
+    )
+    dest = os.path.abspath(os.path.expanduser(args.dest))
+    prods = load_products(backend)
+    with backend.operation("verify"):
+        results = backend.verify_library(
+            prods,
+            dest,
+            jobs=args.jobs,
+            dmg=args.dmg,
+            integrity=not args.no_integrity,
+            progress_callback=progress,
+        )
+    bad = [x for x in results if x["status"] != "ok"]
+    for entry in results if args.all else bad:
+        emit_event("result", **entry)
+    removed, queued = [], []
+    if args.repair and bad:
+        removed, queued = backend.repair_library(bad, prods, dest, dmg=args.dmg)
+    emit_event(
+        "done",
+        checked=len(results),
+        ok=len(results) - len(bad),
+        bad=len(bad),
+        removed=removed,
+        queued=queued,
+    )
+    return 1 if bad and not args.repair else 0
+
+
+def cmd_serve(args):
+    backend = get_backend(args)
+    server = backend.get_cache_server(
+        os.path.abspath(os.path.expanduser(args.cache_dir)),
+        host=args.host,
+        port=args.port,
+        catalog_ttl=args.catalog_ttl,
+    )
+    print(
+        json.dumps(
+            {
+                "base_url": "http://{}:{}".format(*server.server_address[:2]),
+                "cache_dir": server.cache_dir,
+            }
+        ),
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+    return 0
+
+
+def cmd_fleet(args):
+    backend = get_backend(args)
+    board_ids = backend.load_board_ids(args.file)
+    if not board_ids:
+        raise ProgramError("No board IDs found in {}".format(args.file))
+    results = backend.get_fleet_compatibility(board_ids, load_products(backend))
+
+    if args.json:
+        output = {}
+        for board_id, entry in results.items():
+            best = entry["best"]
+            output[board_id] = {
+                "compatible": entry["compatible"],
+                "best": (
+                    None
+                    if best is None
+                    else {
+                        x: best[x]
+                        for x in ("product", "title", "version", "build", "size")
+                    }
+                ),
+            }
+        print(json.dumps(output, indent=2))
+        return 0
+
+    for board_id, entry in results.items():
+        best = entry["best"]
+        if best is None:
+            print("{}\tNo compatible installer found".format(board_id))
+        else:
+            print(
+                "{}\t{} {} ({}) - {} [{} compatible]".format(
+                    board_id,
+                    best["title"],
+                    best["version"],
+                    best["build"],
+                    best["product"],
+                    len(entry["compatible"]),
+                )
+            )
+    return 0
+
+
+def cmd_tuning(args):
+    backend = get_backend(args)
+    if args.reset:
+        backend.tuner.reset(args.host)
+    history = backend.tuner.dump()
+    if args.host:
+        history = {k: v for k, v in history.items() if k == args.host}
+    print(json.dumps(history, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless command line interface for the gibMacOS GUI backend."
+    )
+    parser.add_argument("--catalog", help="catalog to use (publicrelease, public, ...)")
+    parser.add_argument(
+        "--merged",
+        action="store_true",
+        help="fetch every catalog and list each product once, tagged with its catalogs",
+    )
+    parser.add_argument("--max-macos", help="maximum macOS version (e.g. 10.15, 14)")
+    parser.add_argument(
+        "--recovery", action="store_true", help="only list recovery products"
+    )
+    parser.add_argument(
+        "--local-catalog",
+        action="store_true",
+        help="use (and save) the local copy of the catalog in Scripts/sucatalog.plist",
+    )
+    parser.add_argument(
+        "--package-store",
+        action="store_true",
+        help="download each package once into a shared store and hard link it",
+    )
+    parser.add_argument(
+        "--metrics",
+        choices=("json", "prometheus"),
+        help="export metrics to Scripts/metrics.json or Scripts/metrics.prom",
+    )
+    parser.add_argument(
+        "--catalog-server",
+        help="LAN cache server to fetch catalogs and packages through (http://host:port)",
+    )
+    parser.add_argument(
+        "--no-tune",
+        action="store_true",
+        help="don't tune connections and read size from past throughput",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    refresh_parser = subparsers.add_parser(
+        "refresh", help="download the catalog and refresh the product metadata cache"
+    )
+    refresh_parser.set_defaults(func=cmd_refresh)
+
+    list_parser = subparsers.add_parser("list", help="list products as JSON")
+    list_parser.add_argument(
+        "--packages", action="store_true", help="include the package list"
+    )
+    list_parser.set_defaults(func=cmd_list)
+
+    download_parser = subparsers.add_parser(
+        "download", help="download the newest product matching the given filters"
+    )
+    download_parser.add_argument("--product", help="product ID (e.g. 052-60131)")
+    download_parser.add_argument("--build", help="build number (e.g. 23A344)")
+    download_parser.add_argument("--version", help="macOS version (e.g. 14 or 14.1)")
+    download_parser.add_argument(
+        "--dest",
+        default=os.path.join(os.path.expanduser("~"), "macOS Downloads"),
+        help="download directory",
+    )
+    download_parser.add_argument(
+        "--dmg", action="store_true", help="only download .dmg files"
+    )
+    download_selection = download_parser.add_mutually_exclusive_group()
+    download_selection.add_argument(
+        "--packages",
+        help="comma-separated package file names (e.g. BaseSystem.dmg,BaseSystem.chunklist)",
+    )
+    download_selection.add_argument(
+        "--preset",
+        help="named package selection: full, installer, recovery or dmg",
+    )
+    download_parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=0.5,
+        help="minimum seconds between progress events",
+    )
+    download_parser.set_defaults(func=cmd_download)
+
+    fleet_parser = subparsers.add_parser(
+        "fleet", help="find the newest installer for each board/device ID in a file"
+    )
+    fleet_parser.add_argument("file", help="file with one or more board IDs per line")
+    fleet_parser.add_argument("--json", action="store_true", help="print JSON")
+    fleet_parser.set_defaults(func=cmd_fleet)
+
+    queue_parser = subparsers.add_parser(
+        "queue", help="manage and run the persistent download queue"
+    )
+    queue_subparsers = queue_parser.add_subparsers(dest="queue_command")
+    queue_subparsers.required = True
+    queue_add_parser = queue_subparsers.add_parser(
+        "add", help="queue the newest product matching the given filters"
+    )
+    queue_add_parser.add_argument("--product", help="product ID (e.g. 052-60131)")
+    queue_add_parser.add_argument("--build", help="build number (e.g. 23A344)")
+    queue_add_parser.add_argument("--version", help="macOS version (e.g. 14 or 14.1)")
+    queue_add_parser.add_argument(
+        "--priority", type=int, default=0, help="higher priorities run first"
+    )
+    queue_add_parser.add_argument(
+        "--dest",
+        default=os.path.join(os.path.expanduser("~"), "macOS Downloads"),
+        help="download directory",
+    )
+    queue_add_parser.add_argument(
+        "--dmg", action="store_true", help="only download .dmg files"
+    )
+    queue_add_selection = queue_add_parser.add_mutually_exclusive_group()
+    queue_add_selection.add_argument(
+        "--packages",
+        help="comma-separated package file names (e.g. BaseSystem.dmg,BaseSystem.chunklist)",
+    )
+    queue_add_selection.add_argument(
+        "--preset",
+        help="named package selection: full, installer, recovery or dmg",
+    )
+    queue_subparsers.add_parser("list", help="list queued jobs as JSON")
+    queue_remove_parser = queue_subparsers.add_parser(
+        "remove", help="remove (and cancel) a job"
+    )
+    queue_remove_parser.add_argument("id", help="job ID")
+    queue_subparsers.add_parser("clear", help="remove finished and failed jobs")
+    queue_run_parser = queue_subparsers.add_parser(
+        "run", help="run the queue until every job has finished"
+    )
+    queue_run_parser.add_argument(
+        "--concurrency", type=int, help="number of products to download at once"
+    )
+    queue_run_parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=2.0,
+        help="seconds between progress events",
+    )
+    queue_parser.set_defaults(func=cmd_queue)
+
+    prune_store_parser = subparsers.add_parser(
+        "prune-store",
+        help="delete store packages no product folder links to (not while downloading)",
+    )
+    prune_store_parser.add_argument(
+        "--dest",
+        default=os.path.join(os.path.expanduser("~"), "macOS Downloads"),
+        help="download directory the store belongs to",
+    )
+    prune_store_parser.set_defaults(func=cmd_prune_store)
+
+    sync_parser = subparsers.add_parser(
+        "sync", help="mirror every installer in a macOS version range"
+    )
+    sync_parser.add_argument("--min", help="oldest macOS version (e.g. 10.15, 12)")
+    sync_parser.add_argument(
+        "--max", help="newest macOS version (default: --max-macos or the latest)"
+    )
+    sync_parser.add_argument(
+        "--dest",
+        default=os.path.join(os.path.expanduser("~"), "macOS Downloads"),
+        help="mirror directory",
+    )
+    sync_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="number of packages to download at once (default: tuned per host, or 4 with --no-tune)",
+    )
+    sync_parser.add_argument(
+        "--keep",
+        type=int,
+        default=0,
+        help="newest builds to keep per major version (0 keeps every build)",
+    )
+    sync_parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="delete superseded builds in the range after a successful sync",
+    )
+    sync_parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="check ETag/Last-Modified of complete files against the server",
+    )
+    sync_parser.add_argument(
+        "--dmg", action="store_true", help="only mirror .dmg files"
+    )
+    sync_parser.add_argument(
+        "--dry-run", action="store_true", help="only print the plan"
+    )
+    sync_parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=2.0,
+        help="minimum seconds between progress events",
+    )
+    sync_parser.set_defaults(func=cmd_sync)
+
+    verify_parser = subparsers.add_parser(
+        "verify", help="check downloaded products for missing or corrupt packages"
+    )
+    verify_parser.add_argument(
+        "--dest",
+        default=os.path.join(os.path.expanduser("~"), "macOS Downloads"),
+        help="download directory to check",
+    )
+    verify_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of files to hash at once (default: one per CPU)",
+    )
+    verify_parser.add_argument(
+        "--dmg", action="store_true", help="only expect .dmg files in each folder"
+    )
+    verify_parser.add_argument(
+        "--no-integrity",
+        action="store_true",
+        help="do not fetch chunklists from the catalog's IntegrityDataURL",
+    )
+    verify_parser.add_argument(
+        "--repair",
+        action="store_true",
+        help="delete corrupt files and queue their products to download again",
+    )
+    verify_parser.add_argument(
+        "--all", action="store_true", help="print a result for every package"
+    )
+    verify_parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=2.0,
+        help="minimum seconds between progress events",
+    )
+    verify_parser.set_defaults(func=cmd_verify)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="serve catalogs and packages to other machines on the network"
+    )
+    serve_parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(os.path.expanduser("~"), "macOS Downloads", ".lan_cache"),
+        help="where cached catalogs and packages are kept",
+    )
+    serve_parser.add_argument(
+        "--catalog-ttl",
+        type=int,
+        default=3600,
+        help="seconds before a cached catalog is fetched again",
+    )
+    serve_parser.set_defaults(func=cmd_serve)
+
+    tuning_parser = subparsers.add_parser(
+        "tuning", help="show the tuned settings and throughput history per host"
+    )
+    tuning_parser.add_argument(
+        "--reset", action="store_true", help="forget the history and start over"
+    )
+    tuning_parser.add_argument("--host", help="only this host (e.g. swcdn.apple.com)")
+    tuning_parser.set_defaults(func=cmd_tuning)
+
+    args = parser.parse_args()
+    if (
+        args.command == "download" or getattr(args, "queue_command", "") == "add"
+    ) and not (args.product or args.build or args.version):
+        parser.error("at least one of --product, --build or --version is required")
+    try:
+        return args.func(args)
+    except CancelledError as e:
+        print_status(str(e))
+        return 130
+    except ProgramError as e:
+        if (
+            args.command in ("download", "sync", "verify")
+            or getattr(args, "queue_command", "") == "run"
+        ):
+            emit_event("error", title=e.title, message=str(e))
+        print_status("{}: {}".format(e.title, e))
+        return 1
+    except KeyboardInterrupt:
+        print_status("Interrupted.")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,586 +19,12 @@ Date: 24/06/2025 (DD/MM/YYYY)
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
 import sys
-import threading
 import queue
-import json
 import time
-import re
 from tkinter import scrolledtext
-import webbrowser
-import subprocess
-
-sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "Scripts"))
-from Scripts import downloader, utils, run, plist
-
-
-class ProgramError(Exception):
-    def __init__(self, message, title="Error"):
-        super(Exception, self).__init__(message)
-        self.title = title
-
-
-class CancelledError(ProgramError):
-    def __init__(self, message="Operation cancelled by user."):
-        super().__init__(message, title="Operation Cancelled")
-
-
-class GibMacOSBackend:
-    def __init__(self, update_callback=None, progress_callback=None, cancel_event=None):
-        self.d = downloader.Downloader(interactive=False)
-        self.u = utils.Utils("gibMacOSGUI", interactive=False)
-        self.r = run.Run()
-
-        self.update_callback = update_callback
-        self.progress_callback = progress_callback
-        self.cancel_event = cancel_event
-
-        self.settings_path = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "Scripts", "settings.json"
-        )
-        self.settings = {}
-        if os.path.exists(self.settings_path):
-            try:
-                self.settings = json.load(open(self.settings_path))
-            except:
-                pass
-
-        self.prod_cache_path = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "Scripts", "prod_cache.plist"
-        )
-        self.prod_cache = {}
-        if os.path.exists(self.prod_cache_path):
-            try:
-                with open(self.prod_cache_path, "rb") as f:
-                    self.prod_cache = plist.load(f)
-                assert isinstance(self.prod_cache, dict)
-            except:
-                self.prod_cache = {}
-
-        self.current_macos = self.settings.get("current_macos", 20)
-        self.min_macos = 5
-        self.current_catalog = self.settings.get("current_catalog", "publicrelease")
-        self.find_recovery = self.settings.get("find_recovery", False)
-        self.caffeinate_downloads = self.settings.get("caffeinate_downloads", True)
-        self.catalog_data = None
-        self.mac_prods = []
-
-        self.save_local = self.settings.get("save_local", False)
-        self.force_local = self.settings.get("force_local", False)
-        self.print_urls = self.settings.get("print_urls", False)
-        self.print_json = self.settings.get("print_json", False)
-
-        self.catalog_suffix = {
-            "public": "beta",
-            "publicrelease": "",
-            "customer": "customerseed",
-            "developer": "seed",
-        }
-        self.mac_os_names_url = {
-            "8": "mountainlion",
-            "7": "lion",
-            "6": "snowleopard",
-            "5": "leopard",
-        }
-        self.version_names = {
-            "tiger": "10.4",
-            "leopard": "10.5",
-            "snow leopard": "10.6",
-            "lion": "10.7",
-            "mountain lion": "10.8",
-            "mavericks": "10.9",
-            "yosemite": "10.10",
-            "el capitan": "10.11",
-            "sierra": "10.12",
-            "high sierra": "10.13",
-            "mojave": "10.14",
-            "catalina": "10.15",
-            "big sur": "11",
-            "monterey": "12",
-            "ventura": "13",
-            "sonoma": "14",
-            "sequoia": "15",
-        }
-        self.recovery_suffixes = ("RecoveryHDUpdate.pkg", "RecoveryHDMetaDmg.pkg")
-        self.caffeinate_process = None
-
-        self.settings_to_save = (
-            "current_macos",
-            "current_catalog",
-            "find_recovery",
-            "caffeinate_downloads",
-            "save_local",
-            "force_local",
-        )
-
-    def _update_status(self, message):
-        if self.update_callback:
-            self.update_callback(message)
-
-    def _update_progress(self, current, total, start_time):
-        if self.progress_callback:
-            self.progress_callback(current, total, start_time)
-
-    def save_settings(self):
-        for setting in self.settings_to_save:
-            self.settings[setting] = getattr(self, setting, None)
-        try:
-            json.dump(self.settings, open(self.settings_path, "w"), indent=2)
-        except Exception as e:
-            raise ProgramError(
-                "Failed to save settings to:\n\n{}\n\nWith error:\n\n - {}\n".format(
-                    self.settings_path, repr(e)
-                ),
-                title="Error Saving Settings",
-            )
-
-    def save_prod_cache(self):
-        try:
-            with open(self.prod_cache_path, "wb") as f:
-                plist.dump(self.prod_cache, f)
-        except Exception as e:
-            raise ProgramError(
-                "Failed to save product cache to:\n\n{}\n\nWith error:\n\n - {}\n".format(
-                    self.prod_cache_path, repr(e)
-                ),
-                title="Error Saving Product Cache",
-            )
-
-    def set_catalog(self, catalog):
-        self.current_catalog = (
-            catalog.lower()
-            if catalog.lower() in self.catalog_suffix
-            else "publicrelease"
-        )
-
-    def num_to_macos(self, macos_num, for_url=True):
-        if for_url:
-            return (
-                self.mac_os_names_url.get(str(macos_num), "10.{}".format(macos_num))
-                if macos_num <= 16
-                else str(macos_num - 5)
-            )
-        return "10.{}".format(macos_num) if macos_num <= 15 else str(macos_num - 5)
-
-    def macos_to_num(self, macos):
-        try:
-            macos_parts = [int(x) for x in macos.split(".")][
-                : 2 if macos.startswith("10.") else 1
-            ]
-            if macos_parts[0] == 11:
-                macos_parts = [10, 16]
-        except:
-            return None
-        if len(macos_parts) > 1:
-            return macos_parts[1]
-        return 5 + macos_parts[0]
-
-    def get_macos_versions(self, minos=None, maxos=None, catalog=""):
-        if minos is None:
-            minos = self.min_macos
-        if maxos is None:
-            maxos = self.current_macos
-        if minos > maxos:
-            minos, maxos = maxos, minos
-        os_versions = [
-            self.num_to_macos(x, for_url=True) for x in range(minos, maxos + 1)
-        ]
-        if catalog:
-            custom_cat_entry = os_versions[-1] + catalog
-            os_versions.append(custom_cat_entry)
-        return os_versions
-
-    def build_url(self, **kwargs):
-        catalog = kwargs.get("catalog", self.current_catalog).lower()
-        catalog = catalog if catalog.lower() in self.catalog_suffix else "publicrelease"
-        version = int(kwargs.get("version", self.current_macos))
-        return "https://swscan.apple.com/content/catalogs/others/index-{}.merged-1.sucatalog".format(
-            "-".join(
-                reversed(
-                    self.get_macos_versions(
-                        self.min_macos,
-                        version,
-                        catalog=self.catalog_suffix.get(catalog, ""),
-                    )
-                )
-            )
-        )
-
-    def get_catalog_data(self):
-        if self.cancel_event and self.cancel_event.is_set():
-            raise CancelledError()
-
-        url = self.build_url(catalog=self.current_catalog, version=self.current_macos)
-        self._update_status(f"Downloading {self.current_catalog} catalog from:\n{url}")
-
-        local_catalog = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "Scripts", "sucatalog.plist"
-        )
-
-        if self.save_local:
-            self._update_status(f"Checking for local catalog at:\n{local_catalog}")
-            if os.path.exists(local_catalog) and not self.force_local:
-                self._update_status(" - Found - loading...")
-                try:
-                    with open(local_catalog, "rb") as f:
-                        self.catalog_data = plist.load(f)
-                        assert isinstance(self.catalog_data, dict)
-                    self._update_status("Catalog loaded from local file.")
-                    return True
-                except Exception as e:
-                    self._update_status(
-                        f" - Error loading local catalog: {e}. Downloading instead..."
-                    )
-            elif self.force_local:
-                self._update_status(" - Forcing re-download of local catalog...")
-            else:
-                self._update_status(
-                    " - Local catalog not found - downloading instead..."
-                )
-
-        try:
-            b = self.d.get_bytes(url, False)
-            if self.cancel_event and self.cancel_event.is_set():
-                raise CancelledError()
-            self.catalog_data = plist.loads(b)
-            self._update_status("Catalog downloaded successfully.")
-        except Exception as e:
-            self._update_status(f"Error downloading catalog: {e}")
-            return False
-
-        if self.save_local or self.force_local:
-            self._update_status(f" - Saving catalog to:\n - {local_catalog}")
-            try:
-                with open(local_catalog, "wb") as f:
-                    plist.dump(self.catalog_data, f)
-                self._update_status("Catalog saved locally.")
-            except Exception as e:
-                self._update_status(f" - Error saving catalog: {e}")
-                return False
-        return True
-
-    def get_installers(self, plist_dict=None):
-        if not plist_dict:
-            plist_dict = self.catalog_data
-        if not plist_dict:
-            return []
-        mac_prods = []
-        for p in plist_dict.get("Products", {}):
-            if self.cancel_event and self.cancel_event.is_set():
-                raise CancelledError()
-            if not self.find_recovery:
-                val = (
-                    plist_dict.get("Products", {})
-                    .get(p, {})
-                    .get("ExtendedMetaInfo", {})
-                    .get("InstallAssistantPackageIdentifiers", {})
-                )
-                if val.get("OSInstall", {}) == "com.apple.mpkg.OSInstall" or val.get(
-                    "SharedSupport", ""
-                ).startswith("com.apple.pkg.InstallAssistant"):
-                    mac_prods.append(p)
-            else:
-                if any(
-                    x
-                    for x in plist_dict.get("Products", {})
-                    .get(p, {})
-                    .get("Packages", [])
-                    if x["URL"].endswith(self.recovery_suffixes)
-                ):
-                    mac_prods.append(p)
-        return mac_prods
-
-    def get_build_version(self, dist_dict):
-        build = version = name = "Unknown"
-        try:
-            dist_url = dist_dict.get("English", dist_dict.get("en", ""))
-            assert dist_url
-            dist_file = self.d.get_string(dist_url, False)
-            assert isinstance(dist_file, str)
-        except Exception as e:
-            dist_file = ""
-        build_search = (
-            "macOSProductBuildVersion"
-            if "macOSProductBuildVersion" in dist_file
-            else "BUILD"
-        )
-        vers_search = (
-            "macOSProductVersion" if "macOSProductVersion" in dist_file else "VERSION"
-        )
-        try:
-            build = (
-                dist_file.split("<key>{}</key>".format(build_search))[1]
-                .split("<string>")[1]
-                .split("</string>")[0]
-            )
-        except:
-            pass
-        try:
-            version = (
-                dist_file.split("<key>{}</key>".format(vers_search))[1]
-                .split("<string>")[1]
-                .split("</string>")[0]
-            )
-        except:
-            pass
-        try:
-            name = re.search(r"<title>(.+?)</title>", dist_file).group(1)
-        except:
-            pass
-        try:
-            device_ids = re.search(
-                r"var supportedDeviceIDs\s*=\s*\[([^]]+)\];", dist_file
-            )[1]
-            device_ids = list(
-                set(i.lower() for i in re.findall(r"'([^',]+)'", device_ids))
-            )
-        except:
-            device_ids = []
-        return (build, version, name, device_ids)
-
-    def get_dict_for_prods(self, prods, plist_dict=None):
-        self._update_status("Scanning products after catalog download...")
-        plist_dict = plist_dict or self.catalog_data or {}
-        prod_list = []
-        prod_keys = (
-            "build",
-            "date",
-            "description",
-            "device_ids",
-            "installer",
-            "product",
-            "time",
-            "title",
-            "version",
-        )
-
-        def get_packages_and_size(plist_dict, prod, recovery):
-            packages = []
-            if recovery:
-                packages = [
-                    x
-                    for x in plist_dict.get("Products", {})
-                    .get(prod, {})
-                    .get("Packages", [])
-                    if x["URL"].endswith(self.recovery_suffixes)
-                ]
-            else:
-                packages = (
-                    plist_dict.get("Products", {}).get(prod, {}).get("Packages", [])
-                )
-            size = self.d.get_size(sum([i["Size"] for i in packages]))
-            return (packages, size)
-
-        def prod_valid(prod, prod_list, prod_keys):
-            if (
-                not isinstance(prod_list, dict)
-                or not prod in prod_list
-                or not all(x in prod_list[prod] for x in prod_keys)
-            ):
-                return False
-            if any(prod_list[prod].get(x, "Unknown") == "Unknown" for x in prod_keys):
-                return False
-            return True
-
-        prod_changed = False
-        for prod in prods:
-            if self.cancel_event and self.cancel_event.is_set():
-                raise CancelledError()
-            if prod_valid(prod, self.prod_cache, prod_keys):
-                prodd = {}
-                for key in self.prod_cache[prod]:
-                    prodd[key] = self.prod_cache[prod][key]
-                prodd["packages"], prodd["size"] = get_packages_and_size(
-                    plist_dict, prod, self.find_recovery
-                )
-                prod_list.append(prodd)
-                continue
-
-            prodd = {"product": prod}
-            try:
-                url = (
-                    plist_dict.get("Products", {})
-                    .get(prod, {})
-                    .get("ServerMetadataURL", "")
-                )
-                assert url
-                b = self.d.get_bytes(url, False)
-                smd = plist.loads(b)
-            except:
-                smd = {}
-
-            prodd["date"] = (
-                plist_dict.get("Products", {}).get(prod, {}).get("PostDate", "")
-            )
-            prodd["installer"] = (
-                plist_dict.get("Products", {})
-                .get(prod, {})
-                .get("ExtendedMetaInfo", {})
-                .get("InstallAssistantPackageIdentifiers", {})
-                .get("OSInstall", {})
-                == "com.apple.mpkg.OSInstall"
-            )
-            prodd["time"] = (
-                time.mktime(prodd["date"].timetuple()) + prodd["date"].microsecond / 1e6
-            )
-            prodd["version"] = smd.get("CFBundleShortVersionString", "Unknown").strip()
-            try:
-                desc = (
-                    smd.get("localization", {})
-                    .get("English", {})
-                    .get("description", "")
-                    .decode("utf-8")
-                )
-                desctext = desc.split('"p1">')[1].split("</a>")[0]
-            except:
-                desctext = ""
-            prodd["description"] = desctext
-            prodd["packages"], prodd["size"] = get_packages_and_size(
-                plist_dict, prod, self.find_recovery
-            )
-            prodd["size"] = self.d.get_size(sum([i["Size"] for i in prodd["packages"]]))
-            prodd["build"], v, n, prodd["device_ids"] = self.get_build_version(
-                plist_dict.get("Products", {}).get(prod, {}).get("Distributions", {})
-            )
-            prodd["title"] = (
-                smd.get("localization", {}).get("English", {}).get("title", n)
-            )
-            if v.lower() != "unknown":
-                prodd["version"] = v
-            prod_list.append(prodd)
-
-            if smd or not plist_dict.get("Products", {}).get(prod, {}).get(
-                "ServerMetadataURL", ""
-            ):
-                prod_changed = True
-                temp_prod = {}
-                for key in prodd:
-                    if key in ("packages", "size"):
-                        continue
-                    if prodd[key] == "Unknown":
-                        temp_prod = None
-                        break
-                    temp_prod[key] = prodd[key]
-                if temp_prod:
-                    self.prod_cache[prod] = temp_prod
-
-        if prod_changed and self.prod_cache:
-            try:
-                self.save_prod_cache()
-            except:
-                pass
-
-        prod_list = sorted(prod_list, key=lambda x: x["time"], reverse=True)
-        return prod_list
-
-    def start_caffeinate(self):
-        if (
-            sys.platform.lower() == "darwin"
-            and self.caffeinate_downloads
-            and os.path.isfile("/usr/bin/caffeinate")
-        ):
-            self.term_caffeinate_proc()
-            self.caffeinate_process = subprocess.Popen(
-                ["/usr/bin/caffeinate"],
-                stderr=getattr(subprocess, "DEVNULL", open(os.devnull, "w")),
-                stdout=getattr(subprocess, "DEVNULL", open(os.devnull, "w")),
-                stdin=getattr(subprocess, "DEVNULL", open(os.devnull, "w")),
-            )
-        return self.caffeinate_process
-
-    def term_caffeinate_proc(self):
-        if self.caffeinate_process is None:
-            return True
-        try:
-            if self.caffeinate_process.poll() is None:
-                start = time.time()
-                while self.caffeinate_process.poll() is None:
-                    if time.time() - start > 10:
-                        self._update_status(
-                            f"Timed out trying to terminate caffeinate process with PID {self.caffeinate_process.pid}!"
-                        )
-                        return False
-                    self.caffeinate_process.terminate()
-                    time.sleep(0.02)
-        except:
-            pass
-        return True
-
-    def download_prod(self, prod, download_dir, dmg=False):
-        name = (
-            "{} - {} {} ({})".format(
-                prod["product"], prod["version"], prod["title"], prod["build"]
-            )
-            .replace(":", "")
-            .strip()
-        )
-        full_download_path = os.path.join(download_dir, name)
-
-        dl_list = []
-        for x in prod["packages"]:
-            if not x.get("URL", None):
-                continue
-            if dmg and not x.get("URL", "").lower().endswith(".dmg"):
-                continue
-            dl_list.append(x)
-
-        if not len(dl_list):
-            raise ProgramError("There were no files to download for this product.")
-
-        if not os.path.isdir(full_download_path):
-            os.makedirs(full_download_path)
-
-        self.term_caffeinate_proc()
-
-        failed_downloads = []
-        for c, x in enumerate(dl_list, start=1):
-            if self.cancel_event and self.cancel_event.is_set():
-                raise CancelledError()
-
-            url = x["URL"]
-            file_name = os.path.basename(url)
-            file_path = os.path.join(full_download_path, file_name)
-
-            resume_bytes = 0
-            if os.path.exists(file_path):
-                resume_bytes = os.path.getsize(file_path)
-
-            self._update_status(
-                f"Downloading file {c} of {len(dl_list)}: {file_name} to {full_download_path}"
-            )
-
-            try:
-                self.start_caffeinate()
-                result = self.d.stream_to_file(
-                    url,
-                    file_path,
-                    resume_bytes=resume_bytes,
-                    allow_resume=True,
-                    callback=self.progress_callback,
-                    cancel_event=self.cancel_event,
-                )
-                if result is None:
-                    if self.cancel_event and self.cancel_event.is_set():
-                        raise CancelledError("Download cancelled by user.")
-                    else:
-                        raise Exception(
-                            "Download failed or was interrupted (no specific error)."
-                        )
-                self._update_status(f"Successfully downloaded: {file_name}")
-            except Exception as e:
-                self._update_status(f"Failed to download {file_name}: {e}")
-                failed_downloads.append(file_name)
-            finally:
-                self.term_caffeinate_proc()
-
-        if failed_downloads:
-            raise ProgramError(
-                f"{len(failed_downloads)} files failed to download: {', '.join(failed_downloads)}",
-                title="Download Failed",
-            )
 
 
 class GibMacOSGUI(tk.Tk):
@@ -610,50 +36,85 @@ class GibMacOSGUI(tk.Tk):
 
         self.download_queue = queue.Queue()
         self.after_id = None
-        self.cancel_event = threading.Event()
-        self.current_thread = None
+        # kind ("refresh", "download", "softwareupdate") -> running backend job
+        self.active_jobs = {}
 
         self.download_dir = os.path.join(os.path.expanduser("~"), "macOS Downloads")
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
 
-        self.backend = GibMacOSBackend(
-            update_callback=self._queue_status_update,
-            progress_callback=self._queue_progress_update,
-            cancel_event=self.cancel_event,
-        )
+        # Imported and built once the window has been drawn - see
+        # _finish_startup
+        self.backend = None
 
         self.current_catalog_var = tk.StringVar(self)
-        self.current_catalog_var.set(self.backend.current_catalog)
+        self.merged_catalogs_var = tk.BooleanVar(self)
         self.max_macos_var = tk.StringVar(self)
-        self.max_macos_var.set(
-            self.backend.num_to_macos(self.backend.current_macos, for_url=False)
-        )
         self.find_recovery_var = tk.BooleanVar(self)
-        self.find_recovery_var.set(self.backend.find_recovery)
         self.caffeinate_downloads_var = tk.BooleanVar(self)
-        self.caffeinate_downloads_var.set(self.backend.caffeinate_downloads)
         self.download_dir_var = tk.StringVar(self)
         self.download_dir_var.set(self.download_dir)
         self.save_local_var = tk.BooleanVar(self)
-        self.save_local_var.set(self.backend.save_local)
         self.force_local_var = tk.BooleanVar(self)
-        self.force_local_var.set(self.backend.force_local)
+        self.use_package_store_var = tk.BooleanVar(self)
+        self.auto_tune_var = tk.BooleanVar(self)
         self.show_console_log_var = tk.BooleanVar(self)
         self.show_console_log_var.set(True)
 
         self.gui_products_data = []
 
+        self.queue_window = None
+        self.queue_tree = None
+
         self._create_widgets()
+        self._update_ui_state()
         self._check_queue()
+        # The backend, the download queue and the first catalog refresh wait
+        # until the window has been drawn
+        self.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        self.update_idletasks()
+        from gibmacos_backend import GibMacOSBackend
+
+        self.backend = GibMacOSBackend(
+            update_callback=self._queue_status_update,
+            progress_callback=self._queue_progress_update,
+        )
+        self._load_settings()
+        self._update_ui_state()
+        self._resume_download_queue()
         self._refresh_products()
 
+    def _load_settings(self):
+        # Also sets current_catalog_var
+        self.catalog_dropdown.set_menu(
+            self.backend.current_catalog, *self.backend.catalog_suffix
+        )
+        self.merged_catalogs_var.set(self.backend.merged_catalogs)
+        self.max_macos_var.set(
+            self.backend.num_to_macos(self.backend.current_macos, for_url=False)
+        )
+        self.find_recovery_var.set(self.backend.find_recovery)
+        self.caffeinate_downloads_var.set(self.backend.caffeinate_downloads)
+        self.save_local_var.set(self.backend.save_local)
+        self.force_local_var.set(self.backend.force_local)
+        self.use_package_store_var.set(self.backend.use_package_store)
+        self.auto_tune_var.set(self.backend.auto_tune)
+
     def _on_close(self):
         if self.after_id:
             self.after_cancel(self.after_id)
-        if self.current_thread and self.current_thread.is_alive():
-            self.cancel_event.set()
-            self.current_thread.join(timeout=2.0)
+        if self.backend is not None:
+            # Only signals the work to stop, the window closes right away.
+            # Cancelled jobs wind down in the background, queue jobs go back
+            # to "queued" (or are reset on the next load) and resume on the
+            # next launch, and the Persister's atexit flush writes out the
+            # settings and cache saves still pending.
+            if self.backend.download_queue:
+                self.backend.download_queue.stop()
+            self.backend.jobs.shutdown(cancel=True, timeout=0)
+            self.backend.close_parse_pool(wait=False)
         self.destroy()
 
     def _queue_status_update(self, message):
@@ -668,8 +129,23 @@ class GibMacOSGUI(tk.Tk):
     def _queue_info_dialog(self, title, message):
         self.download_queue.put(("info", (title, message)))
 
-    def _queue_ui_state(self, enabled):
-        self.download_queue.put(("ui_state", enabled))
+    def _start_job(self, kind, name, task):
+        # Each action is a backend job with its own cancel token, so starting
+        # a refresh never touches a download that is running
+        job = self.backend.jobs.submit(
+            name,
+            task,
+            kind=kind,
+            on_done=lambda job: self.download_queue.put(("job_done", job)),
+        )
+        self.active_jobs[kind] = job
+        self._update_ui_state()
+        return job
+
+    def _on_job_done(self, job):
+        if self.active_jobs.get(job.kind) is job:
+            del self.active_jobs[job.kind]
+        self._update_ui_state()
 
     def _check_queue(self):
         try:
@@ -688,8 +164,8 @@ class GibMacOSGUI(tk.Tk):
                     elif msg_type == "info":
                         messagebox.showinfo(data[0], data[1])
                         self._write_to_console(f"INFO: {data[0]} - {data[1]}")
-                    elif msg_type == "ui_state":
-                        self._set_ui_state(data)
+                    elif msg_type == "job_done":
+                        self._on_job_done(data)
                     elif msg_type == "populate_products":
                         self._populate_product_tree(data)
                     self.download_queue.task_done()
@@ -750,6 +226,12 @@ class GibMacOSGUI(tk.Tk):
         self.file_menu.add_command(
             label="Open Download Directory", command=self._open_download_dir
         )
+        self.file_menu.add_command(
+            label="Download Queue...", command=self._show_download_queue
+        )
+        self.file_menu.add_command(
+            label="LAN Cache Server...", command=self._set_catalog_server
+        )
         self.file_menu.add_separator()
         self.file_menu.add_command(label="Exit", command=self._on_close)
 
@@ -797,8 +279,7 @@ class GibMacOSGUI(tk.Tk):
         self.catalog_dropdown = ttk.OptionMenu(
             self.settings_frame,
             self.current_catalog_var,
-            self.current_catalog_var.get(),
-            *list(self.backend.catalog_suffix.keys()),
+            None,
             command=self._on_catalog_change,
         )
         self.catalog_dropdown.grid(row=0, column=1, padx=5, pady=2, sticky=tk.W)
@@ -859,6 +340,30 @@ class GibMacOSGUI(tk.Tk):
         )
         self.show_console_checkbox.grid(row=0, column=2, padx=5, sticky=tk.W)
 
+        self.package_store_checkbox = ttk.Checkbutton(
+            self.checkboxes_frame,
+            text="Share Packages Between Products",
+            variable=self.use_package_store_var,
+            command=self._on_package_store_toggle,
+        )
+        self.package_store_checkbox.grid(row=1, column=2, padx=5, sticky=tk.W)
+
+        self.merged_catalogs_checkbox = ttk.Checkbutton(
+            self.checkboxes_frame,
+            text="All Catalogs (Merged)",
+            variable=self.merged_catalogs_var,
+            command=self._on_merged_catalogs_toggle,
+        )
+        self.merged_catalogs_checkbox.grid(row=2, column=0, padx=5, sticky=tk.W)
+
+        self.auto_tune_checkbox = ttk.Checkbutton(
+            self.checkboxes_frame,
+            text="Auto-Tune Connections",
+            variable=self.auto_tune_var,
+            command=self._on_auto_tune_toggle,
+        )
+        self.auto_tune_checkbox.grid(row=2, column=1, padx=5, sticky=tk.W)
+
         ttk.Label(self.settings_frame, text="Download Directory:").grid(
             row=2, column=0, padx=5, pady=2, sticky=tk.W
         )
@@ -879,9 +384,10 @@ class GibMacOSGUI(tk.Tk):
         self.buttons_frame = ttk.Frame(self.settings_frame)
         self.buttons_frame.grid(row=3, column=0, columnspan=4, pady=5, sticky=tk.W)
 
-        ttk.Button(
+        self.refresh_button = ttk.Button(
             self.buttons_frame, text="Refresh Products", command=self._refresh_products
-        ).pack(side=tk.LEFT, padx=5)
+        )
+        self.refresh_button.pack(side=tk.LEFT, padx=5)
 
         self.set_su_button = ttk.Button(
             self.buttons_frame,
@@ -907,6 +413,26 @@ class GibMacOSGUI(tk.Tk):
         )
         self.download_button.pack(side=tk.LEFT, padx=5)
 
+        self.queue_button = ttk.Button(
+            self.buttons_frame,
+            text="Queue Selected",
+            command=self._queue_selected,
+            state=tk.DISABLED,
+        )
+        self.queue_button.pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(self.buttons_frame, text="Priority:").pack(side=tk.LEFT, padx=(5, 0))
+        self.priority_var = tk.StringVar(self)
+        self.priority_var.set("0")
+        self.priority_spinbox = ttk.Spinbox(
+            self.buttons_frame,
+            from_=-10,
+            to=10,
+            width=4,
+            textvariable=self.priority_var,
+        )
+        self.priority_spinbox.pack(side=tk.LEFT, padx=5)
+
         self.cancel_button = ttk.Button(
             self.buttons_frame,
             text="Cancel",
@@ -917,7 +443,7 @@ class GibMacOSGUI(tk.Tk):
 
         self.product_tree = ttk.Treeview(
             self.products_frame,
-            columns=("Name", "Version", "Build", "Size", "Product ID"),
+            columns=("Name", "Version", "Build", "Size", "Product ID", "Catalogs"),
             show="headings",
         )
         self.product_tree.heading("Name", text="macOS Name", anchor=tk.W)
@@ -925,12 +451,14 @@ class GibMacOSGUI(tk.Tk):
         self.product_tree.heading("Build", text="Build", anchor=tk.W)
         self.product_tree.heading("Size", text="Size", anchor=tk.E)
         self.product_tree.heading("Product ID", text="Product ID", anchor=tk.W)
+        self.product_tree.heading("Catalogs", text="Catalogs", anchor=tk.W)
 
         self.product_tree.column("Name", width=300, stretch=tk.YES)
         self.product_tree.column("Version", width=100, stretch=tk.NO)
         self.product_tree.column("Build", width=100, stretch=tk.NO)
         self.product_tree.column("Size", width=80, anchor=tk.E, stretch=tk.NO)
         self.product_tree.column("Product ID", width=100, stretch=tk.NO)
+        self.product_tree.column("Catalogs", width=160, stretch=tk.NO)
 
         scrollbar = ttk.Scrollbar(
             self.products_frame, orient="vertical", command=self.product_tree.yview
@@ -956,6 +484,12 @@ class GibMacOSGUI(tk.Tk):
         self.backend.save_settings()
         self._refresh_products()
 
+    def _on_merged_catalogs_toggle(self):
+        self.backend.merged_catalogs = self.merged_catalogs_var.get()
+        self.backend.save_settings()
+        self._update_ui_state()
+        self._refresh_products()
+
     def _on_max_macos_change(self, event=None):
         version_str = self.max_macos_var.get().strip()
         version_num = self.backend.macos_to_num(version_str)
@@ -989,6 +523,29 @@ class GibMacOSGUI(tk.Tk):
         self.backend.force_local = self.force_local_var.get()
         self.backend.save_settings()
 
+    def _on_package_store_toggle(self):
+        self.backend.use_package_store = self.use_package_store_var.get()
+        self.backend.save_settings()
+
+    def _on_auto_tune_toggle(self):
+        # Safe mid-download - running transfers pick it up on reconnect
+        self.backend.set_auto_tune(self.auto_tune_var.get())
+        self.backend.save_settings()
+
+    def _set_catalog_server(self):
+        server = simpledialog.askstring(
+            "LAN Cache Server",
+            "Fetch catalogs and packages through a cache server\n"
+            "(e.g. http://cache.lan:8000), or leave empty to use Apple directly:",
+            initialvalue=self.backend.catalog_server,
+            parent=self,
+        )
+        if server is None:
+            return
+        self.backend.catalog_server = server.strip()
+        self.backend.save_settings()
+        self._refresh_products()
+
     def _toggle_console_log(self):
         if self.show_console_log_var.get():
             self.console_log_frame.grid(row=1, column=0, sticky=tk.NSEW)
@@ -1001,9 +558,15 @@ class GibMacOSGUI(tk.Tk):
             self.download_dir = selected_dir
             self.download_dir_var.set(selected_dir)
 
+    def _open_url(self, url):
+        # webbrowser is slow to import and only needed here
+        import webbrowser
+
+        webbrowser.open(url)
+
     def _open_download_dir(self):
         try:
-            webbrowser.open(self.download_dir)
+            self._open_url(self.download_dir)
         except Exception as e:
             self._queue_error_dialog(
                 "Error Opening Directory", f"Could not open download directory: {e}"
@@ -1016,10 +579,7 @@ class GibMacOSGUI(tk.Tk):
             )
             return
 
-        self._set_ui_state(False)
-        self.cancel_event.clear()
-
-        def run_command():
+        def run_command(job):
             try:
                 self._queue_status_update("Setting Software Update Catalog URL...")
                 url = self.backend.build_url()
@@ -1035,12 +595,8 @@ class GibMacOSGUI(tk.Tk):
                     "Error",
                     f"Failed to set Software Update Catalog URL: {e}\n(Might require administrator privileges.)",
                 )
-            finally:
-                self._queue_ui_state(True)
-                self.current_thread = None
 
-        self.current_thread = threading.Thread(target=run_command)
-        self.current_thread.start()
+        self._start_job("softwareupdate", "Set SU CatalogURL", run_command)
 
     def _clear_su_catalog(self):
         if sys.platform != "darwin":
@@ -1049,10 +605,7 @@ class GibMacOSGUI(tk.Tk):
             )
             return
 
-        self._set_ui_state(False)
-        self.cancel_event.clear()
-
-        def run_command():
+        def run_command(job):
             try:
                 self._queue_status_update("Clearing Software Update Catalog URL...")
                 self.backend.r.run(
@@ -1067,16 +620,14 @@ class GibMacOSGUI(tk.Tk):
                     "Error",
                     f"Failed to clear Software Update Catalog URL: {e}\n(Might require administrator privileges.)",
                 )
-            finally:
-                self._queue_ui_state(True)
-                self.current_thread = None
 
-        self.current_thread = threading.Thread(target=run_command)
-        self.current_thread.start()
+        self._start_job("softwareupdate", "Clear SU CatalogURL", run_command)
 
     def _refresh_products(self):
-        self._set_ui_state(False)
-        self.cancel_event.clear()
+        # A new refresh supersedes one that is still running
+        previous = self.active_jobs.get("refresh")
+        if previous:
+            previous.cancel()
 
         self._queue_status_update(
             "Fetching and parsing macOS product catalog, please wait..."
@@ -1084,31 +635,40 @@ class GibMacOSGUI(tk.Tk):
         self.progress_bar["value"] = 0
         self.progress_bar_label.config(text="")
 
-        def fetch_products_task():
+        def fetch_products_task(job):
+            from gibmacos_backend import CancelledError, ProgramError
+
+            if previous:
+                # Both would share the backend's catalog_data
+                previous.wait()
             try:
-                if self.backend.force_local:
-                    self.backend.prod_cache = {}
-
-                if not self.backend.get_catalog_data():
-                    if self.cancel_event.is_set():
-                        raise CancelledError("Catalog download cancelled.")
-                    else:
-                        raise ProgramError(
-                            "Failed to retrieve catalog data. Check internet connection or catalog settings."
-                        )
-
-                mac_prods_data = self.backend.get_dict_for_prods(
-                    self.backend.get_installers()
-                )
+                with self.backend.operation("catalog refresh"):
+                    if self.backend.force_local:
+                        self.backend.prod_cache = {}
+
+                    if not self.backend.get_catalog_data(cancel_event=job.cancel_event):
+                        if job.cancel_event.is_set():
+                            raise CancelledError("Catalog download cancelled.")
+                        else:
+                            raise ProgramError(
+                                "Failed to retrieve catalog data. Check internet connection or catalog settings."
+                            )
+
+                    mac_prods_data = self.backend.get_dict_for_prods(
+                        self.backend.get_installers(cancel_event=job.cancel_event),
+                        cancel_event=job.cancel_event,
+                    )
 
-                if self.cancel_event.is_set():
-                    raise CancelledError("Product scanning cancelled.")
+                    if job.cancel_event.is_set():
+                        raise CancelledError("Product scanning cancelled.")
 
                 self.download_queue.put(("populate_products", mac_prods_data))
                 self._queue_status_update("Catalog refreshed. Populating products...")
             except CancelledError as e:
                 self._queue_status_update(str(e))
-                self._queue_info_dialog(e.title, str(e))
+                if self.active_jobs.get("refresh") is job:
+                    # Not worth a dialog when a newer refresh replaced it
+                    self._queue_info_dialog(e.title, str(e))
             except ProgramError as e:
                 self._queue_status_update(f"Error refreshing products: {e.title} - {e}")
                 self._queue_error_dialog(e.title, str(e))
@@ -1116,12 +676,11 @@ class GibMacOSGUI(tk.Tk):
                 self._queue_status_update(f"An unexpected error occurred: {e}")
                 self._queue_error_dialog("Error", str(e))
             finally:
+                # Products keep their own records, the parsed catalog can go
+                self.backend.release_catalog()
                 self._queue_status_update("Ready.")
-                self._queue_ui_state(True)
-                self.current_thread = None
 
-        self.current_thread = threading.Thread(target=fetch_products_task)
-        self.current_thread.start()
+        self._start_job("refresh", "Catalog refresh", fetch_products_task)
 
     def _populate_product_tree(self, mac_prods_data):
         self.product_tree.delete(*self.product_tree.get_children())
@@ -1141,16 +700,13 @@ class GibMacOSGUI(tk.Tk):
                     p["build"],
                     p["size"],
                     p["product"],
+                    ", ".join(p.get("catalogs", ())),
                 ),
             )
         self._queue_status_update(f"Found {len(mac_prods_data)} macOS products.")
 
     def _on_product_select(self, event):
-        selected_items = self.product_tree.selection()
-        if selected_items:
-            self.download_button.config(state=tk.NORMAL)
-        else:
-            self.download_button.config(state=tk.DISABLED)
+        self._update_ui_state()
 
     def _download_selected(self):
         selected_item_id = self.product_tree.focus()
@@ -1172,32 +728,47 @@ class GibMacOSGUI(tk.Tk):
             )
             return
 
+        selection = self._choose_packages([selected_prod], action="Download")
+        if not selection:
+            return
+        packages = selection[selected_prod["product"]]
+        size = self.backend.d.get_size(
+            self.backend.get_packages_size(selected_prod, packages)
+        )
+
         confirm = messagebox.askyesno(
             "Confirm Download",
-            f"Are you sure you want to download '{selected_prod['title']} {selected_prod['version']} ({selected_prod['build']})' "
+            f"Are you sure you want to download {len(packages)} package(s) ({size}) of '{selected_prod['title']} {selected_prod['version']} ({selected_prod['build']})' "
             f"to '{self.download_dir}'?",
         )
         if not confirm:
             return
 
-        self._set_ui_state(False)
-        self.cancel_event.clear()
+        download_dir = self.download_dir
         self.progress_bar["value"] = 0
         self.progress_bar_label.config(text="Starting download...")
         self._queue_status_update(
             f"Initiating download for {selected_prod['title']}..."
         )
 
-        def download_task():
+        def download_task(job):
+            from gibmacos_backend import CancelledError, ProgramError
+
             try:
-                self.backend.download_prod(selected_prod, self.download_dir)
+                with self.backend.operation("download"):
+                    self.backend.download_prod(
+                        selected_prod,
+                        download_dir,
+                        packages=packages,
+                        cancel_event=job.cancel_event,
+                    )
                 self._queue_status_update(
                     f"Download complete for {selected_prod['title']}!"
                 )
                 self._queue_info_dialog(
                     "Download Complete",
                     f"All files for {selected_prod['title']} downloaded successfully to:\n"
-                    f"{os.path.join(self.download_dir, selected_prod['product'])}",
+                    f"{os.path.join(download_dir, selected_prod['product'])}",
                 )
             except CancelledError as e:
                 self._queue_status_update(str(e))
@@ -1212,20 +783,317 @@ class GibMacOSGUI(tk.Tk):
                 self._queue_error_dialog("Error", str(e))
             finally:
                 self._queue_progress_update(0, 0, 0)
-                self._queue_ui_state(True)
                 self._queue_status_update("Ready.")
-                self.current_thread = None
 
-        self.current_thread = threading.Thread(target=download_task)
-        self.current_thread.start()
+        self._start_job(
+            "download",
+            "Download {} {}".format(selected_prod["title"], selected_prod["version"]),
+            download_task,
+        )
+
+    def _choose_packages(self, prods, action="Download"):
+        # Modal package picker - returns {product ID: [file names]}, or None
+        # when cancelled or nothing is ticked
+        dialog = tk.Toplevel(self)
+        dialog.title("Choose Packages")
+        dialog.geometry("600x400")
+        dialog.transient(self)
+
+        presets = self.backend.package_presets
+        preset_var = tk.StringVar(value=presets["full"][0])
+        top_frame = ttk.Frame(dialog, padding="10")
+        top_frame.pack(fill=tk.X)
+        ttk.Label(top_frame, text="Preset:").pack(side=tk.LEFT)
+        preset_dropdown = ttk.Combobox(
+            top_frame,
+            textvariable=preset_var,
+            values=[label for label, suffixes in presets.values()],
+            state="readonly",
+            width=28,
+        )
+        preset_dropdown.pack(side=tk.LEFT, padx=5)
+        total_label = ttk.Label(top_frame, text="")
+        total_label.pack(side=tk.RIGHT)
+
+        tree_frame = ttk.Frame(dialog, padding=(10, 0, 10, 10))
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        tree = ttk.Treeview(tree_frame, columns=("Size",), selectmode="none")
+        tree.heading("#0", text="Package (click to toggle)", anchor=tk.W)
+        tree.heading("Size", text="Size", anchor=tk.W)
+        tree.column("Size", width=100, stretch=False)
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        # item ID -> (product, file name, size)
+        packages = {}
+        for prod in prods:
+            parent = tree.insert(
+                "",
+                tk.END,
+                text=f"{prod['title']} {prod['version']} ({prod['build']})",
+                values=(prod["size"],),
+                open=True,
+            )
+            for x in self.backend.get_download_list(prod):
+                item = tree.insert(
+                    parent,
+                    tk.END,
+                    values=(self.backend.d.get_size(x.get("Size", 0)),),
+                )
+                packages[item] = (prod, os.path.basename(x["URL"]), x.get("Size", 0))
+        selected = set()
+        result = {}
+
+        def refresh():
+            total = 0
+            for item, (prod, name, size) in packages.items():
+                tree.item(item, text=("☑ " if item in selected else "☐ ") + name)
+                if item in selected:
+                    total += max(0, size)
+            total_label.config(
+                text=f"{len(selected)} package(s), {self.backend.d.get_size(total)}"
+            )
+            action_button.config(state=tk.NORMAL if selected else tk.DISABLED)
+
+        def apply_preset(event=None):
+            preset = next(
+                key
+                for key, (label, suffixes) in presets.items()
+                if label == preset_var.get()
+            )
+            selected.clear()
+            for prod in prods:
+                names = self.backend.get_preset_packages(prod, preset)
+                selected.update(
+                    item
+                    for item, (x, name, size) in packages.items()
+                    if x is prod and name in names
+                )
+            refresh()
+
+        def toggle(event):
+            item = tree.identify_row(event.y)
+            if item in packages:
+                selected.symmetric_difference_update([item])
+            elif item:
+                # A product row toggles all of its packages
+                children = set(tree.get_children(item))
+                if children <= selected:
+                    selected.difference_update(children)
+                else:
+                    selected.update(children)
+            refresh()
+
+        def accept():
+            for item in selected:
+                prod, name, size = packages[item]
+                result.setdefault(prod["product"], []).append(name)
+            dialog.destroy()
+
+        tree.bind("<Button-1>", toggle)
+        preset_dropdown.bind("<<ComboboxSelected>>", apply_preset)
+
+        buttons_frame = ttk.Frame(dialog, padding=(10, 0, 10, 10))
+        buttons_frame.pack(fill=tk.X)
+        ttk.Button(buttons_frame, text="Cancel", command=dialog.destroy).pack(
+            side=tk.RIGHT, padx=5
+        )
+        action_button = ttk.Button(buttons_frame, text=action, command=accept)
+        action_button.pack(side=tk.RIGHT, padx=5)
+
+        apply_preset()
+        dialog.grab_set()
+        self.wait_window(dialog)
+        return result or None
+
+    def _resume_download_queue(self):
+        dl_queue = self.backend.get_download_queue()
+        if dl_queue.pending():
+            self._queue_status_update(
+                f"Resuming download queue with {dl_queue.pending()} pending job(s)..."
+            )
+            dl_queue.start()
+
+    def _queue_selected(self):
+        selected_ids = self.product_tree.selection()
+        if not selected_ids:
+            self._queue_info_dialog(
+                "No Selection", "Please select one or more macOS products to queue."
+            )
+            return
+        try:
+            priority = int(self.priority_var.get())
+        except ValueError:
+            self._queue_error_dialog(
+                "Invalid Input", "Priority must be a whole number (e.g. -1, 0, 5)."
+            )
+            return
+
+        selection = self._choose_packages(
+            [x for x in self.gui_products_data if x["product"] in selected_ids],
+            action="Queue",
+        )
+        if not selection:
+            return
+        for prod in self.gui_products_data:
+            if prod["product"] in selection:
+                self.backend.queue_prod(
+                    prod,
+                    self.download_dir,
+                    priority=priority,
+                    packages=selection[prod["product"]],
+                )
+        self.backend.get_download_queue().start()
+        self._refresh_queue_tree()
+
+    def _show_download_queue(self):
+        if self.queue_window and self.queue_window.winfo_exists():
+            self.queue_window.lift()
+            return
+
+        self.queue_window = tk.Toplevel(self)
+        self.queue_window.title("Download Queue")
+        self.queue_window.geometry("750x350")
+
+        tree_frame = ttk.Frame(self.queue_window, padding="10")
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.queue_tree = ttk.Treeview(
+            tree_frame,
+            columns=("Name", "Priority", "Status", "Progress", "Product ID"),
+            show="headings",
+        )
+        for column, width in (
+            ("Name", 280),
+            ("Priority", 60),
+            ("Status", 80),
+            ("Progress", 180),
+            ("Product ID", 100),
+        ):
+            self.queue_tree.heading(column, text=column, anchor=tk.W)
+            self.queue_tree.column(column, width=width, stretch=column == "Name")
+        scrollbar = ttk.Scrollbar(
+            tree_frame, orient="vertical", command=self.queue_tree.yview
+        )
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.queue_tree.configure(yscrollcommand=scrollbar.set)
+        self.queue_tree.pack(fill=tk.BOTH, expand=True)
+
+        dl_queue = self.backend.get_download_queue()
+        buttons_frame = ttk.Frame(self.queue_window, padding=(10, 0, 10, 10))
+        buttons_frame.pack(fill=tk.X)
+        for text, command in (
+            ("Start", dl_queue.start),
+            ("Pause", dl_queue.stop),
+            ("Raise Priority", lambda: self._queue_job_action("raise")),
+            ("Lower Priority", lambda: self._queue_job_action("lower")),
+            ("Retry", lambda: self._queue_job_action("retry")),
+            ("Remove", lambda: self._queue_job_action("remove")),
+            ("Clear Finished", dl_queue.clear_finished),
+        ):
+            ttk.Button(buttons_frame, text=text, command=command).pack(
+                side=tk.LEFT, padx=5
+            )
+
+        self._poll_queue_tree()
+
+    def _poll_queue_tree(self):
+        if not (self.queue_window and self.queue_window.winfo_exists()):
+            return
+        self._refresh_queue_tree()
+        self.queue_window.after(1000, self._poll_queue_tree)
+
+    def _queue_job_action(self, action):
+        if not self.queue_tree:
+            return
+        dl_queue = self.backend.get_download_queue()
+        for job_id in self.queue_tree.selection():
+            job = dl_queue.get_job(job_id)
+            if job is None:
+                continue
+            if action == "raise":
+                dl_queue.set_priority(job_id, job["priority"] + 1)
+            elif action == "lower":
+                dl_queue.set_priority(job_id, job["priority"] - 1)
+            elif action == "retry":
+                if dl_queue.retry(job_id):
+                    dl_queue.start()
+            elif action == "remove":
+                dl_queue.remove(job_id)
+        self._refresh_queue_tree()
+
+    def _refresh_queue_tree(self):
+        if not (self.queue_window and self.queue_window.winfo_exists()):
+            return
+        selection = self.queue_tree.selection()
+        self.queue_tree.delete(*self.queue_tree.get_children())
+        for job in self.backend.get_download_queue().get_jobs():
+            prod = job["product"]
+            progress = ""
+            if job["status"] == "running" and job["total"] > 0:
+                progress = "{:.1f}% ({} / {})".format(
+                    job["bytes"] / job["total"] * 100,
+                    self.backend.d.get_size(job["bytes"]),
+                    self.backend.d.get_size(job["total"]),
+                )
+            elif job["error"]:
+                progress = job["error"]
+            self.queue_tree.insert(
+                "",
+                tk.END,
+                iid=job["id"],
+                values=(
+                    f"{prod.get('title', '')} {prod.get('version', '')} ({prod.get('build', '')})",
+                    job["priority"],
+                    job["status"],
+                    progress,
+                    prod["product"],
+                ),
+            )
+        self.queue_tree.selection_set(
+            [x for x in selection if self.queue_tree.exists(x)]
+        )
 
     def _cancel_operation(self):
-        self.cancel_event.set()
-        self._queue_status_update("Cancelling current operation, please wait...")
+        jobs = list(self.active_jobs.values())
+        if len(jobs) == 1:
+            self._cancel_job(jobs[0])
+            return
+        # Several things running - pick which one to stop
+        menu = tk.Menu(self, tearoff=0)
+        for job in jobs:
+            menu.add_command(
+                label=f"Cancel {job.name}",
+                command=lambda job=job: self._cancel_job(job),
+            )
+        menu.add_separator()
+        menu.add_command(
+            label="Cancel All", command=lambda: [self._cancel_job(x) for x in jobs]
+        )
+        menu.tk_popup(
+            self.cancel_button.winfo_rootx(),
+            self.cancel_button.winfo_rooty() + self.cancel_button.winfo_height(),
+        )
 
-    def _set_ui_state(self, enabled):
-        state = tk.NORMAL if enabled else tk.DISABLED
-        self.catalog_dropdown.config(state=state)
+    def _cancel_job(self, job):
+        job.cancel()
+        self._queue_status_update(f"Cancelling {job.name}, please wait...")
+
+    def _update_ui_state(self):
+        # Controls follow whichever jobs are running
+        refreshing = "refresh" in self.active_jobs
+        downloading = "download" in self.active_jobs
+        su_busy = "softwareupdate" in self.active_jobs
+        # Nothing to act on until _finish_startup has built the backend
+        loading = self.backend is None
+
+        state = tk.DISABLED if refreshing or loading else tk.NORMAL
+        self.refresh_button.config(state=tk.DISABLED if loading else tk.NORMAL)
+        self.catalog_dropdown.config(
+            state=tk.DISABLED if loading or self.backend.merged_catalogs else state
+        )
+        self.merged_catalogs_checkbox.config(state=state)
         self.max_macos_entry.config(state=state)
         self.find_recovery_checkbox.config(state=state)
         self.caffeinate_checkbox.config(
@@ -1233,26 +1101,31 @@ class GibMacOSGUI(tk.Tk):
         )
         self.save_local_checkbox.config(state=state)
         self.force_local_checkbox.config(state=state)
+        self.package_store_checkbox.config(state=state)
         self.browse_dir_button.config(state=state)
+        self.auto_tune_checkbox.config(state=tk.DISABLED if loading else tk.NORMAL)
+        for label in ("Download Queue...", "LAN Cache Server..."):
+            self.file_menu.entryconfig(
+                label, state=tk.DISABLED if loading else tk.NORMAL
+            )
 
-        set_su_state = (
-            tk.NORMAL if enabled and sys.platform == "darwin" else tk.DISABLED
-        )
-        clear_su_state = (
-            tk.NORMAL if enabled and sys.platform == "darwin" else tk.DISABLED
+        su_state = (
+            tk.NORMAL
+            if not su_busy and not loading and sys.platform == "darwin"
+            else tk.DISABLED
         )
+        self.set_su_button.config(state=su_state)
+        self.clear_su_button.config(state=su_state)
 
-        self.set_su_button.config(state=set_su_state)
-        self.clear_su_button.config(state=clear_su_state)
+        self.product_tree.config(selectmode="none" if refreshing else "extended")
 
-        self.product_tree.config(selectmode="extended" if enabled else "none")
-
-        if enabled and self.product_tree.selection():
-            self.download_button.config(state=tk.NORMAL)
-        else:
-            self.download_button.config(state=tk.DISABLED)
+        selected = bool(self.product_tree.selection()) and not refreshing
+        self.download_button.config(
+            state=tk.NORMAL if selected and not downloading else tk.DISABLED
+        )
+        self.queue_button.config(state=tk.NORMAL if selected else tk.DISABLED)
 
-        self.cancel_button.config(state=tk.NORMAL if not enabled else tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL if self.active_jobs else tk.DISABLED)
         self.show_console_checkbox.config(state=tk.NORMAL)
 
     def _show_how_to_use(self):
@@ -1285,6 +1158,14 @@ Advanced Options:
 • Caffeinate Downloads: Prevents Mac from sleeping during downloads
 • Save Catalog Locally: Caches catalog data for faster future use
 • Force Local Catalog Re-download: Updates cached catalog data
+• All Catalogs (Merged): Fetches every catalog at once and lists each
+  product once, with the catalogs it appears in
+• Share Packages Between Products: Keeps one copy of each package in a
+  hidden .package_store folder and hard links it into every product folder,
+  so packages shared between products are only downloaded once
+• Auto-Tune Connections: Learns from past downloads how many connections
+  each server handles best and how much to read at a time, and keeps the
+  result between runs (Scripts/tuning.json)
 
 License:
 --------
@@ -1363,7 +1244,7 @@ https://github.com/corpnewt/gibMacOS
         original_link.pack(side=tk.LEFT)
         original_link.bind(
             "<Button-1>",
-            lambda e: webbrowser.open("https://github.com/corpnewt/gibMacOS"),
+            lambda e: self._open_url("https://github.com/corpnewt/gibMacOS"),
         )
 
         # Close button
@@ -3,29 +3,61 @@
 Title: GibMacOS GUI Bootstrap
 Description: Automates setup and integration of gibMacOS GUI
 Features:
-  - Clones/updates original gibMacOS repository
-  - Copies GUI components to target directory
+  - Clones original gibMacOS repository (shallow)
+  - Copies GUI components to target directory when they changed
   - Handles cross-platform execution
-  - Auto-updates on launch
-Usage: Execute directly: `python run_gui.py`
+  - Launches from the existing checkout without waiting on the network
+  - Updates fetched in the background (at most once per interval) and
+    applied on the next launch, unless the checkout has local changes
+Usage:
+  - Execute directly: `python run_gui.py`
+  - GIBGUI_SKIP_UPDATE=1, GIBGUI_UPDATE_INTERVAL=<hours>, GIBGUI_BRANCH=<branch>
 Dependencies: Python 3.8+, git, requests
 License: MIT
 Author: Anoop Kumar
 Date: 24/06/2025 (DD/MM/YYYY)
 """
 
+import hashlib
 import os
 import sys
 import shutil
+import stat
 import subprocess
 import platform
+import time
 
 GIB_REPO_URL = "https://github.com/corpnewt/gibMacOS"
 GIB_DIR = "gibMacOS"
+GIB_BRANCH = os.environ.get("GIBGUI_BRANCH", "")
+# Last fetched commit that was applied to the checkout (inside .git)
+APPLIED_FILE = "gibgui_applied"
+# Only the background fetch writes this ref, and only when it succeeds -
+# FETCH_HEAD can be left over from any other fetch
+UPDATE_REF = "refs/gibgui/update"
+CUSTOM_FILES = (
+    "gibmacos_gui.py",
+    "gibmacos_backend.py",
+    "gibmacos_cli.py",
+    os.path.join("Scripts", "downloader.py"),
+    os.path.join("Scripts", "download_queue.py"),
+    os.path.join("Scripts", "package_store.py"),
+    os.path.join("Scripts", "metrics.py"),
+    os.path.join("Scripts", "profiling.py"),
+    os.path.join("Scripts", "cache_server.py"),
+    os.path.join("Scripts", "records.py"),
+    os.path.join("Scripts", "persist.py"),
+    os.path.join("Scripts", "jobs.py"),
+    os.path.join("Scripts", "verify.py"),
+    os.path.join("Scripts", "http_replay.py"),
+    os.path.join("Scripts", "catalog_worker.py"),
+    os.path.join("Scripts", "tuner.py"),
+    os.path.join("Scripts", "locking.py"),
+)
 
 
 def main():
-    # Clone/update gibMacOS
+    # Clone gibMacOS on first run, otherwise start from the existing checkout
     if not setup_gib_repo():
         sys.exit(1)
 
@@ -33,35 +65,160 @@ def main():
     if not copy_custom_files():
         sys.exit(1)
 
+    # Fetch updates for the next launch while the GUI runs
+    start_background_update()
+
     # Launch GUI
     launch_gui()
 
 
+def git(*args, **kwargs):
+    return subprocess.run(["git", "-C", GIB_DIR] + list(args), **kwargs)
+
+
+def git_output(*args):
+    try:
+        result = git(*args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return ""
+    return (
+        result.stdout.decode("utf-8", "ignore").strip()
+        if result.returncode == 0
+        else ""
+    )
+
+
 def setup_gib_repo():
     if not os.path.exists(GIB_DIR):
         print("Cloning gibMacOS repository...")
-        result = subprocess.run(["git", "clone", GIB_REPO_URL, GIB_DIR])
+        command = ["git", "clone", "--depth", "1", GIB_REPO_URL, GIB_DIR]
+        if GIB_BRANCH:
+            command[2:2] = ["--branch", GIB_BRANCH]
+        try:
+            result = subprocess.run(command)
+        except OSError as e:
+            print(f"Error cloning repository: {e}")
+            return False
         if result.returncode != 0:
             print("Error cloning repository")
             return False
+        return True
 
-    os.chdir(GIB_DIR)
-    print("Updating gibMacOS repository...")
-    result = subprocess.run(["git", "pull"])
-    os.chdir("..")
-    return result.returncode == 0
+    apply_fetched_update()
+    return True
+
+
+def apply_fetched_update():
+    # Moves the checkout to what the last background fetch downloaded - a
+    # local operation, so it never waits on the network
+    fetched = git_output("rev-parse", "--verify", "--quiet", UPDATE_REF + "^{commit}")
+    if not fetched or fetched == read_applied_update():
+        return
+    if fetched != git_output("rev-parse", "HEAD"):
+        changes = get_local_changes()
+        if changes:
+            # Left for a later launch - reset --hard would throw them away
+            print(
+                "Not applying gibMacOS update, the checkout has local changes: "
+                + ", ".join(changes)
+            )
+            return
+        print("Applying gibMacOS update...")
+        # Untracked GUI files stay, tracked ones we replace are copied again
+        result = git("reset", "--hard", "--quiet", fetched)
+        if result.returncode != 0:
+            print("Error applying gibMacOS update, using the current checkout")
+            return
+    write_applied_update(fetched)
+
+
+def get_local_changes():
+    # Changed tracked files, apart from the GUI files copy_custom_files puts
+    # back after every update
+    custom = set(x.replace(os.sep, "/") for x in CUSTOM_FILES)
+    changes = []
+    for line in git_output(
+        "status", "--porcelain", "--untracked-files=no"
+    ).splitlines():
+        path = line.split(None, 1)[-1].split(" -> ")[-1]
+        if path not in custom:
+            changes.append(path)
+    return changes
+
+
+def read_applied_update():
+    try:
+        with open(os.path.join(GIB_DIR, ".git", APPLIED_FILE), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
 
 
-def copy_custom_files():
+def write_applied_update(commit):
     try:
-        # Copy GUI script
-        shutil.copy("gibmacos_gui.py", os.path.join(GIB_DIR, "gibmacos_gui.py"))
-        # Copy modified downloader
-        os.makedirs(os.path.join(GIB_DIR, "Scripts"), exist_ok=True)
-        shutil.copy(
-            os.path.join("Scripts", "downloader.py"),
-            os.path.join(GIB_DIR, "Scripts", "downloader.py"),
+        with open(os.path.join(GIB_DIR, ".git", APPLIED_FILE), "w") as f:
+            f.write(commit)
+    except OSError:
+        pass
+
+
+def update_due():
+    if os.environ.get("GIBGUI_SKIP_UPDATE"):
+        return False
+    try:
+        interval = float(os.environ.get("GIBGUI_UPDATE_INTERVAL", 24)) * 3600
+    except ValueError:
+        interval = 24 * 3600
+    # .git/FETCH_HEAD is rewritten by every successful fetch
+    try:
+        last_fetch = os.path.getmtime(os.path.join(GIB_DIR, ".git", "FETCH_HEAD"))
+    except OSError:
+        last_fetch = 0
+    return time.time() - last_fetch >= interval
+
+
+def start_background_update():
+    if not update_due():
+        return None
+    command = ["git", "-C", GIB_DIR, "fetch", "--depth", "1", "--quiet", "origin"]
+    # The remote ref is stored under UPDATE_REF, which git only moves when
+    # the fetch succeeds
+    command.append("+{}:{}".format(GIB_BRANCH or "HEAD", UPDATE_REF))
+    try:
+        # Not waited for - the result is applied on the next launch
+        return subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
+    except OSError as e:
+        print(f"Could not check for gibMacOS updates: {e}")
+        return None
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def copy_custom_files():
+    try:
+        # Copy GUI/CLI scripts and the modified Scripts/ modules, skipping
+        # files whose content has not changed
+        for file_path in CUSTOM_FILES:
+            target = os.path.join(GIB_DIR, file_path)
+            if (
+                os.path.isfile(target)
+                and os.path.getsize(target) == os.path.getsize(file_path)
+                and file_hash(target) == file_hash(file_path)
+            ):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy(file_path, target)
         return True
     except Exception as e:
         print(f"File copy failed: {str(e)}")
@@ -74,7 +231,11 @@ def launch_gui():
 
     # Special handling for macOS .command files
     if platform.system() == "Darwin":
-        subprocess.run(["chmod", "+x", "gibmacos_gui.py"])
+        mode = os.stat("gibmacos_gui.py").st_mode
+        if not mode & stat.S_IXUSR:
+            os.chmod(
+                "gibmacos_gui.py", mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+            )
         command = ["./gibmacos_gui.py"]
 
     subprocess.run(command)
@@ -0,0 +1,307 @@
+import os
+import plistlib
+import threading
+
+import pytest
+
+import gibmacos_backend
+
+APPLE_URL = (
+    "https://swcdn.apple.com/content/downloads/00/00/012-34567/abc/InstallAssistant.pkg"
+)
+CACHE_URL = "http://10.0.0.2:8000/pkg/swcdn.apple.com/content/downloads/00/00/012-34567/abc/InstallAssistant.pkg"
+
+
+@pytest.fixture
+def backend():
+    return gibmacos_backend.GibMacOSBackend()
+
+
+def write_package(folder, size):
+    with open(os.path.join(folder, "InstallAssistant.pkg"), "wb") as f:
+        f.write(b"x" * size)
+
+
+def test_package_state_missing_and_incomplete(backend, tmp_path):
+    package = {"URL": APPLE_URL, "Size": 8}
+    assert backend.get_package_state(str(tmp_path), package, {}) == "missing"
+    write_package(str(tmp_path), 4)
+    assert backend.get_package_state(str(tmp_path), package, {}) == "incomplete"
+
+
+def test_package_state_ignores_cache_server_host(backend, tmp_path):
+    write_package(str(tmp_path), 8)
+    backend.record_validator(
+        str(tmp_path), {"URL": APPLE_URL, "Size": 8, "Digest": "d"}
+    )
+    manifest = backend.load_manifest(str(tmp_path))
+    package = {"URL": CACHE_URL, "Size": 8, "Digest": "d"}
+    assert backend.get_package_state(str(tmp_path), package, manifest) == "complete"
+
+
+def test_package_state_changed(backend, tmp_path):
+    write_package(str(tmp_path), 8)
+    backend.record_validator(
+        str(tmp_path), {"URL": APPLE_URL, "Size": 8, "Digest": "d"}
+    )
+    manifest = backend.load_manifest(str(tmp_path))
+    for package in (
+        {"URL": APPLE_URL.replace("abc", "def"), "Size": 8, "Digest": "d"},
+        {"URL": APPLE_URL, "Size": 8, "Digest": "e"},
+    ):
+        assert backend.get_package_state(str(tmp_path), package, manifest) == "changed"
+
+
+def product(*packages):
+    return {
+        "product": "012-34567",
+        "version": "15.0",
+        "title": "macOS Sequoia",
+        "build": "24A335",
+        "packages": list(packages),
+    }
+
+
+def test_cancel_while_waiting_on_store_lock(backend, tmp_path):
+    # The last file waits on another job's download - Cancel there is a
+    # cancel, not a failed download
+    backend.use_package_store = True
+    package = {"URL": APPLE_URL, "Size": 8}
+    store = backend.get_package_store(str(tmp_path))
+    lock = store.lock_for(package)
+    lock.acquire()
+    cancel_event = threading.Event()
+    timer = threading.Timer(0.2, cancel_event.set)
+    timer.start()
+    try:
+        with pytest.raises(gibmacos_backend.CancelledError):
+            backend.download_prod(
+                product(package),
+                str(tmp_path),
+                cancel_event=cancel_event,
+                caffeinate=False,
+            )
+    finally:
+        timer.cancel()
+        lock.release()
+    assert backend.metrics.snapshot()["counters"].get("packages_failed", 0) == 0
+
+
+def test_cancelled_sync_is_not_a_failure(backend, tmp_path):
+    messages = []
+    backend.update_callback = messages.append
+    prod = product({"URL": APPLE_URL, "Size": 8})
+    folder = backend.get_product_folder(prod, str(tmp_path))
+    plan = {
+        "downloads": [(prod, folder, prod["packages"][0], "missing")],
+        "bytes": 8,
+        "superseded": [],
+    }
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(gibmacos_backend.CancelledError):
+        backend.sync_mirror(plan, jobs=1, cancel_event=cancel_event)
+    assert backend.metrics.snapshot()["counters"].get("packages_failed", 0) == 0
+    assert not [x for x in messages if x.startswith("Failed to sync")]
+
+
+def test_repair_leaves_products_not_in_catalog(backend, tmp_path, monkeypatch):
+    backend.use_package_store = False
+    queued = []
+    monkeypatch.setattr(
+        backend, "queue_prod", lambda prod, *args, **kwargs: queued.append(kwargs)
+    )
+    results = []
+    for product_id in ("012-34567", "999-99999"):
+        folder = tmp_path / product_id
+        folder.mkdir()
+        write_package(str(folder), 4)
+        results.append(
+            {
+                "product": product_id,
+                "file": str(folder / "InstallAssistant.pkg"),
+                "url": APPLE_URL,
+                "status": "digest",
+            }
+        )
+    prod = product({"URL": APPLE_URL, "Size": 8})
+    removed, products = backend.repair_library(results, [prod], str(tmp_path))
+    assert removed == [results[0]["file"]]
+    assert products == ["012-34567"]
+    assert queued[0]["packages"] == ["InstallAssistant.pkg"]
+    # Nothing could download it again, so it is left alone
+    assert os.path.isfile(results[1]["file"])
+
+
+class FakeCaffeinate:
+    def __init__(self, *args, **kwargs):
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = -15
+
+
+def test_caffeinate_is_shared(backend, monkeypatch):
+    isfile = os.path.isfile
+    monkeypatch.setattr(gibmacos_backend.sys, "platform", "darwin")
+    monkeypatch.setattr(
+        gibmacos_backend.os.path,
+        "isfile",
+        lambda path: path == "/usr/bin/caffeinate" or isfile(path),
+    )
+    monkeypatch.setattr(gibmacos_backend.subprocess, "Popen", FakeCaffeinate)
+    backend.caffeinate_downloads = True
+    # The queue starts first, a direct download starts and finishes while it
+    # is still running
+    queue_process = backend.start_caffeinate()
+    assert backend.start_caffeinate() is queue_process
+    backend.term_caffeinate_proc()
+    assert queue_process.poll() is None
+    backend.term_caffeinate_proc()
+    assert queue_process.poll() is not None
+    assert backend.caffeinate_process is None
+
+
+def catalog_bytes(padding=0):
+    return plistlib.dumps(
+        {
+            "Products": {
+                "012-34567": {
+                    "ExtendedMetaInfo": {
+                        "InstallAssistantPackageIdentifiers": {
+                            "SharedSupport": "com.apple.pkg.InstallAssistant.macOSSequoia"
+                        }
+                    },
+                    "Packages": [{"URL": APPLE_URL, "Size": 8}],
+                },
+                "041-00000": {"Packages": []},
+            },
+            "Padding": "x" * padding,
+        }
+    )
+
+
+def test_small_catalog_is_parsed_here(backend):
+    catalog = backend.parse_catalog(catalog_bytes())
+    assert list(catalog["Products"]) == ["012-34567"]
+    assert backend._parse_pool is None
+
+
+def test_parse_pool_is_reused(backend):
+    data = catalog_bytes(padding=backend.worker_parse_min)
+    try:
+        first = backend.parse_catalog(data)
+        pool = backend._parse_pool
+        second = backend.parse_catalog(data)
+        assert pool is not None and backend._parse_pool is pool
+        assert first == second
+        assert list(first["Products"]) == ["012-34567"]
+    finally:
+        backend.close_parse_pool()
+    assert backend._parse_pool is None
+
+
+@pytest.mark.parametrize("force_local", [False, True])
+def test_prod_cache_merge(backend, tmp_path, force_local):
+    backend.prod_cache_path = str(tmp_path / "prod_cache.plist")
+    with open(backend.prod_cache_path, "wb") as f:
+        plistlib.dump({"from-other-process": {"build": "A"}}, f)
+    backend.force_local = force_local
+    backend.prod_cache = {"012-34567": {"build": "B"}}
+    backend.save_prod_cache()
+    backend.persister.flush()
+    expected = {"012-34567"} if force_local else {"012-34567", "from-other-process"}
+    assert set(backend.load_prod_cache()) == expected
+
+
+def release(version, build, product_id):
+    url = APPLE_URL.replace("012-34567", product_id)
+    return dict(
+        product(),
+        product=product_id,
+        version=version,
+        build=build,
+        packages=[{"URL": url, "Size": 8, "Digest": "d"}],
+    )
+
+
+def test_sync_plan_keeps_newest_builds(backend, tmp_path):
+    download_dir = str(tmp_path)
+    sonoma_old = release("14.1", "23B74", "012-00001")
+    sonoma = release("14.2", "23C64", "012-00002")
+    sequoia = release("15.0", "24A335", "012-00003")
+    ventura = release("13.6", "22G120", "012-00004")
+    # Already mirrored
+    folder = backend.get_product_folder(sequoia, download_dir)
+    os.makedirs(folder)
+    write_package(folder, 8)
+    backend.record_validator(folder, sequoia["packages"][0])
+    for prod in (sonoma_old, ventura):
+        os.makedirs(backend.get_product_folder(prod, download_dir))
+    os.makedirs(os.path.join(download_dir, "Not a product"))
+
+    plan = backend.get_sync_plan(
+        [sonoma_old, sonoma, sequoia, ventura],
+        download_dir,
+        min_version=19,
+        max_version=20,
+        keep=1,
+    )
+    assert sorted(x[0]["build"] for x in plan["products"]) == ["23C64", "24A335"]
+    assert [(x[0]["build"], x[3]) for x in plan["downloads"]] == [("23C64", "missing")]
+    assert plan["bytes"] == 8
+    # Out of range builds are left alone
+    assert plan["superseded"] == [backend.get_product_folder(sonoma_old, download_dir)]
+
+
+def test_sync_links_packages_from_the_store(backend, tmp_path):
+    backend.use_package_store = True
+    download_dir = str(tmp_path)
+    sequoia = release("15.0", "24A335", "012-00003")
+    store_path = backend.get_package_store(download_dir).object_path(
+        sequoia["packages"][0]
+    )
+    os.makedirs(os.path.dirname(store_path))
+    write_package(os.path.dirname(store_path), 8)
+
+    plan = backend.get_sync_plan(
+        [sequoia], download_dir, min_version=20, max_version=20
+    )
+    assert [x[3] for x in plan["downloads"]] == ["stored"]
+    assert plan["bytes"] == 0
+    backend.sync_mirror(plan, jobs=1)
+    folder = backend.get_product_folder(sequoia, download_dir)
+    assert os.path.samefile(os.path.join(folder, "InstallAssistant.pkg"), store_path)
+
+
+def test_fleet_compatibility(backend):
+    sonoma = dict(release("14.2", "23C64", "012-00002"), time=2)
+    sequoia = dict(release("15.0", "24A335", "012-00003"), time=3)
+    sonoma["device_ids"] = ("j413ap", "mac-aa95b1ddab278b95")
+    sequoia["device_ids"] = ("j413ap",)
+    results = backend.get_fleet_compatibility(
+        ["J413AP", "Mac-AA95B1DDAB278B95", "j999ap"], [sonoma, sequoia]
+    )
+    assert results["j413ap"]["compatible"] == ["012-00002", "012-00003"]
+    assert results["j413ap"]["best"] is sequoia
+    assert results["mac-aa95b1ddab278b95"]["best"] is sonoma
+    assert results["j999ap"] == {"compatible": [], "best": None}
+
+
+def test_preset_packages(backend):
+    base = "https://swcdn.apple.com/content/downloads/00/00/012-34567/abc/"
+    prod = product(
+        *(
+            {"URL": base + name, "Size": 4}
+            for name in ("InstallAssistant.pkg", "BaseSystem.dmg", "Other.pkg")
+        )
+    )
+    assert backend.get_preset_packages(prod, "installer") == ["InstallAssistant.pkg"]
+    assert backend.get_preset_packages(prod, "dmg") == ["BaseSystem.dmg"]
+    assert len(backend.get_preset_packages(prod, "full")) == 3
+    assert backend.get_packages_size(prod, packages=["BaseSystem.dmg"]) == 4
+    with pytest.raises(gibmacos_backend.ProgramError):
+        backend.get_preset_packages(prod, "unknown")
@@ -0,0 +1,101 @@
+import os
+import subprocess
+
+import pytest
+
+import run_gui
+
+
+def git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        + list(args),
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+    ).stdout.strip()
+
+
+def commit(repo, content):
+    with open(os.path.join(repo, "gibMacOS.py"), "w") as f:
+        f.write(content)
+    git(repo, "add", "gibMacOS.py")
+    git(repo, "commit", "-q", "-m", content)
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    upstream = str(tmp_path / "upstream")
+    os.makedirs(upstream)
+    git(upstream, "init", "-q")
+    first = commit(upstream, "first")
+    git(
+        str(tmp_path),
+        "clone",
+        "-q",
+        "--depth",
+        "1",
+        "file://" + upstream,
+        run_gui.GIB_DIR,
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GIBGUI_UPDATE_INTERVAL", "0")
+    monkeypatch.delenv("GIBGUI_SKIP_UPDATE", raising=False)
+    return upstream, first
+
+
+def test_stale_fetch_head_is_not_applied(checkout):
+    upstream, first = checkout
+    commit(upstream, "second")
+    # Some other fetch leaves FETCH_HEAD behind
+    git(run_gui.GIB_DIR, "fetch", "-q", "origin")
+    with open(os.path.join(run_gui.GIB_DIR, "gibMacOS.py"), "w") as f:
+        f.write("local change")
+    run_gui.apply_fetched_update()
+    assert git(run_gui.GIB_DIR, "rev-parse", "HEAD") == first
+    with open(os.path.join(run_gui.GIB_DIR, "gibMacOS.py")) as f:
+        assert f.read() == "local change"
+
+
+def test_background_fetch_is_applied_on_next_launch(checkout):
+    upstream, first = checkout
+    second = commit(upstream, "second")
+    assert run_gui.start_background_update().wait() == 0
+    run_gui.apply_fetched_update()
+    assert git(run_gui.GIB_DIR, "rev-parse", "HEAD") == second
+    assert run_gui.read_applied_update() == second
+
+
+def test_local_changes_hold_back_the_update(checkout):
+    upstream, first = checkout
+    commit(upstream, "second")
+    assert run_gui.start_background_update().wait() == 0
+    with open(os.path.join(run_gui.GIB_DIR, "gibMacOS.py"), "w") as f:
+        f.write("local change")
+    run_gui.apply_fetched_update()
+    assert git(run_gui.GIB_DIR, "rev-parse", "HEAD") == first
+    with open(os.path.join(run_gui.GIB_DIR, "gibMacOS.py")) as f:
+        assert f.read() == "local change"
+    # Tried again on the next launch
+    assert run_gui.read_applied_update() == ""
+
+
+def test_copied_gui_files_do_not_hold_back_the_update(checkout):
+    upstream, first = checkout
+    os.makedirs(os.path.join(upstream, "Scripts"))
+    with open(os.path.join(upstream, "Scripts", "downloader.py"), "w") as f:
+        f.write("upstream")
+    git(upstream, "add", "Scripts")
+    commit(upstream, "second")
+    assert run_gui.start_background_update().wait() == 0
+    run_gui.apply_fetched_update()
+    # copy_custom_files replaces the upstream downloader
+    with open(os.path.join(run_gui.GIB_DIR, "Scripts", "downloader.py"), "w") as f:
+        f.write("gui")
+    third = commit(upstream, "third")
+    assert run_gui.start_background_update().wait() == 0
+    run_gui.apply_fetched_update()
+    assert git(run_gui.GIB_DIR, "rev-parse", "HEAD") == third